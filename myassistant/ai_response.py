@@ -1,26 +1,71 @@
 """
 AI Response System for MyAssistant
 """
+import asyncio
 import os
 import json
-from typing import Optional
-from openai import OpenAI
-from .memory_store import MemoryStore
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Set, Tuple
+from .context_builder import ContextBuilder
+from .hedging import CircuitBreaker, get_llm_deadline, hedge
+from .keyword_matcher import KeywordMatcher
+from .llm_dispatch import get_dispatcher
+from .memory_store import MemoryStore, match_query
+from .response_cache import get_cache, make_key
+from .singleflight import llm_async_flights, llm_flights
+
+MODEL = "gpt-4"  # Use GPT-4 for better responses
+
+# How far ahead reminders are mentioned in responses
+REMINDER_WINDOW = timedelta(days=7)
+
+RESPONSE_MATCHER = KeywordMatcher({
+    "vietnamese": [
+        "xin chào", "chào", "tôi", "bạn", "của", "và", "là", "có", "không", "được",
+        "này", "đó", "một", "hai", "ba", "bốn", "năm", "sáu", "bảy", "tám", "chín", "mười",
+        "ngày", "tháng", "giờ", "phút", "giây", "hôm nay", "ngày mai", "hôm qua",
+        "cảm ơn", "xin lỗi", "tạm biệt", "chúc mừng", "vui", "buồn", "yêu", "thích"
+    ],
+    "vi_greeting": ["xin chào", "chào", "hello", "hi"],
+    "vi_how_are_you": ["bạn khỏe không", "thế nào", "sao"],
+    "vi_thanks": ["cảm ơn", "thanks"],
+    "vi_goodbye": ["tạm biệt", "bye", "goodbye"],
+    "vi_remind": ["nhắc nhở", "remind", "nhớ", "quên"],
+    "en_greeting": ["hello", "hi", "hey"],
+    "en_how_are_you": ["how are you", "how are you doing"],
+    "en_question": ["what", "who", "when", "where", "why", "how"],
+    "en_remind": ["remember", "remind", "recall"],
+    "en_thanks": ["thank", "thanks"],
+    "en_goodbye": ["goodbye", "bye", "see you"],
+})
 
 
 class AIResponseSystem:
     def __init__(self, memory_store: MemoryStore):
         self.memory_store = memory_store
+        self.context_builder = ContextBuilder()
+        self.cache = get_cache(memory_store.db_path)
+        # Slow or failing LLM calls are answered locally instead
+        self.deadline = get_llm_deadline()
+        self.breaker = CircuitBreaker()
+        self._late_tasks: Set[asyncio.Task] = set()
+        self.dispatcher = get_dispatcher()
         self.client = None
+        self.async_client = None
         
         # Try to initialize OpenAI client
         api_key = os.getenv("OPENAI_API_KEY")
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            from openai import AsyncOpenAI, OpenAI
+            # Retries are left to the dispatcher
+            self.client = OpenAI(api_key=api_key, max_retries=0)
+            self.async_client = AsyncOpenAI(api_key=api_key, max_retries=0)
     
-    def get_response(self, user_message: str, language: str = "en") -> str:
+    def get_response(self, user_message: str, language: str = "en", on_upgrade: Optional[Callable[[str], None]] = None) -> str:
         """
         Get AI response to user message
+        If the LLM misses the deadline the local answer is returned and
+        on_upgrade receives the LLM answer once it arrives
         """
         # Auto-detect language if not specified
         if language == "en":
@@ -30,24 +75,180 @@ class AIResponseSystem:
             return self._fallback_response(user_message, language)
         
         try:
-            # Get recent memories for context
-            recent_memories = self.memory_store.list_recent(limit=10)
-            context = "\n".join([f"- {mem.text}" for mem in recent_memories])
-            print(f"AI Context - Recent memories: {len(recent_memories)}")
-            print(f"AI Context - User message: {user_message}")
+            messages, memory_ids = self._build_messages(user_message)
+            
+            # Repeated questions over the same memories are answered from the cache
+            cache_key = make_key(MODEL, user_message, memory_ids)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            # Concurrent identical questions share one completion; the local
+            # answer is computed meanwhile in case it is slow or failing
+            ai_response, _ = hedge(
+                lambda: llm_flights.do(cache_key, self._complete, messages, cache_key),
+                lambda: self._fallback_response(user_message, language),
+                self.deadline,
+                breaker=self.breaker,
+                on_late=on_upgrade,
+            )
+            return ai_response
+            
+        except Exception as e:
+            print(f"AI response error: {e}")
+            return self._fallback_response(user_message, language)
+    
+    async def astream_response(
+        self,
+        user_message: str,
+        language: str = "en",
+        on_upgrade: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the AI response token by token
+        If no token arrives before the deadline the local answer is yielded
+        instead and on_upgrade is awaited with the LLM answer once complete
+        """
+        if language == "en":
+            language = self._detect_language(user_message)
+        
+        if not self.async_client:
+            yield await asyncio.to_thread(self._fallback_response, user_message, language)
+            return
+        
+        parts = []
+        try:
+            messages, memory_ids = await asyncio.to_thread(self._build_messages, user_message)
+            cache_key = make_key(MODEL, user_message, memory_ids)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                yield cached
+                return
+            
+            # The same question is already streaming to another client: share its answer
+            in_flight = llm_async_flights.claim(cache_key)
+            if in_flight is not None:
+                yield await llm_async_flights.wait(in_flight)
+                return
+            
+            if not self.breaker.allow():
+                llm_async_flights.finish(cache_key, error=RuntimeError("AI circuit open"))
+                yield await asyncio.to_thread(self._fallback_response, user_message, language)
+                return
             
-            # Also search for relevant memories based on the user's question
-            search_results = self.memory_store.ask(user_message, limit=5)
-            if search_results:
-                relevant_memories = "\n".join([f"- {mem.text} (relevance: {score:.2f})" for mem, score in search_results])
-                context += f"\n\nRelevant memories for your question:\n{relevant_memories}"
-                print(f"AI Context - Found {len(search_results)} relevant memories")
+            missed = asyncio.Event()
+            deltas = self._stream_completion(messages, cache_key, missed)
+            first = asyncio.ensure_future(anext(deltas))
+            done, _ = await asyncio.wait({first}, timeout=self.deadline or None)
+            if not done:
+                # Too slow: answer locally and let the stream finish in the background
+                missed.set()
+                self.breaker.record_failure()
+                task = asyncio.create_task(self._finish_late(first, deltas, on_upgrade))
+                self._late_tasks.add(task)
+                task.add_done_callback(self._late_tasks.discard)
+                yield await asyncio.to_thread(self._fallback_response, user_message, language)
+                return
+            
+            try:
+                parts.append(first.result())
+            except StopAsyncIteration:
+                return
+            yield parts[0]
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+        
+        except Exception as e:
+            print(f"AI response error: {e}")
+            if not parts:
+                yield await asyncio.to_thread(self._fallback_response, user_message, language)
+    
+    async def _stream_completion(self, messages: list, cache_key: str, missed: asyncio.Event) -> AsyncIterator[str]:
+        """
+        Stream one completion, caching the answer and sharing it with
+        clients waiting on the same question
+        Once missed is set the deadline miss has been recorded, so the
+        outcome no longer reaches the breaker
+        """
+        parts = []
+        try:
+            # The dispatcher slot is held until the stream is consumed
+            async with self.dispatcher.aslot():
+                stream = await self.dispatcher.aretry(
+                    self.async_client.chat.completions.create,
+                    model=MODEL,
+                    messages=messages,
+                    max_tokens=200,
+                    temperature=0.7,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
             
-            # Create ChatGPT-like system prompt
-            system_prompt = f"""You are MyAssistant, an intelligent AI assistant similar to ChatGPT. You have access to the user's personal memories and can help with various tasks.
+            ai_response = "".join(parts).strip()
+            if not missed.is_set():
+                self.breaker.record_success()
+            await asyncio.to_thread(self.cache.put, cache_key, MODEL, ai_response)
+            llm_async_flights.finish(cache_key, ai_response)
+        except Exception:
+            if not missed.is_set():
+                self.breaker.record_failure()
+            raise
+        finally:
+            # No-op after success; otherwise releases waiting clients with an error
+            llm_async_flights.finish(cache_key, error=RuntimeError("AI response stream did not complete"))
+    
+    async def _finish_late(self, first: asyncio.Future, deltas: AsyncIterator[str], on_upgrade) -> None:
+        """
+        Drain a stream that missed the deadline and hand over the full answer
+        """
+        try:
+            parts = [await first]
+            async for delta in deltas:
+                parts.append(delta)
+        except StopAsyncIteration:
+            return
+        except Exception as e:
+            print(f"Late AI response failed: {e}")
+            return
+        ai_response = "".join(parts).strip()
+        if on_upgrade and ai_response:
+            await on_upgrade(ai_response)
+    
+    def _complete(self, messages: list, cache_key: str) -> str:
+        """
+        Run one completion and cache its answer
+        """
+        # Get AI response using GPT-4 for better ChatGPT-like responses
+        response = self.dispatcher.call(
+            self.client.chat.completions.create,
+            model=MODEL,
+            messages=messages,
+            max_tokens=200,  # Allow longer responses
+            temperature=0.7
+        )
+        
+        ai_response = response.choices[0].message.content.strip()
+        self.cache.put(cache_key, MODEL, ai_response)
+        return ai_response
+    
+    def _build_messages(self, user_message: str) -> Tuple[list, List[int]]:
+        """
+        Build the ChatGPT-like prompt from recent and relevant memories;
+        also returns the ids of the memories in context
+        """
+        # Recent and relevant memories, deduplicated and packed into the token budget
+        context = self.context_builder.build(self.memory_store, user_message)
+        print(f"AI Context - {len(context.memories)} memories, ~{context.tokens} tokens")
+        
+        # Create ChatGPT-like system prompt
+        system_prompt = f"""You are MyAssistant, an intelligent AI assistant similar to ChatGPT. You have access to the user's personal memories and can help with various tasks.
 
-User's stored memories:
-{context}
+User's stored memories (most relevant first):
+{context.text or "No memories stored yet."}
 
 Your capabilities:
 - Answer questions based on the user's memories
@@ -61,40 +262,18 @@ Guidelines:
 - If you don't have relevant information, say so politely and offer to help in other ways
 - Be conversational and natural, like ChatGPT
 - Provide context and be helpful, not just robotic responses
-- If the user is asking for information you don't have, suggest they tell you about it
-
-User message: {user_message}"""
-
-            # Get AI response using GPT-4 for better ChatGPT-like responses
-            response = self.client.chat.completions.create(
-                model="gpt-4",  # Use GPT-4 for better responses
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=200,  # Allow longer responses
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            print(f"AI response error: {e}")
-            return self._fallback_response(user_message, language)
+- If the user is asking for information you don't have, suggest they tell you about it"""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ], context.memory_ids
     
     def _detect_language(self, text: str) -> str:
         """
         Simple language detection based on common Vietnamese words
         """
-        vietnamese_words = [
-            "xin chào", "chào", "tôi", "bạn", "của", "và", "là", "có", "không", "được",
-            "này", "đó", "một", "hai", "ba", "bốn", "năm", "sáu", "bảy", "tám", "chín", "mười",
-            "ngày", "tháng", "năm", "giờ", "phút", "giây", "hôm nay", "ngày mai", "hôm qua",
-            "cảm ơn", "xin lỗi", "tạm biệt", "chúc mừng", "vui", "buồn", "yêu", "thích"
-        ]
-        
-        text_lower = text.lower()
-        vietnamese_count = sum(1 for word in vietnamese_words if word in text_lower)
+        vietnamese_count = len(RESPONSE_MATCHER.keywords(text, "vietnamese"))
         
         # If more than 1 Vietnamese word is found, consider it Vietnamese
         if vietnamese_count > 1:
@@ -106,35 +285,30 @@ User message: {user_message}"""
         """
         Fallback responses when AI is not available
         """
-        message_lower = user_message.lower()
+        categories = RESPONSE_MATCHER.classify(user_message)
         
         if language == "vi":
             # Vietnamese responses
-            if any(word in message_lower for word in ["xin chào", "chào", "hello", "hi"]):
+            if "vi_greeting" in categories:
                 # Check for reminders when greeting
                 reminders = self._get_relevant_reminders(user_message)
                 base_response = "Xin chào! Tôi là MyAssistant. Tôi có thể giúp bạn ghi nhớ mọi thứ và trả lời câu hỏi!"
                 return base_response + (" " + reminders if reminders else "")
-            elif any(word in message_lower for word in ["bạn khỏe không", "thế nào", "sao"]):
+            elif "vi_how_are_you" in categories:
                 return "Tôi đang rất tốt! Tôi ở đây để giúp bạn ghi nhớ và tổ chức suy nghĩ."
-            elif any(word in message_lower for word in ["cảm ơn", "thanks"]):
+            elif "vi_thanks" in categories:
                 return "Không có gì! Tôi rất vui được giúp bạn ghi nhớ và tổ chức suy nghĩ."
-            elif any(word in message_lower for word in ["tạm biệt", "bye", "goodbye"]):
+            elif "vi_goodbye" in categories:
                 return "Tạm biệt! Tôi sẽ luôn ở đây khi bạn cần ghi nhớ điều gì hoặc hỏi câu hỏi."
-            elif any(word in message_lower for word in ["nhắc nhở", "remind", "nhớ", "quên"]):
-                # Look for reminder-related memories
-                memory_results = self.memory_store.ask(user_message, limit=5)
-                if memory_results:
-                    reminders = []
-                    for memory, score in memory_results[:3]:
-                        if any(keyword in memory.text.lower() for keyword in ["họp", "meeting", "cuộc hẹn", "appointment", "deadline", "hạn chót", "cần làm", "phải làm"]):
-                            reminders.append(f"- {memory.text}")
-                    if reminders:
-                        return f"Đây là những điều tôi nhắc nhở bạn:\n" + "\n".join(reminders)
+            elif "vi_remind" in categories:
+                # Look for upcoming reminders
+                reminders = [f"- {r.memory.text}" for r in self._upcoming_reminders()]
+                if reminders:
+                    return f"Đây là những điều tôi nhắc nhở bạn:\n" + "\n".join(reminders)
                 return "Tôi sẽ giúp bạn nhắc nhở! Hãy cho tôi biết bạn cần nhắc nhở về điều gì."
             else:
                 # Search through memories for relevant information and reminders
-                memory_results = self.memory_store.ask(user_message, limit=3)
+                memory_results = self.memory_store.ask(match_query(user_message), limit=3)
                 if memory_results:
                     memory, score = memory_results[0]
                     reminders = self._get_relevant_reminders(user_message)
@@ -144,74 +318,56 @@ User message: {user_message}"""
                     return "Tôi đã lưu thông tin đó! Bạn có muốn biết điều gì cụ thể về ký ức của mình không?"
         else:
             # English responses
-            if any(word in message_lower for word in ["hello", "hi", "hey"]):
+            if "en_greeting" in categories:
                 # Check for reminders when greeting
                 reminders = self._get_relevant_reminders(user_message)
                 base_response = "Hello! I'm MyAssistant, your personal AI assistant. I can help you remember things, answer questions, and assist with various tasks. How can I help you today?"
                 return base_response + (" " + reminders if reminders else "")
-            elif any(word in message_lower for word in ["how are you", "how are you doing"]):
+            elif "en_how_are_you" in categories:
                 return "I'm doing great, thank you for asking! I'm here and ready to help you with whatever you need. Is there anything specific I can assist you with today?"
-            elif any(word in message_lower for word in ["what", "who", "when", "where", "why", "how"]):
+            elif "en_question" in categories:
                 # Search for relevant memories
-                memory_results = self.memory_store.ask(user_message, limit=3)
+                memory_results = self.memory_store.ask(match_query(user_message), limit=3)
                 if memory_results:
                     memory, score = memory_results[0]
                     return f"Based on what you've told me before: {memory.text}. Is there anything else you'd like to know about this?"
                 else:
                     return "I don't have that specific information in my memory yet. Feel free to tell me about it, and I'll remember it for future reference!"
-            elif any(word in message_lower for word in ["remember", "remind", "recall"]):
-                # Look for reminder-related memories
-                memory_results = self.memory_store.ask(user_message, limit=5)
-                if memory_results:
-                    reminders = []
-                    for memory, score in memory_results[:3]:
-                        if any(keyword in memory.text.lower() for keyword in ["meeting", "appointment", "deadline", "need to", "have to", "should", "must", "call", "email", "finish", "complete"]):
-                            reminders.append(f"- {memory.text}")
-                    if reminders:
-                        return f"Here are some things I can remind you about:\n" + "\n".join(reminders)
+            elif "en_remind" in categories:
+                # Look for upcoming reminders
+                reminders = [f"- {r.memory.text}" for r in self._upcoming_reminders()]
+                if reminders:
+                    return f"Here are some things I can remind you about:\n" + "\n".join(reminders)
                 return "I'd be happy to help you remember things! I store everything you tell me, and you can ask me about your memories anytime. What would you like me to help you remember?"
-            elif any(word in message_lower for word in ["thank", "thanks"]):
+            elif "en_thanks" in categories:
                 return "You're very welcome! I'm always happy to help. Is there anything else I can assist you with?"
-            elif any(word in message_lower for word in ["goodbye", "bye", "see you"]):
+            elif "en_goodbye" in categories:
                 return "Goodbye! It was great talking with you. Feel free to come back anytime - I'll be here whenever you need help remembering something or have questions!"
             else:
                 # Search for relevant information
-                memory_results = self.memory_store.ask(user_message, limit=3)
+                memory_results = self.memory_store.ask(match_query(user_message), limit=3)
                 if memory_results:
                     memory, score = memory_results[0]
                     return f"Based on what you've shared with me: {memory.text}. Would you like to know more about this or is there something else I can help you with?"
                 else:
                     return "I've stored that information for you! I'm here to help with whatever you need. What else can I assist you with today?"
     
-    def _get_relevant_reminders(self, user_message: str) -> str:
+    def _upcoming_reminders(self, limit: int = 3) -> list:
         """
-        Get relevant reminders based on user's memories
+        Get reminders due within the reminder window, soonest first
         """
         try:
-            # Search for task-related memories
-            memory_results = self.memory_store.ask(user_message, limit=10)
-            
-            # Keywords that indicate tasks or reminders
-            task_keywords = [
-                "meeting", "appointment", "deadline", "need to", "have to", "should", "must",
-                "call", "email", "finish", "complete", "submit", "due", "tomorrow", "next week",
-                "họp", "cuộc hẹn", "hạn chót", "cần làm", "phải làm", "gọi", "gửi email",
-                "hoàn thành", "nộp", "ngày mai", "tuần sau"
-            ]
-            
-            reminders = []
-            for memory, score in memory_results[:5]:  # Check top 5 most relevant
-                memory_lower = memory.text.lower()
-                if any(keyword in memory_lower for keyword in task_keywords):
-                    reminders.append(f"By the way, you mentioned: {memory.text}")
-            
-            if reminders:
-                return "\n".join(reminders[:3])  # Return top 3 reminders
-            return ""
-            
+            return self.memory_store.upcoming_reminders(within=REMINDER_WINDOW, limit=limit)
         except Exception as e:
             print(f"Error getting reminders: {e}")
-            return ""
+            return []
+    
+    def _get_relevant_reminders(self, user_message: str) -> str:
+        """
+        Get relevant reminders based on user's memories
+        """
+        reminders = [f"By the way, you mentioned: {r.memory.text}" for r in self._upcoming_reminders()]
+        return "\n".join(reminders)
 
     def is_available(self) -> bool:
         """Check if AI is available"""
@@ -1,14 +1,31 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
-from .memory_store import MemoryStore, Memory
+from .config import get_env_int
+from .memory_store import Memory
+from .serialization import JSONBytesResponse, conditional_json, memory_encoder
+from .static_assets import parse_accept_encoding
+from .writer import open_store, run_workers
 
 app = FastAPI(title="MyAssistant API", version="0.1.0")
-store = MemoryStore()
+# Writes go through the shared writer process when running several workers;
+# each worker imports this module after the launcher has started the writer
+store = open_store()
+
+# Bulk transfer: at most this much of a request body or export is held at once
+MAX_LINE_BYTES = 1 << 20
+EXPORT_BATCH = 500
+MAX_IMPORT_ERRORS = 20
 
 
 class RememberRequest(BaseModel):
@@ -46,33 +63,200 @@ class AskResponse(BaseModel):
 	results: List[AskResponseItem]
 
 
+# The models below document the responses; the bodies themselves are built
+# from each memory's cached JSON (see serialization.MemoryEncoder) rather
+# than validated and encoded through pydantic on every request
+
+
+def _check_same_request(memory: Memory, req: RememberRequest) -> None:
+	"""422 if an Idempotency-Key comes back with a different body than it was first used with."""
+	if (memory.text, memory.tags, memory.source) != (req.text, " ".join(req.tags or []), req.source or ""):
+		raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+
+
 @app.post("/remember", response_model=MemoryResponse)
-def remember(req: RememberRequest) -> MemoryResponse:
-	memory_id = store.remember(req.text, req.tags or [], req.source or "")
-	for m in store.list_recent(limit=1):
-		if m.id == memory_id:
-			return MemoryResponse.from_memory(m)
-	raise HTTPException(status_code=500, detail="Failed to fetch created memory")
+def remember(req: RememberRequest, idempotency_key: Optional[str] = Header(None)) -> JSONBytesResponse:
+	"""Store a memory; a retry with the same Idempotency-Key returns the first result."""
+	key = f"http:{idempotency_key}" if idempotency_key else None
+	earlier = store.replay(key) if key else None
+	if earlier is not None:
+		_check_same_request(earlier[0], req)
+		return JSONBytesResponse(memory_encoder.as_json(earlier[0]), headers={"Idempotent-Replayed": "true"})
+	# The stored row comes back from the insert itself, not a second query
+	memory = store.remember_memory(req.text, req.tags or [], req.source or "", idempotency_key=key)
+	if key:
+		# A concurrent request with the same key may have stored first
+		_check_same_request(memory, req)
+	return JSONBytesResponse(memory_encoder.as_json(memory))
 
 
 @app.get("/recent", response_model=List[MemoryResponse])
-def recent(limit: int = 20) -> List[MemoryResponse]:
-	return [MemoryResponse.from_memory(m) for m in store.list_recent(limit=limit)]
+def recent(request: Request, limit: int = 20) -> Response:
+	return conditional_json(
+		request, store.generation(), lambda: memory_encoder.list_json(store.list_recent(limit=limit))
+	)
 
 
 @app.get("/ask", response_model=AskResponse)
-def ask(q: str, limit: int = 5) -> AskResponse:
-	pairs = store.ask(q, limit=limit)
-	return AskResponse(
-		results=[
-			AskResponseItem(memory=MemoryResponse.from_memory(m), score=score)
-			for m, score in pairs
-		]
+def ask(request: Request, q: str, limit: int = 5) -> Response:
+	# Answers only change when memories do, so polling clients revalidate for one cheap query
+	return conditional_json(
+		request, store.generation(), lambda: memory_encoder.scored_json(store.ask(q, limit=limit))
 	)
 
 
 @app.delete("/memories/{memory_id}")
 def delete(memory_id: int) -> dict:
 	store.delete(memory_id)
+	memory_encoder.forget(memory_id)
 	return {"ok": True}
 
+
+class LineTooLong(ValueError):
+	pass
+
+
+def _gunzip(decompressor, chunk: bytes) -> Iterator[bytes]:
+	# Bounded output per step, so a small compressed body cannot expand all at once
+	data = decompressor.decompress(chunk, MAX_LINE_BYTES)
+	while data:
+		yield data
+		data = decompressor.decompress(decompressor.unconsumed_tail, MAX_LINE_BYTES)
+
+
+async def _body_lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+	"""(line number, line) pairs of the request body, read as the chunks arrive."""
+	gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+	decompressor = zlib.decompressobj(wbits=31) if gzipped else None
+	buffer = b""
+	number = 0
+	async for chunk in request.stream():
+		for data in _gunzip(decompressor, chunk) if decompressor is not None else [chunk]:
+			lines = (buffer + data).split(b"\n")
+			buffer = lines.pop()
+			if len(buffer) > MAX_LINE_BYTES:
+				raise LineTooLong(f"Line {number + len(lines) + 1} is longer than {MAX_LINE_BYTES} bytes")
+			for line in lines:
+				number += 1
+				yield number, line
+	if buffer:
+		yield number + 1, buffer
+
+
+def _import_record(line: bytes) -> dict:
+	record = json.loads(line)
+	if not isinstance(record, dict):
+		raise ValueError("Expected a JSON object")
+	if not isinstance(record.get("text"), str) or not record["text"].strip():
+		raise ValueError("Memory text cannot be empty")
+	for field in ("created_at", "source", "language"):
+		if record.get(field) is not None and not isinstance(record[field], str):
+			raise ValueError(f"{field} must be a string")
+	tags = record.get("tags")
+	if tags is not None and not isinstance(tags, str):
+		if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+			raise ValueError("tags must be a string or a list of strings")
+	if record.get("created_at"):
+		datetime.fromisoformat(record["created_at"])
+	return record
+
+
+@app.post("/memories:import")
+async def import_memories(request: Request) -> dict:
+	"""Store memories from an NDJSON body (one export row per line), committed in batches.
+
+	Lines that are not valid memories are skipped and reported; everything
+	before an oversized line stays imported.
+	"""
+	batch_size = get_env_int("ASSISTANT_IMPORT_BATCH_SIZE", 500)
+	batch: List[dict] = []
+	result = {"imported": 0, "batches": 0, "skipped": 0, "errors": []}
+
+	async def flush() -> None:
+		try:
+			ids = await run_in_threadpool(store.import_memories, batch)
+		except Exception as e:
+			# This batch was rolled back; earlier ones stay imported
+			raise HTTPException(status_code=500, detail={"error": f"Import failed: {e}", "imported": result["imported"]}) from e
+		result["imported"] += len(ids)
+		result["batches"] += 1
+		batch.clear()
+
+	try:
+		async for number, line in _body_lines(request):
+			if not line.strip():
+				continue
+			try:
+				batch.append(_import_record(line))
+			except ValueError as e:
+				result["skipped"] += 1
+				if len(result["errors"]) < MAX_IMPORT_ERRORS:
+					result["errors"].append({"line": number, "error": str(e)})
+				continue
+			if len(batch) >= batch_size:
+				await flush()
+	except LineTooLong as e:
+		raise HTTPException(status_code=413, detail={"error": str(e), "imported": result["imported"]}) from e
+	except zlib.error as e:
+		raise HTTPException(status_code=400, detail={"error": f"Bad gzip body: {e}", "imported": result["imported"]}) from e
+	if batch:
+		await flush()
+	return result
+
+
+async def _export_lines() -> AsyncIterator[bytes]:
+	after_id = 0
+	while True:
+		memories = await run_in_threadpool(store.export_batch, after_id, EXPORT_BATCH)
+		if not memories:
+			return
+		after_id = memories[-1].id
+		yield b"".join(memory_encoder.as_json(m) + b"\n" for m in memories)
+
+
+async def _gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+	compressor = zlib.compressobj(wbits=31)
+	async for chunk in chunks:
+		data = compressor.compress(chunk)
+		if data:
+			yield data
+	yield compressor.flush()
+
+
+@app.get("/memories:export")
+def export_memories(request: Request) -> StreamingResponse:
+	"""Stream every memory as NDJSON, oldest first, gzipped if the client accepts it.
+
+	Rows are read in id-ordered pages, so memory use does not grow with the corpus.
+	"""
+	headers = {"Vary": "Accept-Encoding", "Content-Disposition": 'attachment; filename="memories.ndjson"'}
+	body = _export_lines()
+	if parse_accept_encoding(request.headers.get("accept-encoding", "")).get("gzip", 0) > 0:
+		headers["Content-Encoding"] = "gzip"
+		body = _gzip_stream(body)
+	return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+
+def create_app() -> FastAPI:
+	"""App factory for uvicorn workers (uvicorn --factory myassistant.api:create_app)"""
+	return app
+
+
+def main() -> None:
+	"""Serve the API on PORT (default 8000).
+
+	ASSISTANT_WORKERS > 1 (0 for one per CPU) serves from several processes
+	that share one writer process for the database.
+	"""
+	port = int(os.environ.get("PORT", 8000))
+	workers = get_env_int("ASSISTANT_WORKERS", 1) or os.cpu_count() or 1
+	if workers > 1:
+		run_workers("myassistant.api:create_app", workers, host="127.0.0.1", port=port)
+		return
+	import uvicorn
+
+	uvicorn.run(app, host="127.0.0.1", port=port)
+
+
+if __name__ == "__main__":
+	main()
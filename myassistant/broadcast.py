@@ -0,0 +1,125 @@
+"""
+Fan-out of memory events to every connected web client
+Each subscriber has its own bounded queue drained by its own task, so a
+slow or stuck client only ever delays itself: publishing never awaits a
+socket. Updates that supersede each other (the memory count) replace the
+queued one; when a queue overflows it is dropped and the client is told
+to resync from the REST endpoints instead
+"""
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from .config import get_env_int
+from .serialization import dumps_str
+
+SendFn = Callable[[str], Awaitable[None]]
+CloseFn = Callable[[], Awaitable[None]]
+
+RESYNC = dumps_str({"type": "resync"})
+
+
+class Subscriber:
+    def __init__(
+        self,
+        send: SendFn,
+        max_queue: int,
+        send_timeout: float,
+        on_close: Callable[["Subscriber"], None],
+        close_socket: Optional[CloseFn] = None,
+    ):
+        self.send = send
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.on_close = on_close
+        self.close_socket = close_socket
+        self.queue: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.overflowed = False
+        self.dropped = 0
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+        self._seq = itertools.count()
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, payload: str, coalesce: Optional[str] = None):
+        if coalesce is not None and coalesce in self.queue:
+            self.coalesced += 1
+            del self.queue[coalesce]
+        elif len(self.queue) >= self.max_queue:
+            # Too far behind to catch up frame by frame
+            self.dropped += len(self.queue) + 1
+            self.queue.clear()
+            self.overflowed = True
+            self._ready.set()
+            return
+        self.queue[coalesce if coalesce is not None else next(self._seq)] = payload
+        self._ready.set()
+
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.overflowed or self.queue:
+                    if self.overflowed:
+                        self.overflowed = False
+                        payload = RESYNC
+                    else:
+                        _, payload = self.queue.popitem(last=False)
+                    await asyncio.wait_for(self.send(payload), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Closed socket or a client that stopped reading
+            print(f"Broadcast subscriber dropped: {e!r}")
+            if self.close_socket is not None:
+                try:
+                    await asyncio.wait_for(self.close_socket(), self.send_timeout)
+                except Exception:
+                    pass
+            self.on_close(self)
+
+    def close(self):
+        self._task.cancel()
+
+
+class BroadcastHub:
+    """Publishes events to all subscribed websockets without waiting on any of them"""
+
+    def __init__(self, max_queue: Optional[int] = None, send_timeout: Optional[float] = None):
+        self.max_queue = max_queue or get_env_int("ASSISTANT_BROADCAST_QUEUE", 64)
+        self.send_timeout = send_timeout or get_env_int("ASSISTANT_BROADCAST_SEND_TIMEOUT_SECONDS", 10)
+        self.subscribers: Dict[int, Subscriber] = {}
+        self.published = 0
+
+    def subscribe(self, send: SendFn, close_socket: Optional[CloseFn] = None) -> Subscriber:
+        """close_socket is called when the subscriber is dropped, so the client reconnects"""
+        subscriber = Subscriber(send, self.max_queue, self.send_timeout, self.unsubscribe, close_socket)
+        self.subscribers[id(subscriber)] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if self.subscribers.pop(id(subscriber), None) is not None:
+            subscriber.close()
+
+    def publish(self, event: dict, coalesce: Optional[str] = None):
+        """Queue event for every subscriber; coalesce names events where only the newest matters"""
+        payload = dumps_str(event)
+        self.published += 1
+        for subscriber in list(self.subscribers.values()):
+            subscriber.put(payload, coalesce)
+
+    def close(self):
+        for subscriber in list(self.subscribers.values()):
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        subscribers = list(self.subscribers.values())
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "queued": sum(len(s.queue) for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+            "coalesced": sum(s.coalesced for s in subscribers),
+        }
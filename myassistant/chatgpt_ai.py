@@ -1,111 +1,340 @@
 """
 Simple ChatGPT Integration for MyAssistant
 """
+import asyncio
 import os
-from typing import Optional
-from openai import OpenAI
-from dotenv import load_dotenv
+import threading
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from .config import get_env_int
+from .context_builder import ContextBuilder, fit_turns
+from .llm_dispatch import BACKGROUND, INTERACTIVE, get_dispatcher
+from .response_cache import get_cache, make_key
+from .sessions import DEFAULT_SESSION, Session, SessionManager
+from .singleflight import llm_async_flights, llm_flights
+from .summarizer import extractive_summary, fold_history
 
-load_dotenv()
+MODEL = "gpt-3.5-turbo"  # Using GPT-3.5 for cost efficiency
+
+NO_API_KEY_MESSAGE = "I'm sorry, but I need an OpenAI API key to work. Please set OPENAI_API_KEY in your .env file."
+CONNECTION_ERROR_MESSAGE = "I'm sorry, I'm having trouble connecting right now. Please try again in a moment."
+
+# How add_memory acknowledges (ASSISTANT_ACK_MODE)
+ACK_MODES = ("local", "batch", "llm")
+LOCAL_ACKS = [
+    "I've noted that information for you.",
+    "Got it, I'll remember that.",
+    "Saved. Ask me about it any time.",
+]
+
+SYSTEM_PROMPT = """You are MyAssistant, a helpful AI assistant with access to the user's personal memories.
+
+CRITICAL INSTRUCTIONS:
+1. ALWAYS answer questions based on the memories provided below
+2. If the user asks a question, look through the memories to find the answer
+3. If you find relevant information in the memories, respond with: "Based on what you told me: [exact information from memory]"
+4. If you don't find relevant information in the memories, say: "I don't have that information in my memory"
+5. Do NOT repeat the user's question back to them
+6. Be helpful and conversational, but always base your answers on the stored memories
+7. Keep responses concise and direct
+
+"""
 
 class ChatGPTAssistant:
-    def __init__(self):
+    def __init__(self, sessions: Optional[SessionManager] = None):
+        # Imported here so the package loads without openai until this engine is used
+        from dotenv import load_dotenv
+        from openai import AsyncOpenAI, OpenAI
+        
+        load_dotenv()
         self.client: Optional[OpenAI] = None
-        self.conversation_history = []
+        self.async_client: Optional[AsyncOpenAI] = None
+        # Each session keeps its last 20 messages
+        self.sessions = sessions if sessions is not None else SessionManager(max_turns=20)
+        self.context_builder = ContextBuilder()
+        self.history_tokens = get_env_int("ASSISTANT_HISTORY_TOKENS", 400)
+        self.dispatcher = get_dispatcher()
+        
+        # Older turns are folded into a per-session summary
+        self.summary_mode = os.getenv("ASSISTANT_SUMMARY_MODE", "extractive").strip().lower()
+        self.summary_trigger_tokens = get_env_int("ASSISTANT_SUMMARY_TRIGGER_TOKENS", 600)
+        self.summary_keep_turns = get_env_int("ASSISTANT_SUMMARY_KEEP_TURNS", 6)
+        self.summary_tokens = get_env_int("ASSISTANT_SUMMARY_TOKENS", 150)
+        
+        # Memory acknowledgements; see add_memory
+        self.ack_mode = os.getenv("ASSISTANT_ACK_MODE", "local").strip().lower()
+        if self.ack_mode not in ACK_MODES:
+            raise ValueError(f"Unknown ASSISTANT_ACK_MODE '{self.ack_mode}'. Available: {', '.join(ACK_MODES)}")
+        self.ack_batch_size = get_env_int("ASSISTANT_ACK_BATCH_SIZE", 5)
+        self.ack_batch_seconds = get_env_int("ASSISTANT_ACK_BATCH_SECONDS", 10)
+        self.ack_stats = {"memories": 0, "completions": 0}
+        self._pending_acks: Dict[str, List[str]] = {}
+        self._ack_timers: Dict[str, threading.Timer] = {}
+        self._ack_lock = threading.Lock()
         
         # Initialize OpenAI client
         api_key = os.getenv("OPENAI_API_KEY")
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            # Retries are left to the dispatcher
+            self.client = OpenAI(api_key=api_key, max_retries=0)
+            self.async_client = AsyncOpenAI(api_key=api_key, max_retries=0)
             print("ChatGPT client initialized successfully")
         else:
             print("OPENAI_API_KEY not found. Please set your API key in .env file")
     
-    def get_response(self, user_message: str, memory_store=None) -> str:
+    def get_response(self, user_message: str, memory_store=None, session_id: str = DEFAULT_SESSION) -> str:
         """
         Get response from ChatGPT using stored memories
         """
         if not self.client:
-            return "I'm sorry, but I need an OpenAI API key to work. Please set OPENAI_API_KEY in your .env file."
+            return NO_API_KEY_MESSAGE
         
         try:
-            # Get relevant memories for context
-            memory_context = ""
-            if memory_store:
-                # Search for relevant memories based on the user's question
-                memory_results = memory_store.ask(user_message, limit=5)
-                if memory_results:
-                    memory_context = "Here are relevant memories from the user:\n"
-                    for memory, score in memory_results:
-                        memory_context += f"- {memory.text}\n"
-                else:
-                    # If no specific matches, get recent memories
-                    recent_memories = memory_store.list_recent(limit=3)
-                    if recent_memories:
-                        memory_context = "Here are recent memories from the user:\n"
-                        for memory in recent_memories:
-                            memory_context += f"- {memory.text}\n"
+            session = self.sessions.get(session_id)
+            messages, memory_ids = self._build_messages(user_message, memory_store, session)
             
-            # Create system message with memory context
-            system_content = """You are MyAssistant, a helpful AI assistant with access to the user's personal memories.
-
-CRITICAL INSTRUCTIONS:
-1. ALWAYS answer questions based on the memories provided below
-2. If the user asks a question, look through the memories to find the answer
-3. If you find relevant information in the memories, respond with: "Based on what you told me: [exact information from memory]"
-4. If you don't find relevant information in the memories, say: "I don't have that information in my memory"
-5. Do NOT repeat the user's question back to them
-6. Be helpful and conversational, but always base your answers on the stored memories
-7. Keep responses concise and direct
-
-""" + (memory_context if memory_context else "No memories available yet.")
-
-            system_message = {
-                "role": "system", 
-                "content": system_content
-            }
+            # Repeated questions over the same memories are answered from the cache
+            cache = get_cache(memory_store.db_path) if memory_store else None
+            cache_key = self._cache_key(user_message, messages, memory_ids, session)
+            cached = cache.get(cache_key) if cache else None
+            if cached is not None:
+                session.add({"role": "assistant", "content": cached})
+                return cached
             
-            # Add user message to conversation history
-            self.conversation_history.append({"role": "user", "content": user_message})
+            # Concurrent identical questions share one ChatGPT call
+            ai_response = llm_flights.do(cache_key, self._complete, messages, cache, cache_key)
             
-            # Prepare messages for ChatGPT
-            messages = [system_message] + self.conversation_history[-5:]  # Keep last 5 messages for context
+            # Add AI response to conversation history
+            session.add({"role": "assistant", "content": ai_response})
             
-            # Get response from ChatGPT
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Using GPT-3.5 for cost efficiency
-                messages=messages,
-                max_tokens=200,
-                temperature=0.3  # Lower temperature for more consistent, memory-based responses
-            )
+            return ai_response
             
-            # Extract response
-            ai_response = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"ChatGPT API error: {e}")
+            return CONNECTION_ERROR_MESSAGE
+    
+    async def astream_response(self, user_message: str, memory_store=None, session_id: str = DEFAULT_SESSION) -> AsyncIterator[str]:
+        """
+        Stream the ChatGPT response token by token
+        """
+        if not self.async_client:
+            yield NO_API_KEY_MESSAGE
+            return
+        
+        parts = []
+        try:
+            session = self.sessions.get(session_id)
+            messages, memory_ids = await asyncio.to_thread(self._build_messages, user_message, memory_store, session)
             
-            # Add AI response to conversation history
-            self.conversation_history.append({"role": "assistant", "content": ai_response})
+            cache = get_cache(memory_store.db_path) if memory_store else None
+            cache_key = self._cache_key(user_message, messages, memory_ids, session)
+            cached = await asyncio.to_thread(cache.get, cache_key) if cache else None
+            if cached is not None:
+                session.add({"role": "assistant", "content": cached})
+                yield cached
+                return
             
-            # Keep conversation history manageable (last 20 messages)
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
+            # The same question is already streaming for another session: share its answer
+            in_flight = llm_async_flights.claim(cache_key)
+            if in_flight is not None:
+                ai_response = await llm_async_flights.wait(in_flight)
+                session.add({"role": "assistant", "content": ai_response})
+                yield ai_response
+                return
             
-            return ai_response
+            try:
+                # The dispatcher slot is held until the stream is consumed
+                async with self.dispatcher.aslot():
+                    stream = await self.dispatcher.aretry(
+                        self.async_client.chat.completions.create,
+                        model=MODEL,
+                        messages=messages,
+                        max_tokens=200,
+                        temperature=0.3,
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+                
+                ai_response = "".join(parts).strip()
+                session.add({"role": "assistant", "content": ai_response})
+                if cache:
+                    await asyncio.to_thread(cache.put, cache_key, MODEL, ai_response)
+                llm_async_flights.finish(cache_key, ai_response)
+            finally:
+                # No-op after success; otherwise releases waiting sessions with an error
+                llm_async_flights.finish(cache_key, error=RuntimeError("ChatGPT stream did not complete"))
             
         except Exception as e:
             print(f"ChatGPT API error: {e}")
-            return "I'm sorry, I'm having trouble connecting right now. Please try again in a moment."
+            if not parts:
+                yield CONNECTION_ERROR_MESSAGE
+    
+    def _cache_key(self, user_message: str, messages: list, memory_ids: List[int], session: Session) -> str:
+        """
+        Key for the cache and for sharing in-flight calls: the question, the
+        memories in context and the conversation sent with it (the turns
+        before the question and the summary), so answers never cross sessions
+        """
+        return make_key(MODEL, user_message, memory_ids, history=messages[1:-1], summary=session.summary)
+    
+    def _complete(self, messages: list, cache, cache_key: str) -> str:
+        """
+        Run one ChatGPT completion and cache its answer
+        """
+        response = self.dispatcher.call(
+            self.client.chat.completions.create,
+            model=MODEL,
+            messages=messages,
+            max_tokens=200,
+            temperature=0.3  # Lower temperature for more consistent, memory-based responses
+        )
+        
+        ai_response = response.choices[0].message.content.strip()
+        if cache:
+            cache.put(cache_key, MODEL, ai_response)
+        return ai_response
+    
+    def _build_messages(self, user_message: str, memory_store, session: Session) -> Tuple[list, List[int]]:
+        """
+        Build the prompt from stored memories and the session's recent turns;
+        also returns the ids of the memories in context
+        """
+        # Relevant and recent memories, packed into the context token budget
+        memory_context = ""
+        memory_ids: List[int] = []
+        if memory_store:
+            context = self.context_builder.build(memory_store, user_message, recent_limit=3)
+            memory_ids = context.memory_ids
+            if context.text:
+                memory_context = "Here are relevant memories from the user:\n" + context.text + "\n"
+        
+        # Create system message with memory context
+        system_message = {
+            "role": "system", 
+            "content": SYSTEM_PROMPT + (memory_context if memory_context else "No memories available yet.")
+        }
+        
+        # Add user message to this client's conversation history
+        session.add({"role": "user", "content": user_message})
+        fold_history(
+            session,
+            self.summary_trigger_tokens,
+            self.summary_keep_turns,
+            self.summary_tokens,
+            summarize=self._llm_summary if self.summary_mode == "llm" and self.client else None,
+        )
+        if session.summary:
+            system_message["content"] += "\nSummary of the earlier conversation:\n" + session.summary
+        
+        # Prepare messages for ChatGPT: the last 5 messages, within the history budget
+        return [system_message] + fit_turns(session.turns, self.history_tokens, max_turns=5), memory_ids
+    
+    def _llm_summary(self, turns, previous: str, max_tokens: int) -> str:
+        """
+        Fold turns into the summary with one cheap completion, falling back
+        to the extractive summary
+        The user's answer waits on it, so it is queued as interactive rather
+        than behind every other call
+        """
+        transcript = "\n".join(f"{t.get('role', 'user')}: {t.get('content', '')}" for t in turns)
+        try:
+            response = self.dispatcher.call(
+                self.client.chat.completions.create,
+                priority=INTERACTIVE,
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": "Update the summary of this conversation. Keep names, dates, times and facts the user shared. Reply with the summary only."},
+                    {"role": "user", "content": f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"}
+                ],
+                max_tokens=max_tokens,
+                temperature=0
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Summary error: {e}")
+            return extractive_summary(turns, previous, max_tokens)
+    
+    def add_memory(self, memory_text: str, session_id: str = DEFAULT_SESSION) -> str:
+        """
+        Add a memory to the conversation context and acknowledge it
+        The acknowledgement depends on ack_mode: "local" answers from a
+        template, "batch" does the same and later folds pending memories
+        into one ChatGPT turn, "llm" asks ChatGPT for every memory
+        """
+        session = self.sessions.get(session_id)
+        with self._ack_lock:
+            self.ack_stats["memories"] += 1
+            count = self.ack_stats["memories"]
+        
+        if self.ack_mode == "llm" and self.client:
+            memory_message = f"Please remember this information: {memory_text}"
+            session.add({"role": "user", "content": memory_message})
+            acknowledgment = self._llm_ack(memory_message)
+            if acknowledgment:
+                session.add({"role": "assistant", "content": acknowledgment})
+                return acknowledgment
+            return LOCAL_ACKS[0]
+        
+        if self.ack_mode == "batch" and self.client:
+            self._queue_ack(session_id, memory_text)
+        else:
+            session.add({"role": "user", "content": f"Please remember this information: {memory_text}"})
+        return LOCAL_ACKS[count % len(LOCAL_ACKS)]
     
-    def add_memory(self, memory_text: str):
+    def flush_acks(self, session_id: Optional[str] = None):
         """
-        Add a memory to the conversation context
+        Acknowledge pending batched memories now, for one session or all
         """
-        memory_message = f"Please remember this information: {memory_text}"
-        self.conversation_history.append({"role": "user", "content": memory_message})
+        with self._ack_lock:
+            ids = [session_id] if session_id is not None else list(self._pending_acks)
+            batches = [(sid, self._pending_acks.pop(sid, [])) for sid in ids]
+            for sid in ids:
+                timer = self._ack_timers.pop(sid, None)
+                if timer:
+                    timer.cancel()
         
-        # Get acknowledgment from ChatGPT
+        for sid, memories in batches:
+            if not memories:
+                continue
+            memory_message = "Please remember this information:\n" + "\n".join(f"- {m}" for m in memories)
+            session = self.sessions.get(sid)
+            session.add({"role": "user", "content": memory_message})
+            acknowledgment = self._llm_ack(memory_message)
+            if acknowledgment:
+                session.add({"role": "assistant", "content": acknowledgment})
+    
+    def _queue_ack(self, session_id: str, memory_text: str):
+        """
+        Hold a memory until the batch is full or has waited ack_batch_seconds
+        """
+        with self._ack_lock:
+            pending = self._pending_acks.setdefault(session_id, [])
+            pending.append(memory_text)
+            full = len(pending) >= self.ack_batch_size
+            if not full and session_id not in self._ack_timers:
+                timer = threading.Timer(self.ack_batch_seconds, self.flush_acks, args=(session_id,))
+                timer.daemon = True
+                self._ack_timers[session_id] = timer
+                timer.start()
+        if full:
+            threading.Thread(target=self.flush_acks, args=(session_id,), daemon=True).start()
+    
+    def _llm_ack(self, memory_message: str) -> Optional[str]:
+        """
+        One ChatGPT acknowledgement, queued behind interactive answers
+        """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            with self._ack_lock:
+                self.ack_stats["completions"] += 1
+            response = self.dispatcher.call(
+                self.client.chat.completions.create,
+                priority=BACKGROUND,
+                model=MODEL,
                 messages=[
                     {"role": "system", "content": "You are MyAssistant. Acknowledge that you've received and will remember the information."},
                     {"role": "user", "content": memory_message}
@@ -113,20 +342,28 @@ CRITICAL INSTRUCTIONS:
                 max_tokens=100,
                 temperature=0.7
             )
-            
-            acknowledgment = response.choices[0].message.content.strip()
-            self.conversation_history.append({"role": "assistant", "content": acknowledgment})
-            return acknowledgment
+            return response.choices[0].message.content.strip()
             
         except Exception as e:
             print(f"Error adding memory: {e}")
-            return "I've noted that information for you."
+            return None
+    
+    @property
+    def completions_per_memory(self) -> float:
+        """Acknowledgement completions spent per stored memory"""
+        memories = self.ack_stats["memories"]
+        return self.ack_stats["completions"] / memories if memories else 0.0
     
     def is_available(self) -> bool:
         """Check if ChatGPT is available"""
         return self.client is not None
     
-    def clear_history(self):
+    @property
+    def conversation_history(self) -> list:
+        """Messages of the default session"""
+        return self.sessions.history(DEFAULT_SESSION)
+    
+    def clear_history(self, session_id: str = DEFAULT_SESSION):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.sessions.clear(session_id)
         print("Conversation history cleared")
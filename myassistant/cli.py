@@ -52,6 +52,17 @@ def cmd_list(args: argparse.Namespace) -> int:
 	return 0
 
 
+def cmd_chat(args: argparse.Namespace) -> int:
+	# Engines (and their dependencies) are only imported when chatting
+	from .engines import EngineRegistry
+
+	store = MemoryStore()
+	names = [n.strip() for n in args.engine.split(",") if n.strip()] if args.engine else None
+	engine = EngineRegistry(store).chain(names)
+	print(engine.get_response(args.message, store))
+	return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
 	p = argparse.ArgumentParser(prog="assistant", description="Personal memory assistant CLI")
 	sub = p.add_subparsers(dest="cmd", required=True)
@@ -70,6 +81,13 @@ def build_parser() -> argparse.ArgumentParser:
 	p_list = sub.add_parser("list", help="List recent memories")
 	p_list.add_argument("--limit", type=int, default=20, help="Max items")
 	p_list.set_defaults(func=cmd_list)
+
+	p_chat = sub.add_parser("chat", help="Ask a response engine about your memories")
+	p_chat.add_argument("message", help="Message to send")
+	p_chat.add_argument(
+		"--engine", default="", help="Engine names in fallback order, e.g. chatgpt,smart"
+	)
+	p_chat.set_defaults(func=cmd_chat)
 	return p
 
 
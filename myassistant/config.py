@@ -1,4 +1,5 @@
 import os
+import sqlite3
 from pathlib import Path
 
 
@@ -10,3 +11,28 @@ def get_db_path() -> Path:
 	base.mkdir(parents=True, exist_ok=True)
 	return base / "memories.db"
 
+
+def connect_db(path: str) -> sqlite3.Connection:
+	"""Open the database, waiting up to ASSISTANT_DB_BUSY_TIMEOUT_MS for other writers' locks."""
+	conn = sqlite3.connect(path, timeout=get_env_int("ASSISTANT_DB_BUSY_TIMEOUT_MS", 5000) / 1000)
+	# Safe with WAL (set up by MemoryStore) and avoids an fsync per commit
+	conn.execute("PRAGMA synchronous=NORMAL")
+	return conn
+
+
+def get_env_int(name: str, default: int) -> int:
+	value = os.environ.get(name)
+	return int(value) if value else default
+
+
+def get_env_flag(name: str, default: bool = False) -> bool:
+	value = os.environ.get(name)
+	if not value:
+		return default
+	return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_engine_names() -> list[str]:
+	"""Engines to use, in fallback order, e.g. ASSISTANT_ENGINE="chatgpt,smart"."""
+	value = os.environ.get("ASSISTANT_ENGINE", "smart")
+	return [name.strip() for name in value.split(",") if name.strip()]
@@ -0,0 +1,162 @@
+"""
+Token-budgeted context packing for LLM prompts
+Starts from the profile digest (durable facts about the user), then collects
+recent and relevant memories, removes duplicates, ranks them by relevance
+and recency, and fills the rest of the token budget with the best ones
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import get_env_int
+from .memory_store import Memory, MemoryStore, ProfileFact, match_query
+
+# Rough OpenAI rule of thumb; good enough to budget without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text without calling a tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, at a word boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[: max_tokens * CHARS_PER_TOKEN - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + "…"
+
+
+def format_profile(profile: Dict[str, List[ProfileFact]]) -> List[str]:
+    """One line per topic, such as "- Work: works at Acme; is a nurse"."""
+    return [
+        f"- {topic.capitalize()}: " + "; ".join(f.fact for f in facts)
+        for topic, facts in profile.items()
+    ]
+
+
+@dataclass
+class PackedContext:
+    memories: List[Memory] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)
+    tokens: int = 0
+    profile_lines: List[str] = field(default_factory=list)
+    # Memories the profile lines were taken from
+    profile_ids: List[int] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        if not self.profile_lines:
+            return "\n".join(self.lines)
+        return "\n".join(["About the user:"] + self.profile_lines + ["Memories:"] + self.lines)
+
+    @property
+    def memory_ids(self) -> List[int]:
+        ids = dict.fromkeys(self.profile_ids)
+        ids.update(dict.fromkeys(m.id for m in self.memories))
+        return list(ids)
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        budget_tokens: Optional[int] = None,
+        max_memory_tokens: Optional[int] = None,
+        recency_weight: float = 0.3,
+        profile_tokens: Optional[int] = None,
+    ):
+        self.budget_tokens = budget_tokens or get_env_int("ASSISTANT_CONTEXT_TOKENS", 600)
+        self.max_memory_tokens = max_memory_tokens or get_env_int("ASSISTANT_MEMORY_TOKENS", 80)
+        self.recency_weight = recency_weight
+        # Part of the budget the profile digest may use; 0 leaves it out
+        self.profile_tokens = profile_tokens if profile_tokens is not None else get_env_int("ASSISTANT_PROFILE_TOKENS", 150)
+
+    def build(
+        self,
+        memory_store: MemoryStore,
+        query: str,
+        recent_limit: int = 10,
+        search_limit: int = 5,
+    ) -> PackedContext:
+        """Pack the profile digest and the most useful memories for query into the token budget"""
+        profile = memory_store.profile() if self.profile_tokens else {}
+        search_results = memory_store.ask(match_query(query), limit=search_limit)
+        recent = memory_store.list_recent(limit=recent_limit)
+
+        packed = PackedContext()
+        # Memories whose facts made it into the digest in full
+        covered = set()
+        for facts, line in zip(profile.values(), format_profile(profile)):
+            fitted = truncate_to_tokens(line, self.profile_tokens)
+            cost = estimate_tokens(fitted) + 1
+            if packed.tokens + cost > self.profile_tokens:
+                break
+            packed.profile_lines.append(fitted)
+            packed.tokens += cost
+            if fitted == line:
+                covered.update(f.memory_id for f in facts)
+        if packed.profile_lines:
+            packed.profile_ids = sorted(covered)
+            packed.tokens += 6  # the two section headers
+
+        # Recent memories already summed up by the digest need not be sent again
+        recent = [m for m in recent if m.id not in covered]
+        return self.pack(self.rank(search_results, recent), into=packed)
+
+    def rank(
+        self, search_results: Sequence[Tuple[Memory, float]], recent: Sequence[Memory]
+    ) -> List[Memory]:
+        """Deduplicate candidates by id and order them by relevance and recency"""
+        candidates: Dict[int, Memory] = {}
+        relevance: Dict[int, float] = {}
+        # bm25() is negative and lower is better; scale to 0..1 against the best hit
+        best = min((score for _, score in search_results), default=0.0)
+        for memory, score in search_results:
+            candidates[memory.id] = memory
+            relevance[memory.id] = score / best if best < 0 else 1.0
+        for memory in recent:
+            candidates.setdefault(memory.id, memory)
+
+        # Newer memories have higher ids
+        by_age = sorted(candidates)
+        recency = {mid: (i + 1) / len(by_age) for i, mid in enumerate(by_age)}
+
+        def score(memory_id: int) -> float:
+            return (1 - self.recency_weight) * relevance.get(memory_id, 0.0) + self.recency_weight * recency[memory_id]
+
+        return [candidates[mid] for mid in sorted(candidates, key=score, reverse=True)]
+
+    def pack(
+        self,
+        ranked: Sequence[Memory],
+        budget_tokens: Optional[int] = None,
+        into: Optional[PackedContext] = None,
+    ) -> PackedContext:
+        """Add memories in rank order until the budget is spent"""
+        budget = self.budget_tokens if budget_tokens is None else budget_tokens
+        packed = into if into is not None else PackedContext()
+        for memory in ranked:
+            line = f"- {truncate_to_tokens(memory.text, self.max_memory_tokens)}"
+            cost = estimate_tokens(line) + 1
+            if packed.tokens + cost > budget:
+                continue
+            packed.memories.append(memory)
+            packed.lines.append(line)
+            packed.tokens += cost
+        return packed
+
+
+def fit_turns(turns: Sequence[dict], budget_tokens: int, max_turns: int) -> List[dict]:
+    """Newest conversation turns (at most max_turns) that fit the token budget, oldest first"""
+    kept: List[dict] = []
+    used = 0
+    for turn in reversed(list(turns)[-max_turns:]):
+        cost = estimate_tokens(turn.get("content", "")) + 4  # role and message framing
+        if kept and used + cost > budget_tokens:
+            break
+        kept.append(turn)
+        used += cost
+    return list(reversed(kept))
@@ -0,0 +1,214 @@
+"""
+Response engine registry
+Engines are picked by name (see ASSISTANT_ENGINE) and only imported, with
+their dependencies, the first time they are used
+"""
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Protocol
+
+from .config import get_engine_names
+from .memory_store import MemoryStore
+from .sessions import DEFAULT_SESSION, SessionManager
+
+if TYPE_CHECKING:
+    from .ai_response import AIResponseSystem
+
+
+class Engine(Protocol):
+    """Engines may also define astream_response(...) yielding text deltas; see stream_response"""
+
+    def get_response(self, user_message: str, memory_store: MemoryStore = None, session_id: str = DEFAULT_SESSION) -> str:
+        ...
+
+    def is_available(self) -> bool:
+        ...
+
+
+EngineFactory = Callable[[MemoryStore, SessionManager], Engine]
+
+# Receives a better answer that arrived after a local one was already sent
+UpgradeCallback = Callable[[str], Awaitable[None]]
+
+
+class AIResponseEngine:
+    """Adapts AIResponseSystem, which is bound to a store and takes a language, to the Engine protocol
+
+    Calls are answered from the store they pass, with one system per
+    database. The system keeps no conversation, so session_id has no effect:
+    every session gets the same answer to the same question.
+    """
+
+    # Streams may answer locally on a slow LLM and upgrade later
+    upgrades = True
+    # No per-session history (see above)
+    sessions = False
+
+    def __init__(self, memory_store: MemoryStore):
+        self.system = self._new_system(memory_store)
+        self._systems: Dict[str, "AIResponseSystem"] = {memory_store.db_path: self.system}
+
+    @staticmethod
+    def _new_system(memory_store: MemoryStore) -> "AIResponseSystem":
+        from .ai_response import AIResponseSystem
+        return AIResponseSystem(memory_store)
+
+    def _system_for(self, memory_store: Optional[MemoryStore]) -> "AIResponseSystem":
+        if memory_store is None:
+            return self.system
+        system = self._systems.get(memory_store.db_path)
+        if system is None:
+            system = self._systems[memory_store.db_path] = self._new_system(memory_store)
+        return system
+
+    def get_response(
+        self,
+        user_message: str,
+        memory_store: MemoryStore = None,
+        session_id: str = DEFAULT_SESSION,
+        on_upgrade: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        return self._system_for(memory_store).get_response(user_message, on_upgrade=on_upgrade)
+
+    def astream_response(
+        self,
+        user_message: str,
+        memory_store: MemoryStore = None,
+        session_id: str = DEFAULT_SESSION,
+        on_upgrade: Optional[UpgradeCallback] = None,
+    ) -> AsyncIterator[str]:
+        return self._system_for(memory_store).astream_response(user_message, on_upgrade=on_upgrade)
+
+    def is_available(self) -> bool:
+        return self.system.is_available()
+
+
+def _smart(store: MemoryStore, sessions: SessionManager) -> Engine:
+    from .smart_ai import SmartAI
+    return SmartAI(sessions=sessions)
+
+
+def _local(store: MemoryStore, sessions: SessionManager) -> Engine:
+    from .local_ai import LocalAI
+    return LocalAI(sessions=sessions)
+
+
+def _chatgpt(store: MemoryStore, sessions: SessionManager) -> Engine:
+    from .chatgpt_ai import ChatGPTAssistant
+    return ChatGPTAssistant(sessions=sessions)
+
+
+def _openai(store: MemoryStore, sessions: SessionManager) -> Engine:
+    return AIResponseEngine(store)
+
+
+ENGINE_FACTORIES: Dict[str, EngineFactory] = {
+    "smart": _smart,
+    "local": _local,
+    "chatgpt": _chatgpt,
+    "openai": _openai,
+}
+
+
+async def stream_response(
+    engine: Engine,
+    user_message: str,
+    memory_store: MemoryStore = None,
+    session_id: str = DEFAULT_SESSION,
+    on_upgrade: Optional[UpgradeCallback] = None,
+) -> AsyncIterator[str]:
+    """Yield text deltas from an engine; engines without streaming answer in one piece off the event loop
+
+    on_upgrade is only passed to engines that declare upgrades = True
+    """
+    astream = getattr(engine, "astream_response", None)
+    if astream is None:
+        yield await asyncio.to_thread(engine.get_response, user_message, memory_store, session_id)
+        return
+    if getattr(engine, "upgrades", False):
+        deltas = astream(user_message, memory_store, session_id, on_upgrade=on_upgrade)
+    else:
+        deltas = astream(user_message, memory_store, session_id)
+    async for delta in deltas:
+        yield delta
+
+
+def register_engine(name: str, factory: EngineFactory) -> None:
+    """Make an engine available by name"""
+    ENGINE_FACTORIES[name] = factory
+
+
+class EngineChain:
+    """Tries engines in order, skipping unavailable ones and falling through on errors"""
+
+    def __init__(self, registry: "EngineRegistry", names: List[str]):
+        self.registry = registry
+        self.names = names
+
+    def get_response(self, user_message: str, memory_store: MemoryStore = None, session_id: str = DEFAULT_SESSION) -> str:
+        last_error: Optional[Exception] = None
+        for name in self.names:
+            try:
+                engine = self.registry.get(name)
+                if not engine.is_available():
+                    continue
+                return engine.get_response(user_message, memory_store, session_id)
+            except Exception as e:
+                print(f"Engine '{name}' failed: {e}")
+                last_error = e
+        if last_error:
+            raise last_error
+        raise RuntimeError(f"No available engine in {self.names}")
+
+    async def astream_response(
+        self,
+        user_message: str,
+        memory_store: MemoryStore = None,
+        session_id: str = DEFAULT_SESSION,
+        on_upgrade: Optional[UpgradeCallback] = None,
+    ) -> AsyncIterator[str]:
+        last_error: Optional[Exception] = None
+        for name in self.names:
+            streamed = False
+            try:
+                engine = self.registry.get(name)
+                if not engine.is_available():
+                    continue
+                async for delta in stream_response(engine, user_message, memory_store, session_id, on_upgrade):
+                    streamed = True
+                    yield delta
+                return
+            except Exception as e:
+                # Once text has reached the client there is no clean way to switch engines
+                if streamed:
+                    raise
+                print(f"Engine '{name}' failed: {e}")
+                last_error = e
+        if last_error:
+            raise last_error
+        raise RuntimeError(f"No available engine in {self.names}")
+
+    def is_available(self) -> bool:
+        return any(self.registry.get(name).is_available() for name in self.names)
+
+
+class EngineRegistry:
+    """Creates each named engine once, on first use, and shares it across callers"""
+
+    def __init__(self, store: MemoryStore, sessions: Optional[SessionManager] = None):
+        self.store = store
+        self.sessions = sessions if sessions is not None else SessionManager()
+        self._engines: Dict[str, Engine] = {}
+
+    def get(self, name: str) -> Engine:
+        engine = self._engines.get(name)
+        if engine is None:
+            factory = ENGINE_FACTORIES.get(name)
+            if factory is None:
+                raise KeyError(f"Unknown engine '{name}'. Available: {', '.join(ENGINE_FACTORIES)}")
+            engine = factory(self.store, self.sessions)
+            self._engines[name] = engine
+        return engine
+
+    def chain(self, names: Optional[List[str]] = None) -> EngineChain:
+        """Engines in fallback order; defaults to ASSISTANT_ENGINE"""
+        return EngineChain(self, names or get_engine_names())
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime, time, timedelta, timezone
+from typing import FrozenSet, List, Optional, Tuple
+
+from .keyword_matcher import KeywordMatcher
+
+FACT_KINDS = ("phone", "room", "date", "time", "name")
+
+_MONTHS = (
+	"january", "february", "march", "april", "may", "june", "july", "august",
+	"september", "october", "november", "december",
+)
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_MONTH_RE = (
+	r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+	r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?"
+)
+
+PHONE_RE = re.compile(r"(?<![\w-])\+?\d[\d .()-]{5,}\d(?![\w-])")
+ISO_DATE_RE = re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b")
+ROOM_RE = re.compile(
+	r"\b(?:room|rm\.?|phòng)\s+(?:number\s+)?(?:is\s+)?(?:no\.?\s*|#)?([a-z]?\d+[a-z]?)\b",
+	re.IGNORECASE,
+)
+DATE_RES = (
+	ISO_DATE_RE,
+	re.compile(r"\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"),
+	re.compile(rf"\b{_MONTH_RE}\s+\d{{1,2}}(?:st|nd|rd|th)?\b", re.IGNORECASE),
+	re.compile(rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH_RE}(?=\s|$|[.,!?])", re.IGNORECASE),
+	re.compile(
+		r"\b(?:(?:next|this|on)\s+)?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+		re.IGNORECASE,
+	),
+	re.compile(r"\b(?:today|tonight|tomorrow|yesterday|next week|next month)\b", re.IGNORECASE),
+	re.compile(r"(?<!\w)(?:hôm nay|ngày mai|hôm qua|tuần sau|tháng sau)(?!\w)", re.IGNORECASE),
+)
+TIME_RES = (
+	re.compile(r"\b\d{1,2}(?::\d{2})?\s*(?:a\.?m\.?|p\.?m\.?)(?!\w)", re.IGNORECASE),
+	re.compile(r"\b\d{1,2}:\d{2}\b"),
+	re.compile(r"\b(?:noon|midnight)\b", re.IGNORECASE),
+	re.compile(r"\b\d{1,2}\s*giờ(?:\s*\d{1,2})?(?!\w)", re.IGNORECASE),
+)
+_TITLES = r"(?:Mr|Mrs|Ms|Dr|Sr|Fr|Prof)"
+_NAME_WORD = r"[A-Z][\w’'-]*"
+# A title with the capitalised words after it, or a run of capitalised words
+# that does not run into a title ("Call Dr. Smith" is "Call" and "Dr. Smith")
+NAME_RE = re.compile(
+	rf"\b{_TITLES}\.?\s+{_NAME_WORD}(?:\s+{_NAME_WORD})*"
+	rf"|\b(?!{_TITLES}\b){_NAME_WORD}(?:\s+(?!{_TITLES}\b){_NAME_WORD})*"
+)
+_TITLE_RE = re.compile(rf"^{_TITLES}\b")
+# The dot of an abbreviated title does not end a sentence
+_TITLE_END_RE = re.compile(rf"\b{_TITLES}\.$")
+_NOT_NAMES = frozenset(("i", "am", "pm", "ok") + _MONTHS + _WEEKDAYS)
+# Words that open sentences without naming anyone
+_OPENERS = frozenset((
+	"this", "that", "these", "those", "it", "he", "she", "we", "they", "you", "there", "here",
+	"what", "who", "where", "when", "why", "how", "which", "my", "your", "our", "his", "her",
+	"their", "the", "a", "an", "let", "today", "tomorrow", "tonight", "yesterday",
+	"everyone", "someone", "everything", "nothing",
+))
+# A lone word opening a sentence is a name when a verb like these follows it
+_NAME_VERB_RE = re.compile(r"\s+(?:is|was|has|had|will|lives|works|likes|loves|said|says|and)\b")
+
+# Keywords that indicate tasks or reminders
+TASK_KEYWORDS = [
+	"meeting", "appointment", "deadline", "need to", "have to", "should", "must",
+	"call", "email", "finish", "complete", "submit", "due", "tomorrow", "next week",
+	"họp", "cuộc hẹn", "hạn chót", "cần làm", "phải làm", "gọi", "gửi email",
+	"hoàn thành", "nộp", "ngày mai", "tuần sau",
+]
+TASK_MATCHER = KeywordMatcher({"task": TASK_KEYWORDS})
+
+# Hour used for reminders that name a day but no time
+DEFAULT_DUE_HOUR = 9
+
+# Durable statements about the user, as (topic, key, pattern, template).
+# The key names the slot a fact fills, so a newer statement replaces an
+# older one; "{relation}"/"{thing}" in a key come from the named groups.
+_VALUE = r"(?P<value>[^.!?;\n]+?)"
+_END = r"\s*(?:[.!?;,\n]|\s+(?:and|but|so)\s+(?:i|my)\b|$)"
+PROFILE_PATTERNS = tuple(
+	(topic, key, re.compile(pattern + _END, re.IGNORECASE), template)
+	for topic, key, pattern, template in (
+		("identity", "name", rf"\b(?:my name is|call me) {_VALUE}", "name: {value}"),
+		("work", "employer", rf"\bi (?:work|am working) (?:at|for) {_VALUE}", "works at {value}"),
+		("work", "role", r"\bi(?: work as(?: an?)?| am an?|'m an?) (?P<value>[\w -]*?(?:engineer|developer|teacher|doctor|nurse|student|manager|designer|lawyer|accountant|writer|scientist))\b[^.!?;,\n]*?", "is a {value}"),
+		("work", "employer", rf"\bmy (?:company|employer) is {_VALUE}", "works at {value}"),
+		("home", "home", rf"\bi live (?P<prep>in|at|on) {_VALUE}", "lives {prep} {value}"),
+		("home", "address", rf"\bmy (?:home )?address is {_VALUE}", "address: {value}"),
+		("dates", "birthday", rf"\bmy birthday is (?:on )?{_VALUE}", "birthday: {value}"),
+		("dates", "birthday", rf"\bi was born (?:on|in) {_VALUE}", "born {value}"),
+		("contact", "phone", rf"\bmy (?:phone|phone number|cell|mobile)(?: number)? is {_VALUE}", "phone: {value}"),
+		("contact", "email", rf"\bmy email(?: address)? is {_VALUE}", "email: {value}"),
+		(
+			"family",
+			"family:{relation}",
+			r"\bmy (?P<relation>wife|husband|partner|son|daughter|mom|mother|dad|father|brother|sister|boss)(?:'s name)? is (?:named |called )?(?P<value>[A-Z][\w'-]*(?: [A-Z][\w'-]*)*)",
+			"{relation}: {value}",
+		),
+		("preferences", "favorite:{thing}", rf"\bmy favou?rite (?P<thing>[\w ]+?) is {_VALUE}", "favorite {thing}: {value}"),
+		("health", "allergy", rf"\bi(?: am|'m) allergic to {_VALUE}", "allergic to {value}"),
+	)
+)
+PROFILE_TOPICS = ("identity", "work", "home", "contact", "dates", "family", "preferences", "health")
+
+# Words in a question that say which kind of fact it is asking for
+QUESTION_KINDS = KeywordMatcher({
+	"phone": ["phone", "number", "call", "contact", "số điện thoại"],
+	"room": ["room", "office", "floor", "phòng"],
+	"date": ["when", "date", "day", "birthday", "deadline", "due", "khi nào", "ngày nào"],
+	"time": ["when", "time", "what time", "meeting", "appointment", "mấy giờ"],
+	# "ai" (Vietnamese "who") alone would also match the English "AI"
+	"name": ["name", "called", "who", "tên", "là ai", "ai là"],
+})
+
+
+def _normalize(value: str) -> str:
+	return " ".join(value.lower().split())
+
+
+def _names(text: str) -> List[str]:
+	names = []
+	for match in NAME_RE.finditer(text):
+		value = match.group(0)
+		# Capitalised words that open a sentence are not names unless titled,
+		# or a lone word that is possessive or followed by a verb ("Sarah is")
+		before = text[: match.start()].rstrip()
+		opens_sentence = (not before or before[-1] in ".!?") and not _TITLE_END_RE.search(before)
+		if opens_sentence and not _TITLE_RE.match(value):
+			words = value.split(None, 1)
+			if len(words) == 1:
+				word = re.sub(r"[’']s$", "", value)
+				named = word != value or _NAME_VERB_RE.match(text, match.end())
+				if word.lower() in _OPENERS or not named:
+					continue
+			else:
+				value = words[1]
+		value = re.sub(r"[’']s$", "", value)
+		if value.lower() in _NOT_NAMES:
+			continue
+		names.append(value)
+	return names
+
+
+def extract_facts(text: str) -> List[Tuple[str, str]]:
+	"""Pull typed entities out of a memory as (kind, value) pairs."""
+	facts: List[Tuple[str, str]] = []
+
+	def add(kind: str, value: str) -> None:
+		pair = (kind, _normalize(value))
+		if pair[1] and pair not in facts:
+			facts.append(pair)
+
+	iso_dates = {m.span() for m in ISO_DATE_RE.finditer(text)}
+	for match in PHONE_RE.finditer(text):
+		digits = re.sub(r"\D", "", match.group(0))
+		if len(digits) >= 7 and match.span() not in iso_dates:
+			add("phone", digits)
+	for match in ROOM_RE.finditer(text):
+		add("room", match.group(1))
+	for pattern in DATE_RES:
+		for match in pattern.finditer(text):
+			add("date", match.group(0))
+	for pattern in TIME_RES:
+		for match in pattern.finditer(text):
+			add("time", match.group(0))
+	for name in _names(text):
+		add("name", name)
+	return facts
+
+
+def extract_profile(text: str) -> List[Tuple[str, str, str]]:
+	"""Durable facts about the user in a memory, as (topic, key, fact) triples."""
+	found = {}
+	for topic, key, pattern, template in PROFILE_PATTERNS:
+		for match in pattern.finditer(text):
+			groups = {k: " ".join(v.split()) for k, v in match.groupdict().items() if v}
+			if not groups.get("value"):
+				continue
+			# Only the value keeps its case; relation/thing/prep words are lowercased
+			words = {k: v if k == "value" else v.lower() for k, v in groups.items()}
+			slot = key.format(**words)
+			found.setdefault(slot, (topic, slot, template.format(**words)))
+	return list(found.values())
+
+
+def question_fact_kinds(question: str) -> FrozenSet[str]:
+	"""Return the fact kinds a question is asking about."""
+	return QUESTION_KINDS.classify(question)
+
+
+def is_task(text: str) -> bool:
+	"""Return True when a memory reads like a task or appointment."""
+	return bool(TASK_MATCHER.classify(text))
+
+
+def _parse_date(value: str, now: datetime) -> Optional[datetime]:
+	value = value.lower()
+	today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+	if value in ("today", "tonight", "hôm nay"):
+		return today
+	if value in ("tomorrow", "ngày mai"):
+		return today + timedelta(days=1)
+	if value in ("next week", "tuần sau"):
+		return today + timedelta(days=7)
+	if value in ("next month", "tháng sau"):
+		return today + timedelta(days=30)
+	if value in ("yesterday", "hôm qua"):
+		return None
+	for index, day in enumerate(_WEEKDAYS):
+		if value.endswith(day):
+			ahead = (index - today.weekday()) % 7
+			if ahead == 0 and not value.startswith(("this", "on")):
+				ahead = 7
+			return today + timedelta(days=ahead)
+	try:
+		if ISO_DATE_RE.fullmatch(value):
+			year, month, day = (int(part) for part in value.split("-"))
+			return today.replace(year=year, month=month, day=day)
+		if "/" in value:
+			parts = [int(part) for part in value.split("/")]
+			year = parts[2] if len(parts) > 2 else today.year
+			if year < 100:
+				year += 2000
+			due = today.replace(year=year, month=parts[0], day=parts[1])
+			return due if len(parts) > 2 or due >= today else due.replace(year=year + 1)
+		month_match = re.search(r"[a-z]{3,}", value)
+		day_match = re.search(r"\d{1,2}", value)
+		if month_match and day_match:
+			month = next(
+				i + 1 for i, name in enumerate(_MONTHS) if name.startswith(month_match.group(0)[:3])
+			)
+			due = today.replace(month=month, day=int(day_match.group(0)))
+			return due if due >= today else due.replace(year=today.year + 1)
+	except (ValueError, StopIteration):
+		return None
+	return None
+
+
+def _parse_time(value: str) -> Optional[time]:
+	value = value.lower()
+	if value == "noon":
+		return time(12, 0)
+	if value == "midnight":
+		return time(0, 0)
+	numbers = [int(n) for n in re.findall(r"\d+", value)]
+	hour, minute = numbers[0], numbers[1] if len(numbers) > 1 else 0
+	if "p" in value and "giờ" not in value and hour < 12:
+		hour += 12
+	elif "a" in value and "giờ" not in value and hour == 12:
+		hour = 0
+	if hour > 23 or minute > 59:
+		return None
+	return time(hour, minute)
+
+
+def parse_due(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+	"""Parse the due date of a task relative to now, returned in UTC."""
+	now = (now or datetime.now(timezone.utc)).astimezone()
+	facts = extract_facts(text)
+	due_date = next(
+		(d for d in (_parse_date(v, now) for k, v in facts if k == "date") if d is not None), None
+	)
+	due_time = next(
+		(t for t in (_parse_time(v) for k, v in facts if k == "time") if t is not None), None
+	)
+	if due_date is None and due_time is None:
+		return None
+	if due_date is None:
+		due = now.replace(hour=due_time.hour, minute=due_time.minute, second=0, microsecond=0)
+		if due < now:
+			due += timedelta(days=1)
+	else:
+		due_time = due_time or time(DEFAULT_DUE_HOUR, 0)
+		due = due_date.replace(hour=due_time.hour, minute=due_time.minute)
+	return due.astimezone(timezone.utc)
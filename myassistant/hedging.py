@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional, Tuple
+
+from .config import get_env_int
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def get_llm_deadline() -> float:
+	"""Seconds to wait for an LLM answer before serving the local one; 0 waits indefinitely."""
+	return get_env_int("ASSISTANT_LLM_DEADLINE_MS", 3000) / 1000
+
+
+class CircuitBreaker:
+	"""Stops calling a failing dependency for a while.
+
+	After failure_threshold consecutive failures the breaker opens and
+	allow() returns False for reset_timeout seconds. It then lets a single
+	trial call through (half-open): success closes it, failure reopens it.
+	"""
+
+	def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None) -> None:
+		self.failure_threshold = failure_threshold or get_env_int("ASSISTANT_BREAKER_FAILURES", 3)
+		self.reset_timeout = (
+			reset_timeout if reset_timeout is not None else get_env_int("ASSISTANT_BREAKER_RESET_SECONDS", 30)
+		)
+		self.failures = 0
+		self._opened_at: Optional[float] = None
+		self._trial_running = False
+		self._lock = threading.Lock()
+
+	@property
+	def state(self) -> str:
+		with self._lock:
+			return self._state()
+
+	def _state(self) -> str:
+		if self._opened_at is None:
+			return CLOSED
+		if time.monotonic() - self._opened_at >= self.reset_timeout:
+			return HALF_OPEN
+		return OPEN
+
+	def allow(self) -> bool:
+		with self._lock:
+			state = self._state()
+			if state == CLOSED:
+				return True
+			if state == HALF_OPEN and not self._trial_running:
+				self._trial_running = True
+				return True
+			return False
+
+	def record_success(self) -> None:
+		with self._lock:
+			self.failures = 0
+			self._opened_at = None
+			self._trial_running = False
+
+	def record_failure(self) -> None:
+		with self._lock:
+			self.failures += 1
+			self._trial_running = False
+			if self.failures >= self.failure_threshold or self._opened_at is not None:
+				self._opened_at = time.monotonic()
+
+
+# Primary calls keep running after their deadline, so they get their own threads
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+def hedge(
+	primary: Callable[[], Any],
+	fallback: Callable[[], Any],
+	deadline: float,
+	breaker: Optional[CircuitBreaker] = None,
+	on_late: Optional[Callable[[Any], None]] = None,
+) -> Tuple[Any, bool]:
+	"""Run primary with a deadline, computing fallback in parallel.
+
+	Returns (result, from_primary). If primary fails or misses the deadline
+	the fallback result is returned; a primary that finishes successfully
+	after its deadline is passed to on_late. The breaker, if given, is
+	consulted first and told about each primary outcome; a missed deadline
+	counts as a failure, and whatever the call does after it is not recorded,
+	so a dependency that always answers late still opens the breaker.
+	"""
+	if breaker is not None and not breaker.allow():
+		return fallback(), False
+
+	started = time.monotonic()
+	future: Future = _executor.submit(primary)
+
+	def settle(done: Future) -> None:
+		if late:
+			# The miss was already recorded; a late answer is only delivered
+			if done.exception() is None and on_late is not None:
+				on_late(done.result())
+			return
+		if breaker is not None:
+			if done.exception() is not None:
+				breaker.record_failure()
+			else:
+				breaker.record_success()
+
+	late = False
+	fallback_result = fallback()
+	remaining = deadline - (time.monotonic() - started) if deadline > 0 else None
+	try:
+		result = future.result(timeout=max(remaining, 0) if remaining is not None else None)
+	except FutureTimeoutError:
+		late = True
+		if breaker is not None:
+			breaker.record_failure()
+		future.add_done_callback(settle)
+		return fallback_result, False
+	except Exception as e:
+		print(f"Hedged call failed: {e}")
+		settle(future)
+		return fallback_result, False
+	settle(future)
+	return result, True
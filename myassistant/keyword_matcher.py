@@ -0,0 +1,79 @@
+"""
+Keyword matcher shared by the response engines
+Compiles every keyword list of an engine into one Aho-Corasick automaton so a
+message is classified in a single pass, with whole-word matching
+"""
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        # Trie stored as parallel lists: goto transitions, failure links and
+        # the (category, keyword length) pairs that end at each state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        self.categories: Tuple[str, ...] = tuple(categories)
+
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self._add(category, keyword.lower())
+        self._build_failure_links()
+
+    def _add(self, category: str, keyword: str) -> None:
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((category, keyword))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def find(self, text: str) -> List[Tuple[str, str]]:
+        """Return every (category, keyword) found in text as a whole word or phrase"""
+        text = text.lower()
+        found = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for category, keyword in self._out[state]:
+                start = end - len(keyword) + 1
+                # Word boundaries only apply where the keyword itself starts or
+                # ends with a word character, so "?" still matches anywhere
+                if _is_word_char(keyword[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(keyword[-1]) and end + 1 < len(text) and _is_word_char(text[end + 1]):
+                    continue
+                found.append((category, keyword))
+        return found
+
+    def classify(self, text: str) -> FrozenSet[str]:
+        """Return the set of categories that have at least one match in text"""
+        return frozenset(category for category, _ in self.find(text))
+
+    def keywords(self, text: str, category: str) -> Set[str]:
+        """Return the keywords of one category that occur in text"""
+        return {keyword for cat, keyword in self.find(text) if cat == category}
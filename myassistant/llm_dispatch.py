@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import get_env_int
+
+# Lower runs first: answers the user is waiting for before acknowledgements
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# openai's transport errors, matched by name so this module does not import openai
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError"}
+
+
+def is_retryable(error: BaseException) -> bool:
+	if getattr(error, "status_code", None) in RETRYABLE_STATUS:
+		return True
+	return type(error).__name__ in RETRYABLE_ERRORS or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+	"""Seconds the provider asked us to wait, from a Retry-After header."""
+	response = getattr(error, "response", None)
+	value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+	try:
+		return float(value) if value is not None else None
+	except ValueError:
+		return None
+
+
+class TokenBucket:
+	"""Allows rate calls per second on average, in bursts of up to capacity."""
+
+	def __init__(self, rate: float, capacity: float) -> None:
+		self.rate = rate
+		self.capacity = capacity
+		self._tokens = capacity
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+
+	def reserve(self) -> float:
+		"""Take a token and return how many seconds to wait before using it."""
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+			self._updated = now
+			self._tokens -= 1
+			return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class LLMDispatcher:
+	"""Gate for every outbound LLM call.
+
+	At most max_in_flight calls run at once; waiting callers are admitted
+	by priority, then arrival order. Each attempt takes a token from a
+	bucket refilled at rate_per_minute. Rate limits (429), server errors
+	and connection errors are retried up to max_retries times with
+	exponential backoff and full jitter, honouring Retry-After.
+	"""
+
+	def __init__(
+		self,
+		max_in_flight: Optional[int] = None,
+		rate_per_minute: Optional[int] = None,
+		max_retries: Optional[int] = None,
+		base_delay: float = 0.5,
+		max_delay: float = 20.0,
+	) -> None:
+		self.max_in_flight = max_in_flight or get_env_int("ASSISTANT_LLM_MAX_IN_FLIGHT", 4)
+		rate = rate_per_minute or get_env_int("ASSISTANT_LLM_RATE_PER_MINUTE", 60)
+		self.bucket = TokenBucket(rate / 60, capacity=max(1, self.max_in_flight))
+		self.max_retries = max_retries if max_retries is not None else get_env_int("ASSISTANT_LLM_RETRIES", 3)
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+
+		self._cond = threading.Condition()
+		self._waiting: List[Tuple[int, int]] = []
+		# Event-loop waiters, woken alongside threads waiting on _cond
+		self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+		self._seq = itertools.count()
+		self._in_flight = 0
+
+		self.calls = 0
+		self.retries = 0
+		self.failures = 0
+		self.max_queue_depth = 0
+		self.total_wait = 0.0
+		self.max_wait = 0.0
+
+	def stats(self) -> Dict[str, Any]:
+		with self._cond:
+			return {
+				"in_flight": self._in_flight,
+				"queue_depth": len(self._waiting),
+				"max_queue_depth": self.max_queue_depth,
+				"calls": self.calls,
+				"retries": self.retries,
+				"failures": self.failures,
+				"avg_wait_ms": round(1000 * self.total_wait / self.calls, 1) if self.calls else 0.0,
+				"max_wait_ms": round(1000 * self.max_wait, 1),
+			}
+
+	# Admission
+
+	def _enqueue(self, priority: int) -> Tuple[int, int]:
+		ticket = (priority, next(self._seq))
+		heapq.heappush(self._waiting, ticket)
+		self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+		return ticket
+
+	def _try_admit(self, ticket: Tuple[int, int], start: float) -> bool:
+		if self._waiting[0] != ticket or self._in_flight >= self.max_in_flight:
+			return False
+		heapq.heappop(self._waiting)
+		self._in_flight += 1
+		waited = time.monotonic() - start
+		self.calls += 1
+		self.total_wait += waited
+		self.max_wait = max(self.max_wait, waited)
+		self._wake_all()
+		return True
+
+	def _wake_all(self) -> None:
+		self._cond.notify_all()
+		for loop, event in self._async_waiters:
+			try:
+				loop.call_soon_threadsafe(event.set)
+			except RuntimeError:
+				pass  # loop closed
+
+	def _acquire(self, priority: int) -> None:
+		start = time.monotonic()
+		with self._cond:
+			ticket = self._enqueue(priority)
+			while not self._try_admit(ticket, start):
+				self._cond.wait()
+
+	async def _aacquire(self, priority: int) -> None:
+		# Waits on the event loop rather than in a worker thread, so queued
+		# callers cannot exhaust the loop's default executor
+		start = time.monotonic()
+		waiter = (asyncio.get_running_loop(), asyncio.Event())
+		with self._cond:
+			ticket = self._enqueue(priority)
+			self._async_waiters.add(waiter)
+		try:
+			while True:
+				with self._cond:
+					if self._try_admit(ticket, start):
+						return
+					waiter[1].clear()
+				await waiter[1].wait()
+		except asyncio.CancelledError:
+			with self._cond:
+				if ticket in self._waiting:
+					self._waiting.remove(ticket)
+					heapq.heapify(self._waiting)
+					self._wake_all()
+			raise
+		finally:
+			with self._cond:
+				self._async_waiters.discard(waiter)
+
+	def _release(self) -> None:
+		with self._cond:
+			self._in_flight -= 1
+			self._wake_all()
+
+	@contextmanager
+	def slot(self, priority: int = INTERACTIVE):
+		"""Hold one of the in-flight slots, e.g. while consuming a stream."""
+		self._acquire(priority)
+		try:
+			yield
+		finally:
+			self._release()
+
+	@asynccontextmanager
+	async def aslot(self, priority: int = INTERACTIVE):
+		await self._aacquire(priority)
+		try:
+			yield
+		finally:
+			self._release()
+
+	# Retries
+
+	def _backoff(self, attempt: int, error: BaseException) -> float:
+		delay = retry_after(error)
+		if delay is None:
+			delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+		return min(delay, self.max_delay)
+
+	def _should_retry(self, attempt: int, error: BaseException) -> bool:
+		if attempt >= self.max_retries or not is_retryable(error):
+			with self._cond:
+				self.failures += 1
+			return False
+		with self._cond:
+			self.retries += 1
+		print(f"LLM call failed ({error}); retry {attempt + 1}/{self.max_retries}")
+		return True
+
+	def retry(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+		"""Call fn, rate limited and retried; the caller must hold a slot."""
+		for attempt in itertools.count():
+			time.sleep(self.bucket.reserve())
+			try:
+				return fn(*args, **kwargs)
+			except Exception as e:
+				if not self._should_retry(attempt, e):
+					raise
+				time.sleep(self._backoff(attempt, e))
+
+	async def aretry(self, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+		for attempt in itertools.count():
+			await asyncio.sleep(self.bucket.reserve())
+			try:
+				return await fn(*args, **kwargs)
+			except Exception as e:
+				if not self._should_retry(attempt, e):
+					raise
+				await asyncio.sleep(self._backoff(attempt, e))
+
+	def call(self, fn: Callable[..., Any], *args: Any, priority: int = INTERACTIVE, **kwargs: Any) -> Any:
+		with self.slot(priority):
+			return self.retry(fn, *args, **kwargs)
+
+	async def acall(
+		self, fn: Callable[..., Awaitable[Any]], *args: Any, priority: int = INTERACTIVE, **kwargs: Any
+	) -> Any:
+		async with self.aslot(priority):
+			return await self.aretry(fn, *args, **kwargs)
+
+
+_dispatcher: Optional[LLMDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> LLMDispatcher:
+	"""The process-wide dispatcher shared by all engines."""
+	global _dispatcher
+	with _dispatcher_lock:
+		if _dispatcher is None:
+			_dispatcher = LLMDispatcher()
+		return _dispatcher
+
+
+def reset_dispatcher() -> None:
+	"""Drop the shared dispatcher so the next one rereads the environment (load tests)."""
+	global _dispatcher
+	with _dispatcher_lock:
+		_dispatcher = None
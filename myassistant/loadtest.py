@@ -0,0 +1,237 @@
+"""
+Offline load test for the LLM engines
+Starts the stub server (or uses --base-url), seeds a temporary memory
+database and drives an engine with concurrent questions, reporting latency,
+throughput, provider calls, answers served without the LLM and the
+dispatcher's queueing
+
+    python -m myassistant.loadtest --engine openai --requests 200 --concurrency 20 --latency lognormal:0.5,0.6
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .engines import Engine, EngineRegistry, stream_response
+from .llm_dispatch import get_dispatcher, reset_dispatcher
+from .memory_store import MemoryStore
+from .sessions import SessionManager
+from .stub_server import StubServer
+
+STUB_REPLY = "Based on what you told me: your meeting is tomorrow at 2 PM."
+
+MEMORIES = [
+    "I have a meeting tomorrow at 2 PM with the marketing team",
+    "My phone number is 555-123-4567",
+    "The wifi password is on the fridge",
+    "My car is parked on level 3, spot 42",
+    "Mom's birthday is June 5",
+    "I need to buy milk, eggs and bread",
+    "My dentist appointment is on Friday at 10 AM",
+    "The project report is due next Monday",
+]
+
+QUESTIONS = [
+    "When is my meeting?",
+    "What is my phone number?",
+    "Where did I park my car?",
+    "When is Mom's birthday?",
+    "What do I need to buy?",
+    "When is my dentist appointment?",
+    "When is the project report due?",
+    "Where is the wifi password?",
+]
+
+
+@contextmanager
+def patched_env(values: Dict[str, str]):
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def make_questions(count: int, repeat: float, rng: random.Random) -> List[str]:
+    """Questions where a repeat fraction come from a small hot set; the rest are unique"""
+    hot = QUESTIONS[:3]
+    return [
+        rng.choice(hot) if rng.random() < repeat else f"{rng.choice(QUESTIONS)} (#{i})"
+        for i in range(count)
+    ]
+
+
+def run_blocking(engine: Engine, store: MemoryStore, questions: List[str], concurrency: int, sessions: int) -> Tuple[List[float], List[str], int]:
+    def ask(item: Tuple[int, str]) -> Tuple[float, Optional[str]]:
+        i, question = item
+        start = time.perf_counter()
+        try:
+            answer = engine.get_response(question, store, f"load-{i % sessions}")
+        except Exception as e:
+            print(f"Request failed: {e}")
+            answer = None
+        return time.perf_counter() - start, answer
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(ask, enumerate(questions)))
+    answers = [a for _, a in results if a is not None]
+    return [t for t, _ in results], answers, len(results) - len(answers)
+
+
+async def run_streaming(
+    engine: Engine, store: MemoryStore, questions: List[str], concurrency: int, sessions: int
+) -> Tuple[List[float], List[float], List[str], int]:
+    limit = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    first_token: List[float] = []
+    answers: List[str] = []
+    errors = 0
+
+    async def ask(i: int, question: str):
+        nonlocal errors
+        async with limit:
+            start = time.perf_counter()
+            parts = []
+            try:
+                async for delta in stream_response(engine, question, store, f"load-{i % sessions}"):
+                    if not parts:
+                        first_token.append(time.perf_counter() - start)
+                    parts.append(delta)
+            except Exception as e:
+                print(f"Request failed: {e}")
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            answers.append("".join(parts).strip())
+
+    await asyncio.gather(*(ask(i, q) for i, q in enumerate(questions)))
+    return latencies, first_token, answers, errors
+
+
+def _ms(values: Sequence[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(1000 * percentile(values, 50), 1),
+        "p90_ms": round(1000 * percentile(values, 90), 1),
+        "p99_ms": round(1000 * percentile(values, 99), 1),
+        "max_ms": round(1000 * max(values, default=0.0), 1),
+    }
+
+
+def run_load(
+    engine_name: str = "openai",
+    requests: int = 100,
+    concurrency: int = 10,
+    stream: bool = False,
+    repeat: float = 0.5,
+    sessions: int = 10,
+    base_url: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    seed: int = 0,
+    **stub_options,
+) -> dict:
+    """
+    Run one load test and return its report
+    env overrides ASSISTANT_* settings for the run (e.g. ASSISTANT_LLM_DEADLINE_MS);
+    stub_options go to StubServer when no base_url is given
+    """
+    rng = random.Random(seed)
+    questions = make_questions(requests, repeat, rng)
+    with tempfile.TemporaryDirectory() as tmp, StubServer(reply=STUB_REPLY, seed=seed, **stub_options) as stub:
+        settings = {"OPENAI_API_KEY": "load-test", "OPENAI_BASE_URL": base_url or stub.base_url, **(env or {})}
+        with patched_env(settings):
+            # Engines and the dispatcher read their limits from the environment
+            reset_dispatcher()
+            store = MemoryStore(Path(tmp) / "memories.db")
+            for memory in MEMORIES:
+                store.remember(memory)
+            engine = EngineRegistry(store, SessionManager()).get(engine_name)
+
+            start = time.perf_counter()
+            if stream:
+                latencies, first_token, answers, errors = asyncio.run(
+                    run_streaming(engine, store, questions, concurrency, sessions)
+                )
+            else:
+                latencies, answers, errors = run_blocking(engine, store, questions, concurrency, sessions)
+                first_token = []
+            elapsed = time.perf_counter() - start
+
+            report = {
+                "engine": engine_name,
+                "mode": "stream" if stream else "blocking",
+                "requests": requests,
+                "concurrency": concurrency,
+                "elapsed_s": round(elapsed, 2),
+                "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+                "latency": _ms(latencies),
+                "errors": errors,
+                # Answered locally: hedged, circuit open, or an error fallback
+                "non_llm_answers": sum(1 for a in answers if a != STUB_REPLY),
+                "provider_calls": len(stub.requests),
+                "provider_errors": stub.httpd.errors,
+                "dispatcher": get_dispatcher().stats(),
+            }
+            if stream:
+                report["first_token"] = _ms(first_token)
+            reset_dispatcher()
+            return report
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="assistant-loadtest", description="Offline load test for the LLM engines")
+    p.add_argument("--engine", default="openai", help="Engine name (openai, chatgpt, ...)")
+    p.add_argument("--requests", type=int, default=100)
+    p.add_argument("--concurrency", type=int, default=10)
+    p.add_argument("--stream", action="store_true", help="Use streaming responses and report time to first token")
+    p.add_argument("--repeat", type=float, default=0.5, help="Fraction of questions drawn from a small hot set")
+    p.add_argument("--sessions", type=int, default=10, help="Number of distinct client sessions")
+    p.add_argument("--base-url", default=None, help="Use a running stub instead of starting one")
+    p.add_argument("--latency", default="0.3", help="Stub latency distribution, see stub_server.parse_latency")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--error-status", type=int, default=500)
+    p.add_argument("--tokens-per-second", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="Setting for the run, e.g. ASSISTANT_LLM_DEADLINE_MS=500")
+    args = p.parse_args(argv)
+
+    env = dict(item.split("=", 1) for item in args.set)
+    report = run_load(
+        engine_name=args.engine,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        stream=args.stream,
+        repeat=args.repeat,
+        sessions=args.sessions,
+        base_url=args.base_url,
+        env=env,
+        seed=args.seed,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tokens_per_second=args.tokens_per_second,
+    )
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,33 +3,50 @@ Local AI System - No external API required
 Uses simple pattern matching and memory search to answer questions
 """
 import re
-from typing import List, Tuple
+from typing import FrozenSet, List, Optional, Tuple
+from myassistant.keyword_matcher import KeywordMatcher
 from myassistant.memory_store import MemoryStore
+from myassistant.sessions import DEFAULT_SESSION, Session, SessionManager
+
+INTENT_MATCHER = KeywordMatcher({
+    "greeting": [
+        "hello", "hi", "hey", "good morning", "good afternoon",
+        "good evening", "how are you", "what's up", "greetings"
+    ],
+    "question": ["what", "who", "when", "where", "why", "how", "which", "whose"],
+    "statement": [
+        "my", "i have", "i am", "i like", "i need", "i want",
+        "remember", "note", "save", "store"
+    ],
+})
 
 class LocalAI:
-    def __init__(self):
-        self.conversation_history = []
+    def __init__(self, sessions: Optional[SessionManager] = None):
+        self.sessions = sessions if sessions is not None else SessionManager()
         print("Local AI system initialized - no external API required!")
     
-    def get_response(self, user_message: str, memory_store: MemoryStore = None) -> str:
+    def get_response(self, user_message: str, memory_store: MemoryStore = None, session_id: str = DEFAULT_SESSION) -> str:
         """
         Get response using local pattern matching and memory search
         """
         if not memory_store:
             return "I'm ready to help! Please provide some information first."
         
-        # Add to conversation history
-        self.conversation_history.append({"user": user_message})
+        # Add to this client's conversation history
+        session = self.sessions.get(session_id)
+        session.add({"user": user_message})
         
         # Clean the message
         message_lower = user_message.lower().strip()
         
+        categories = INTENT_MATCHER.classify(message_lower)
+        
         # Check if it's a greeting
-        if self._is_greeting(message_lower):
-            return self._handle_greeting()
+        if self._is_greeting(categories):
+            return self._handle_greeting(session)
         
         # Check if it's a question - PRIORITY: answer from memories
-        if self._is_question(message_lower):
+        if self._is_question(message_lower, categories):
             answer = self._answer_question(user_message, memory_store)
             # If we got a proper answer from memories, return it
             if "Based on what you told me" in answer or "I found this related information" in answer:
@@ -37,34 +54,25 @@ class LocalAI:
             # If no memory answer, don't repeat the question
         
         # Check if it's a statement (storing information)
-        if self._is_statement(message_lower):
-            return self._handle_statement(user_message)
+        if self._is_statement(categories):
+            return self._handle_statement(user_message, session)
         
         # For unclear messages, try to find relevant memories first
         return self._default_response(user_message, memory_store)
     
-    def _is_greeting(self, message: str) -> bool:
+    def _is_greeting(self, categories: FrozenSet[str]) -> bool:
         """Check if message is a greeting"""
-        greetings = [
-            "hello", "hi", "hey", "good morning", "good afternoon", 
-            "good evening", "how are you", "what's up", "greetings"
-        ]
-        return any(greeting in message for greeting in greetings)
+        return "greeting" in categories
     
-    def _is_question(self, message: str) -> bool:
+    def _is_question(self, message: str, categories: FrozenSet[str]) -> bool:
         """Check if message is a question"""
-        question_words = ["what", "who", "when", "where", "why", "how", "which", "whose"]
-        return message.endswith("?") or any(word in message for word in question_words)
+        return message.endswith("?") or "question" in categories
     
-    def _is_statement(self, message: str) -> bool:
+    def _is_statement(self, categories: FrozenSet[str]) -> bool:
         """Check if message is a statement (information to store)"""
-        statement_indicators = [
-            "my", "i have", "i am", "i like", "i need", "i want", 
-            "remember", "note", "save", "store"
-        ]
-        return any(indicator in message for indicator in statement_indicators)
+        return "statement" in categories
     
-    def _handle_greeting(self) -> str:
+    def _handle_greeting(self, session: Session) -> str:
         """Handle greeting messages"""
         responses = [
             "Hello! I'm MyAssistant. I'm here to help you remember things and answer questions!",
@@ -72,7 +80,7 @@ class LocalAI:
             "Hello! I'm ready to assist you with your memories and questions.",
             "Hey! What would you like to remember or ask about today?"
         ]
-        return responses[len(self.conversation_history) % len(responses)]
+        return responses[session.turn_count % len(responses)]
     
     def _answer_question(self, question: str, memory_store: MemoryStore) -> str:
         """Answer questions using stored memories"""
@@ -139,7 +147,7 @@ class LocalAI:
         # No relevant information found
         return "I don't have that information in my memory. Could you tell me about it?"
     
-    def _handle_statement(self, statement: str) -> str:
+    def _handle_statement(self, statement: str, session: Session) -> str:
         """Handle statements (information being stored)"""
         responses = [
             "Got it! I've stored that information for you.",
@@ -148,7 +156,7 @@ class LocalAI:
             "I've noted that down for you.",
             "Great! I'll keep that in mind."
         ]
-        return responses[len(self.conversation_history) % len(responses)]
+        return responses[session.turn_count % len(responses)]
     
     def _default_response(self, message: str, memory_store: MemoryStore) -> str:
         """Default response for unclear messages"""
@@ -205,7 +213,12 @@ class LocalAI:
         """Local AI is always available"""
         return True
     
-    def clear_history(self):
+    @property
+    def conversation_history(self) -> list:
+        """Turns of the default session"""
+        return self.sessions.history(DEFAULT_SESSION)
+    
+    def clear_history(self, session_id: str = DEFAULT_SESSION):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.sessions.clear(session_id)
         print("Conversation history cleared")
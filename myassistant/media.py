@@ -0,0 +1,155 @@
+"""
+Media files for the web app (the smiler video)
+The file is located and stat'ed once; each request is then answered from
+that metadata with ETag revalidation and byte ranges, which is how browsers
+stream video. The bytes go out with the server's zero-copy send when it
+offers one, otherwise in chunks read off the event loop
+"""
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .static_assets import etag_matches
+
+RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+CACHE_CONTROL = "public, max-age=86400"
+
+
+def media_candidates(name: str) -> Iterable[Path]:
+    """Where a media file may live: the working directory, then the container app dir"""
+    return [Path.cwd() / name, Path("/app") / name]
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    The inclusive (start, end) of a single-range Range header, or None to
+    send the whole file (no header, a malformed one, or several ranges)
+    Raises RangeNotSatisfiable when the range lies outside the file
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Sends bytes start..end (inclusive) of a file"""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: Path, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**headers, "Content-Length": str(end - start + 1)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        extensions = scope.get("extensions") or {}
+        if scope.get("method") == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+        elif "http.response.pathsend" in extensions and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            async with await anyio.open_file(self.path, "rb") as f:
+                await f.seek(self.start)
+                remaining = count
+                while remaining:
+                    chunk = await f.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    path: Path
+    size: int
+    etag: str
+    last_modified: str
+    media_type: str
+
+    @classmethod
+    def from_path(cls, path: Path) -> "MediaFile":
+        stat = path.stat()
+        return cls(
+            path=path.resolve(),
+            size=stat.st_size,
+            etag=f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+        )
+
+    @classmethod
+    def find(cls, name: str, candidates: Optional[Iterable[Path]] = None) -> Optional["MediaFile"]:
+        for path in candidates if candidates is not None else media_candidates(name):
+            if os.path.isfile(path):
+                return cls.from_path(Path(path))
+        return None
+
+    def response(self, request: Request) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": CACHE_CONTROL,
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), self.etag):
+            return Response(status_code=304, headers=headers)
+
+        range_header = request.headers.get("range")
+        # If-Range: only honour the range if the client's copy is this version
+        if_range = request.headers.get("if-range")
+        if if_range is not None and if_range.strip() not in (self.etag, self.last_modified):
+            range_header = None
+        try:
+            byte_range = parse_range(range_header, self.size) if range_header else None
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{self.size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is None:
+            return FileRangeResponse(self.path, 0, self.size - 1, 200, headers, self.media_type)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{self.size}"
+        return FileRangeResponse(self.path, start, end, 206, headers, self.media_type)
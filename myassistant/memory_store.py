@@ -1,15 +1,47 @@
 from __future__ import annotations
 
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
 
 import langid
 
-from .config import get_db_path
+from .config import connect_db, get_db_path, get_env_int
+from .facts import PROFILE_TOPICS, extract_facts, extract_profile, is_task, parse_due
+from .singleflight import SingleFlight
+
+SCHEMA_VERSION = 3
+
+# INSERT ... RETURNING needs SQLite 3.35
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Function words that would otherwise dominate BM25 ranking of a question
+_STOP_WORDS = frozenset(
+	"""
+	a an and are as at be but by can could did do does for from had has have how i in is it
+	its me my of on or our should so that the their them then there these they this to
+	was we were what when where which who whom whose why will with would you your
+	""".split()
+)
+
+
+def match_query(text: str) -> str:
+	"""Turn free text into an FTS5 query that matches any of its words.
+
+	Raw questions are not valid FTS5 syntax ("?", quotes, "-"), and the
+	implicit AND of a bare query rarely matches a whole question.
+	"""
+	words = dict.fromkeys(
+		w for w in re.findall(r"\w+", text.lower()) if len(w) > 1 and w not in _STOP_WORDS
+	)
+	return " OR ".join(f'"{w}"' for w in words)
 
 
 @dataclass
@@ -22,14 +54,39 @@ class Memory:
 	created_at: str
 
 
+@dataclass
+class ProfileFact:
+	topic: str
+	key: str
+	fact: str
+	memory_id: int
+
+
+@dataclass
+class Reminder:
+	memory: Memory
+	due_at: Optional[str]
+	notified: bool
+
+
 class MemoryStore:
 	def __init__(self, db_path: Optional[Path] = None) -> None:
 		self.db_path = str(db_path or get_db_path())
+		# Identical concurrent searches share one query
+		self._flights = SingleFlight()
+		# Read results by generation; a write from any process moves the
+		# generation on, so this cache never needs explicit invalidation
+		self.read_cache_size = get_env_int("ASSISTANT_READ_CACHE_ENTRIES", 256)
+		self.read_hits = 0
+		self.read_misses = 0
+		self._read_cache: "OrderedDict[Hashable, Tuple[Tuple[int, int], Any]]" = OrderedDict()
+		self._read_lock = threading.Lock()
+		self.idempotency_ttl = get_env_int("ASSISTANT_IDEMPOTENCY_TTL_SECONDS", 3600)
 		self._ensure_schema()
 
 	@contextmanager
 	def _conn(self):
-		conn = sqlite3.connect(self.db_path)
+		conn = connect_db(self.db_path)
 		conn.row_factory = sqlite3.Row
 		try:
 			yield conn
@@ -39,6 +96,8 @@ class MemoryStore:
 
 	def _ensure_schema(self) -> None:
 		with self._conn() as conn:
+			# Readers no longer block the writer or each other, across processes too
+			conn.execute("PRAGMA journal_mode=WAL")
 			conn.execute("PRAGMA foreign_keys=ON;")
 			conn.execute(
 				"""
@@ -79,32 +138,298 @@ class MemoryStore:
 				END;
 				"""
 			)
+			# Typed entities extracted at insert time (phone numbers, rooms, dates, names)
+			conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS memory_facts (
+					kind TEXT NOT NULL,
+					value TEXT NOT NULL,
+					memory_id INTEGER NOT NULL REFERENCES memories(id) ON DELETE CASCADE
+				);
+				CREATE INDEX IF NOT EXISTS memory_facts_kind_value ON memory_facts(kind, value);
+				CREATE INDEX IF NOT EXISTS memory_facts_memory ON memory_facts(memory_id);
+				CREATE TRIGGER IF NOT EXISTS memories_facts_ad AFTER DELETE ON memories BEGIN
+					DELETE FROM memory_facts WHERE memory_id = old.id;
+				END;
+				"""
+			)
+			# Tasks detected at insert time, with their parsed due date (UTC ISO-8601)
+			conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS reminders (
+					memory_id INTEGER PRIMARY KEY REFERENCES memories(id) ON DELETE CASCADE,
+					due_at TEXT,
+					notified INTEGER NOT NULL DEFAULT 0
+				);
+				CREATE INDEX IF NOT EXISTS reminders_due_at ON reminders(due_at);
+				CREATE TRIGGER IF NOT EXISTS memories_reminders_ad AFTER DELETE ON memories BEGIN
+					DELETE FROM reminders WHERE memory_id = old.id;
+				END;
+				"""
+			)
+			# Profile digest: the latest durable fact per slot (employer, birthday, ...)
+			conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS profile_facts (
+					key TEXT PRIMARY KEY,
+					topic TEXT NOT NULL,
+					fact TEXT NOT NULL,
+					memory_id INTEGER NOT NULL REFERENCES memories(id) ON DELETE CASCADE
+				);
+				CREATE INDEX IF NOT EXISTS profile_facts_memory ON profile_facts(memory_id);
+				CREATE TRIGGER IF NOT EXISTS memories_profile_ad AFTER DELETE ON memories BEGIN
+					DELETE FROM profile_facts WHERE memory_id = old.id;
+				END;
+				"""
+			)
+			# Write generation: max(id) covers inserts, revision counts deletes and edits
+			conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS store_version (
+					id INTEGER PRIMARY KEY CHECK (id = 1),
+					revision INTEGER NOT NULL
+				);
+				INSERT OR IGNORE INTO store_version(id, revision) VALUES (1, 0);
+				CREATE TRIGGER IF NOT EXISTS memories_version_ad AFTER DELETE ON memories BEGIN
+					UPDATE store_version SET revision = revision + 1 WHERE id = 1;
+				END;
+				CREATE TRIGGER IF NOT EXISTS memories_version_au AFTER UPDATE ON memories BEGIN
+					UPDATE store_version SET revision = revision + 1 WHERE id = 1;
+				END;
+				"""
+			)
+			# Retried submissions: key -> the memory it stored and, for chat, the answer given
+			conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS idempotency_keys (
+					key TEXT PRIMARY KEY,
+					memory_id INTEGER NOT NULL REFERENCES memories(id) ON DELETE CASCADE,
+					response TEXT,
+					created_at REAL NOT NULL
+				);
+				CREATE INDEX IF NOT EXISTS idempotency_keys_created ON idempotency_keys(created_at);
+				CREATE TRIGGER IF NOT EXISTS memories_idempotency_ad AFTER DELETE ON memories BEGIN
+					DELETE FROM idempotency_keys WHERE memory_id = old.id;
+				END;
+				"""
+			)
+			self._migrate(conn)
+
+	def _migrate(self, conn: sqlite3.Connection) -> None:
+		version = conn.execute("PRAGMA user_version").fetchone()[0]
+		if version < 1:
+			# Backfill facts for memories stored before extraction existed
+			for row in conn.execute("SELECT id, text FROM memories").fetchall():
+				self._index_facts(conn, int(row["id"]), str(row["text"]))
+		if version < 2:
+			# Due dates of existing tasks are parsed relative to when they were stored
+			for row in conn.execute("SELECT id, text, created_at FROM memories").fetchall():
+				self._index_reminder(
+					conn,
+					int(row["id"]),
+					str(row["text"]),
+					datetime.fromisoformat(str(row["created_at"])),
+				)
+		if version < 3:
+			# Oldest first, so newer statements replace older ones
+			for row in conn.execute("SELECT id, text FROM memories ORDER BY id").fetchall():
+				self._index_profile(conn, int(row["id"]), str(row["text"]))
+		if version < SCHEMA_VERSION:
+			conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+	@staticmethod
+	def _index_facts(conn: sqlite3.Connection, memory_id: int, text: str) -> None:
+		conn.executemany(
+			"INSERT INTO memory_facts(kind, value, memory_id) VALUES (?, ?, ?)",
+			[(kind, value, memory_id) for kind, value in extract_facts(text)],
+		)
+
+	@staticmethod
+	def _index_profile(conn: sqlite3.Connection, memory_id: int, text: str) -> None:
+		conn.executemany(
+			"INSERT OR REPLACE INTO profile_facts(key, topic, fact, memory_id) VALUES (?, ?, ?, ?)",
+			[(key, topic, fact, memory_id) for topic, key, fact in extract_profile(text)],
+		)
+
+	@staticmethod
+	def _index_reminder(
+		conn: sqlite3.Connection, memory_id: int, text: str, now: datetime
+	) -> None:
+		if not is_task(text):
+			return
+		due = parse_due(text, now)
+		conn.execute(
+			"INSERT OR REPLACE INTO reminders(memory_id, due_at) VALUES (?, ?)",
+			(memory_id, due.isoformat(timespec="seconds") if due else None),
+		)
 
 	def remember(self, text: str, tags: Optional[Sequence[str]] = None, source: str = "") -> int:
+		return self.remember_memory(text, tags, source).id
+
+	def remember_memory(
+		self,
+		text: str,
+		tags: Optional[Sequence[str]] = None,
+		source: str = "",
+		idempotency_key: Optional[str] = None,
+	) -> Memory:
+		"""Store a memory and return the stored row, read back in the same transaction.
+
+		With an idempotency_key, a repeat within the TTL returns the memory
+		the first call stored, without detecting its language or inserting.
+		"""
 		if not text.strip():
 			raise ValueError("Memory text cannot be empty")
+		if idempotency_key:
+			earlier = self.replay(idempotency_key)
+			if earlier is not None:
+				return earlier[0]
 		language, _ = langid.classify(text)
-		tags_str = " ".join(tags or [])
-		created_at = datetime.now(timezone.utc).isoformat()
+		try:
+			with self._conn() as conn:
+				memory = self._insert(conn, text, language, " ".join(tags or []), source or "", datetime.now(timezone.utc))
+				if idempotency_key:
+					now = time.time()
+					conn.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (now - self.idempotency_ttl,))
+					conn.execute(
+						"INSERT INTO idempotency_keys(key, memory_id, created_at) VALUES (?, ?, ?)",
+						(idempotency_key, memory.id, now),
+					)
+				return memory
+		except sqlite3.IntegrityError:
+			# A concurrent call with the same key committed first; this insert was rolled back
+			earlier = self.replay(idempotency_key) if idempotency_key else None
+			if earlier is None:
+				raise
+			return earlier[0]
+
+	def replay(self, idempotency_key: str) -> Optional[Tuple[Memory, Optional[str]]]:
+		"""The memory stored under a live idempotency key, and the answer saved for it."""
+		with self._conn() as conn:
+			row = conn.execute(
+				"""
+				SELECT m.*, k.response AS idempotent_response
+				FROM idempotency_keys k JOIN memories m ON m.id = k.memory_id
+				WHERE k.key = ? AND k.created_at >= ?
+				""",
+				(idempotency_key, time.time() - self.idempotency_ttl),
+			).fetchone()
+			if row is None:
+				return None
+			return self._row_to_memory(row), row["idempotent_response"]
+
+	def save_response(self, idempotency_key: str, response: str) -> None:
+		"""Keep the answer given for a keyed submission, so a retry can repeat it."""
+		with self._conn() as conn:
+			conn.execute("UPDATE idempotency_keys SET response = ? WHERE key = ?", (response, idempotency_key))
+
+	def import_memories(self, records: Iterable[dict]) -> List[int]:
+		"""Store a batch of memories in one transaction and return their new ids.
+
+		Records look like export rows: text plus optional tags (list or
+		space-separated), source, language and created_at. Their ids are not kept.
+		"""
+		rows = []
+		for record in records:
+			text = str(record.get("text") or "")
+			if not text.strip():
+				raise ValueError("Memory text cannot be empty")
+			tags = record.get("tags") or ""
+			created = record.get("created_at")
+			when = datetime.fromisoformat(created) if created else datetime.now(timezone.utc)
+			if when.tzinfo is None:
+				when = when.replace(tzinfo=timezone.utc)
+			rows.append((
+				text,
+				record.get("language") or langid.classify(text)[0],
+				tags if isinstance(tags, str) else " ".join(tags),
+				record.get("source") or "",
+				when,
+			))
 		with self._conn() as conn:
+			return [self._insert(conn, *row).id for row in rows]
+
+	def _insert(
+		self, conn: sqlite3.Connection, text: str, language: str, tags: str, source: str, now: datetime
+	) -> Memory:
+		values = (text, language, tags, source, now.isoformat())
+		if _HAS_RETURNING:
+			row = conn.execute(
+				"INSERT INTO memories(text, language, tags, source, created_at) VALUES (?, ?, ?, ?, ?) RETURNING *",
+				values,
+			).fetchone()
+		else:
 			cur = conn.execute(
 				"INSERT INTO memories(text, language, tags, source, created_at) VALUES (?, ?, ?, ?, ?)",
-				(text, language, tags_str, source or "", created_at),
+				values,
 			)
-			return int(cur.lastrowid)
+			row = conn.execute("SELECT * FROM memories WHERE id = ?", (cur.lastrowid,)).fetchone()
+		memory = self._row_to_memory(row)
+		self._index_facts(conn, memory.id, text)
+		self._index_reminder(conn, memory.id, text, now)
+		self._index_profile(conn, memory.id, text)
+		return memory
 
-	def list_recent(self, limit: int = 20) -> List[Memory]:
+	@staticmethod
+	def _generation(conn: sqlite3.Connection) -> Tuple[int, int]:
+		row = conn.execute(
+			"SELECT IFNULL((SELECT MAX(id) FROM memories), 0), (SELECT revision FROM store_version WHERE id = 1)"
+		).fetchone()
+		return int(row[0]), int(row[1] or 0)
+
+	def generation(self) -> Tuple[int, int]:
+		"""(max id, revision): changes whenever any process adds, deletes or edits a memory."""
+		with self._conn() as conn:
+			return self._generation(conn)
+
+	def _read(self, key: Hashable, query: Callable[[sqlite3.Connection], Any]) -> Any:
+		"""query(conn), reused while the generation it was read at is current."""
 		with self._conn() as conn:
+			if self.read_cache_size <= 0:
+				return query(conn)
+			generation = self._generation(conn)
+			with self._read_lock:
+				cached = self._read_cache.get(key)
+				if cached is not None and cached[0] == generation:
+					self._read_cache.move_to_end(key)
+					self.read_hits += 1
+					return cached[1]
+			result = query(conn)
+			with self._read_lock:
+				self.read_misses += 1
+				self._read_cache[key] = (generation, result)
+				while len(self._read_cache) > self.read_cache_size:
+					self._read_cache.popitem(last=False)
+			return result
+
+	def count(self) -> int:
+		return self._read(("count",), lambda conn: int(conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]))
+
+	def list_recent(self, limit: int = 20) -> List[Memory]:
+		def query(conn: sqlite3.Connection) -> List[Memory]:
 			rows = conn.execute(
 				"SELECT * FROM memories ORDER BY id DESC LIMIT ?", (limit,)
 			).fetchall()
 			return [self._row_to_memory(r) for r in rows]
 
+		return list(self._read(("recent", limit), query))
+
+	def export_batch(self, after_id: int = 0, limit: int = 500) -> List[Memory]:
+		"""The next limit memories by id after after_id; page through with the last id returned."""
+		with self._conn() as conn:
+			rows = conn.execute(
+				"SELECT * FROM memories WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+			).fetchall()
+			return [self._row_to_memory(r) for r in rows]
+
 	def ask(self, query: str, limit: int = 5) -> List[Tuple[Memory, float]]:
 		# Use FTS5 BM25 ranking
 		if not query.strip():
 			return []
-		with self._conn() as conn:
+		return list(self._flights.do(("ask", query, limit), self._ask, query, limit))
+
+	def _ask(self, query: str, limit: int) -> List[Tuple[Memory, float]]:
+		def search(conn: sqlite3.Connection) -> List[Tuple[Memory, float]]:
 			rows = conn.execute(
 				"""
 				SELECT m.*, bm25(memories_fts) AS score
@@ -116,9 +441,120 @@ class MemoryStore:
 			).fetchall()
 			return [(self._row_to_memory(r), float(r["score"])) for r in rows]
 
-	def delete(self, memory_id: int) -> None:
+		return self._read(("ask", query, limit), search)
+
+	def facts(self, memory_id: int) -> List[Tuple[str, str]]:
 		with self._conn() as conn:
-			conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
+			rows = conn.execute(
+				"SELECT kind, value FROM memory_facts WHERE memory_id = ? ORDER BY rowid",
+				(memory_id,),
+			).fetchall()
+			return [(str(r["kind"]), str(r["value"])) for r in rows]
+
+	def find_by_fact(
+		self, kinds: Iterable[str], value: Optional[str] = None, limit: int = 20
+	) -> List[Memory]:
+		# Indexed lookup on memory_facts(kind, value), newest memories first
+		kinds = list(kinds)
+		if not kinds:
+			return []
+		placeholders = ", ".join("?" for _ in kinds)
+		sql = f"SELECT DISTINCT memory_id FROM memory_facts WHERE kind IN ({placeholders})"
+		params: list = list(kinds)
+		if value is not None:
+			sql += " AND value = ?"
+			params.append(" ".join(value.lower().split()))
+		with self._conn() as conn:
+			rows = conn.execute(
+				f"""
+				SELECT m.* FROM memories m
+				WHERE m.id IN ({sql})
+				ORDER BY m.id DESC LIMIT ?
+				""",
+				(*params, limit),
+			).fetchall()
+			return [self._row_to_memory(r) for r in rows]
+
+	def profile(self) -> Dict[str, List[ProfileFact]]:
+		"""The profile digest: current durable facts grouped by topic."""
+		with self._conn() as conn:
+			rows = conn.execute("SELECT key, topic, fact, memory_id FROM profile_facts ORDER BY key").fetchall()
+		order = {topic: i for i, topic in enumerate(PROFILE_TOPICS)}
+		digest: Dict[str, List[ProfileFact]] = {}
+		for r in sorted(rows, key=lambda r: order.get(r["topic"], len(order))):
+			digest.setdefault(str(r["topic"]), []).append(
+				ProfileFact(str(r["topic"]), str(r["key"]), str(r["fact"]), int(r["memory_id"]))
+			)
+		return digest
+
+	def reminder(self, memory_id: int) -> Optional[Reminder]:
+		with self._conn() as conn:
+			row = conn.execute(
+				"""
+				SELECT m.*, r.due_at, r.notified
+				FROM reminders r JOIN memories m ON m.id = r.memory_id
+				WHERE r.memory_id = ?
+				""",
+				(memory_id,),
+			).fetchone()
+			return self._row_to_reminder(row) if row else None
+
+	def upcoming_reminders(
+		self,
+		start: Optional[datetime] = None,
+		within: timedelta = timedelta(days=7),
+		limit: int = 5,
+		pending_only: bool = False,
+	) -> List[Reminder]:
+		# Range query on reminders(due_at), soonest first
+		start = start or datetime.now(timezone.utc)
+		sql = """
+			SELECT m.*, r.due_at, r.notified
+			FROM reminders r JOIN memories m ON m.id = r.memory_id
+			WHERE r.due_at >= ? AND r.due_at < ?
+		"""
+		if pending_only:
+			sql += " AND r.notified = 0"
+		sql += " ORDER BY r.due_at LIMIT ?"
+		with self._conn() as conn:
+			rows = conn.execute(
+				sql,
+				(
+					start.astimezone(timezone.utc).isoformat(timespec="seconds"),
+					(start + within).astimezone(timezone.utc).isoformat(timespec="seconds"),
+					limit,
+				),
+			).fetchall()
+			return [self._row_to_reminder(r) for r in rows]
+
+	def mark_reminder_notified(self, memory_id: int) -> None:
+		with self._conn() as conn:
+			conn.execute("UPDATE reminders SET notified = 1 WHERE memory_id = ?", (memory_id,))
+
+	def delete(self, memory_id: int) -> bool:
+		"""Delete a memory; False if there was none with that id."""
+		with self._conn() as conn:
+			keys = [row["key"] for row in conn.execute("SELECT key FROM profile_facts WHERE memory_id = ?", (memory_id,))]
+			deleted = conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,)).rowcount > 0
+			if keys:
+				self._rebuild_profile(conn, keys)
+			return deleted
+
+	@staticmethod
+	def _rebuild_profile(conn: sqlite3.Connection, keys: Sequence[str]) -> None:
+		"""Refill emptied profile slots from the newest remaining memory that states them."""
+		missing = set(keys)
+		for row in conn.execute("SELECT id, text FROM memories ORDER BY id DESC"):
+			# Within one memory the last statement of a slot wins, as in _index_profile
+			for topic, key, fact in reversed(extract_profile(str(row["text"]))):
+				if key in missing:
+					conn.execute(
+						"INSERT OR REPLACE INTO profile_facts(key, topic, fact, memory_id) VALUES (?, ?, ?, ?)",
+						(key, topic, fact, int(row["id"])),
+					)
+					missing.discard(key)
+			if not missing:
+				return
 
 	@staticmethod
 	def _row_to_memory(row: sqlite3.Row) -> Memory:
@@ -131,3 +567,11 @@ class MemoryStore:
 			created_at=str(row["created_at"]),
 		)
 
+	@classmethod
+	def _row_to_reminder(cls, row: sqlite3.Row) -> Reminder:
+		return Reminder(
+			memory=cls._row_to_memory(row),
+			due_at=row["due_at"],
+			notified=bool(row["notified"]),
+		)
+
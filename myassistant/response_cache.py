@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Sequence
+
+from .config import connect_db, get_db_path, get_env_int
+
+
+def normalize_prompt(text: str) -> str:
+	"""Case, whitespace and trailing punctuation do not change the answer."""
+	return re.sub(r"[\s?!.]+$", "", " ".join(text.lower().split()))
+
+
+def make_key(
+	model: str,
+	prompt: str,
+	memory_ids: Iterable[int],
+	history: Sequence[dict] = (),
+	summary: str = "",
+) -> str:
+	"""Cache key for a completion: model, normalized prompt and the memories in context.
+
+	history (the earlier turns sent with the prompt) and summary (the
+	conversation summary in the system prompt) are part of the key, so an
+	answer given in one conversation is not reused in another.
+	"""
+	key = [model, normalize_prompt(prompt), sorted(set(memory_ids))]
+	if history or summary:
+		key.append([[t.get("role"), t.get("content")] for t in history])
+		key.append(summary)
+	payload = json.dumps(key)
+	return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+	"""LLM completions cached in the memories database.
+
+	Entries expire after ttl seconds and the least recently used ones are
+	evicted beyond max_entries. Because the key includes the ids of the
+	memories that were in context, storing a memory that changes the context
+	is a cache miss. A ttl of 0 disables the cache.
+	"""
+
+	def __init__(
+		self,
+		db_path: Optional[str] = None,
+		ttl: Optional[int] = None,
+		max_entries: Optional[int] = None,
+	) -> None:
+		self.db_path = str(db_path or get_db_path())
+		self.ttl = ttl if ttl is not None else get_env_int("ASSISTANT_CACHE_TTL_SECONDS", 86400)
+		self.max_entries = max_entries or get_env_int("ASSISTANT_CACHE_MAX_ENTRIES", 1000)
+		self.hits = 0
+		self.misses = 0
+		self._ensure_schema()
+
+	@property
+	def enabled(self) -> bool:
+		return self.ttl > 0
+
+	@contextmanager
+	def _conn(self):
+		conn = connect_db(self.db_path)
+		try:
+			yield conn
+			conn.commit()
+		finally:
+			conn.close()
+
+	def _ensure_schema(self) -> None:
+		with self._conn() as conn:
+			conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS llm_cache (
+					key TEXT PRIMARY KEY,
+					model TEXT NOT NULL,
+					response TEXT NOT NULL,
+					created_at REAL NOT NULL,
+					last_used REAL NOT NULL
+				);
+				CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used);
+				"""
+			)
+
+	def get(self, key: str) -> Optional[str]:
+		if not self.enabled:
+			return None
+		now = time.time()
+		with self._conn() as conn:
+			row = conn.execute(
+				"SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+			).fetchone()
+			if row is None or row[1] < now - self.ttl:
+				if row is not None:
+					conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+				self.misses += 1
+				return None
+			conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+			self.hits += 1
+			return str(row[0])
+
+	def put(self, key: str, model: str, response: str) -> None:
+		if not self.enabled:
+			return
+		now = time.time()
+		with self._conn() as conn:
+			conn.execute(
+				"""
+				INSERT OR REPLACE INTO llm_cache(key, model, response, created_at, last_used)
+				VALUES (?, ?, ?, ?, ?)
+				""",
+				(key, model, response, now, now),
+			)
+			conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+			conn.execute(
+				"""
+				DELETE FROM llm_cache WHERE key IN (
+					SELECT key FROM llm_cache ORDER BY last_used DESC, rowid DESC LIMIT -1 OFFSET ?
+				)
+				""",
+				(self.max_entries,),
+			)
+
+	def clear(self) -> None:
+		with self._conn() as conn:
+			conn.execute("DELETE FROM llm_cache")
+
+
+_caches: Dict[str, ResponseCache] = {}
+
+
+def get_cache(db_path: Optional[str] = None) -> ResponseCache:
+	"""Shared cache for a database file."""
+	path = str(db_path or get_db_path())
+	cache = _caches.get(path)
+	if cache is None:
+		cache = _caches[path] = ResponseCache(path)
+	return cache
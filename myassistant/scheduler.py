@@ -0,0 +1,117 @@
+"""
+Reminder scheduler for the web process
+Keeps reminders due soon in a heap and pushes each one when it falls due
+"""
+import asyncio
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .memory_store import MemoryStore, Reminder
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        store: MemoryStore,
+        notify: Callable[[Reminder], Awaitable[None]],
+        horizon: timedelta = timedelta(hours=1),
+        grace: timedelta = timedelta(minutes=15),
+        per_worker: bool = False,
+    ):
+        self.store = store
+        self.notify = notify
+        # Reminders due within the horizon are held in memory; later ones are
+        # picked up by the next refill. Reminders missed by less than the grace
+        # period (e.g. during a restart) are still delivered.
+        self.horizon = horizon
+        self.grace = grace
+        # With several workers each one pushes to its own pages, so another
+        # worker marking a reminder notified must not stop this one; the
+        # shared flag then only keeps refills from queueing old reminders
+        self.per_worker = per_worker
+        self._delivered: Dict[int, str] = {}
+        self._heap: List[Tuple[str, int]] = []
+        self._queued: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def add(self, reminder: Reminder) -> None:
+        """Schedule a newly stored reminder if it falls within the horizon
+
+        Call this on the scheduler's event loop, not from a worker thread
+        """
+        memory_id = reminder.memory.id
+        if not reminder.due_at or memory_id in self._queued or memory_id in self._delivered:
+            return
+        if reminder.notified and not self.per_worker:
+            return
+        if datetime.fromisoformat(reminder.due_at) > datetime.now(timezone.utc) + self.horizon:
+            return
+        heapq.heappush(self._heap, (reminder.due_at, memory_id))
+        self._queued.add(memory_id)
+        self._wakeup.set()
+
+    def _refill(self, start: datetime) -> List[Reminder]:
+        """Reminders due soon, read in a worker thread and added on the loop by the caller"""
+        return self.store.upcoming_reminders(
+            start=start, within=self.grace + self.horizon, limit=1000, pending_only=True
+        )
+
+    async def _run(self) -> None:
+        next_refill = datetime.now(timezone.utc)
+        while True:
+            now = datetime.now(timezone.utc)
+            if now >= next_refill:
+                start = now - self.grace
+                # Deliveries older than the grace period can no longer be refilled
+                for memory_id, due_at in list(self._delivered.items()):
+                    if datetime.fromisoformat(due_at) < start:
+                        del self._delivered[memory_id]
+                try:
+                    for reminder in await asyncio.to_thread(self._refill, start):
+                        self.add(reminder)
+                except Exception as e:
+                    print(f"Reminder refill error: {e}")
+                next_refill = now + self.horizon / 2
+
+            while self._heap and datetime.fromisoformat(self._heap[0][0]) <= now:
+                _, memory_id = heapq.heappop(self._heap)
+                self._queued.discard(memory_id)
+                await self._fire(memory_id)
+
+            wake_at = next_refill
+            if self._heap:
+                wake_at = min(wake_at, datetime.fromisoformat(self._heap[0][0]))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=max((wake_at - now).total_seconds(), 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, memory_id: int) -> None:
+        try:
+            # Re-read so deleted or already delivered reminders are skipped
+            reminder = await asyncio.to_thread(self.store.reminder, memory_id)
+            if reminder is None or (reminder.notified and not self.per_worker):
+                return
+            self._delivered[memory_id] = reminder.due_at
+            await self.notify(reminder)
+            await asyncio.to_thread(self.store.mark_reminder_notified, memory_id)
+        except Exception as e:
+            print(f"Reminder delivery error: {e}")
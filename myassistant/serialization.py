@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .memory_store import Memory
+from .static_assets import etag_matches
+
+try:  # Optional: several times faster than the stdlib encoder
+	import orjson
+except ImportError:
+	orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+	"""Compact UTF-8 JSON."""
+	if orjson is not None:
+		return orjson.dumps(obj)
+	return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+	"""Compact JSON text, e.g. for websocket frames."""
+	if orjson is not None:
+		return orjson.dumps(obj).decode("utf-8")
+	return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def join_array(items: Iterable[bytes]) -> bytes:
+	"""A JSON array from already-encoded elements."""
+	return b"[" + b",".join(items) + b"]"
+
+
+def memory_dict(m: Memory) -> Dict[str, Any]:
+	"""The public shape of a memory, with tags as a list."""
+	return {
+		"id": m.id,
+		"text": m.text,
+		"language": m.language,
+		"tags": [t for t in m.tags.split(" ") if t],
+		"source": m.source,
+		"created_at": m.created_at,
+	}
+
+
+class MemoryEncoder:
+	"""Keeps each memory's dict and encoded JSON so hot rows are encoded once.
+
+	Entries are keyed by id and checked against the row's fields, so an
+	edited memory is re-encoded rather than served stale.
+	"""
+
+	def __init__(self, max_entries: int = 4096) -> None:
+		self.max_entries = max_entries
+		self.hits = 0
+		self.misses = 0
+		self._entries: "OrderedDict[int, Tuple[tuple, Dict[str, Any], bytes]]" = OrderedDict()
+		self._lock = threading.Lock()
+
+	def _entry(self, m: Memory) -> Tuple[tuple, Dict[str, Any], bytes]:
+		fields = (m.text, m.language, m.tags, m.source, m.created_at)
+		with self._lock:
+			entry = self._entries.get(m.id)
+			if entry is not None and entry[0] == fields:
+				self._entries.move_to_end(m.id)
+				self.hits += 1
+				return entry
+		data = memory_dict(m)
+		entry = (fields, data, dumps(data))
+		with self._lock:
+			self.misses += 1
+			self._entries[m.id] = entry
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+		return entry
+
+	def as_dict(self, m: Memory) -> Dict[str, Any]:
+		"""The cached dict; copy it before changing it."""
+		return self._entry(m)[1]
+
+	def as_json(self, m: Memory) -> bytes:
+		return self._entry(m)[2]
+
+	def list_json(self, memories: Sequence[Memory]) -> bytes:
+		return join_array(self.as_json(m) for m in memories)
+
+	def scored_json(self, pairs: Sequence[Tuple[Memory, float]]) -> bytes:
+		"""{"results": [{"memory": ..., "score": ...}]}, as /ask returns."""
+		items = (b'{"memory":' + self.as_json(m) + b',"score":' + dumps(float(score)) + b"}" for m, score in pairs)
+		return b'{"results":' + join_array(items) + b"}"
+
+	def forget(self, memory_id: int) -> None:
+		with self._lock:
+			self._entries.pop(memory_id, None)
+
+
+class JSONBytesResponse(Response):
+	"""JSON response that sends pre-encoded bytes as they are, and encodes anything else with dumps()."""
+
+	media_type = "application/json"
+
+	def render(self, content: Any) -> bytes:
+		if isinstance(content, (bytes, bytearray, memoryview)):
+			return bytes(content)
+		return dumps(content)
+
+
+# Shared by the API and the web app
+memory_encoder = MemoryEncoder()
+
+
+def generation_etag(generation: Tuple[int, int]) -> str:
+	return f'"g{generation[0]}-{generation[1]}"'
+
+
+def conditional_json(request: Request, generation: Tuple[int, int], build: Callable[[], Any]) -> Response:
+	"""304 if the client's ETag matches the store generation, else build() as JSON.
+
+	build is only called on a miss, so an unchanged store costs one
+	generation lookup: no search, no rows and no encoding. The generation
+	is read before the body, so a write in between only makes the next
+	request miss.
+	"""
+	headers = {"ETag": generation_etag(generation), "Cache-Control": "no-cache"}
+	if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+		return Response(status_code=304, headers=headers)
+	return JSONBytesResponse(build(), headers=headers)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from .config import connect_db, get_db_path, get_env_flag, get_env_int
+
+DEFAULT_SESSION = "default"
+
+
+@dataclass
+class Session:
+	id: str
+	turns: Deque[Dict[str, str]]
+	# Total turns ever recorded; the ring buffer only keeps the newest ones
+	turn_count: int = 0
+	last_seen: float = field(default_factory=time.monotonic)
+	# Rolling summary of turns that were folded out of the buffer
+	summary: str = ""
+
+	def add(self, turn: Dict[str, str]) -> None:
+		self.turns.append(turn)
+		self.turn_count += 1
+
+
+class SessionManager:
+	"""Per-client conversation state with bounded memory.
+
+	Each session keeps a fixed-size ring buffer of turns. Sessions idle for
+	longer than idle_timeout seconds are evicted, and when more than
+	max_sessions are live the least recently used one is evicted. With
+	persistence on, evicted sessions are written to SQLite and reloaded on
+	their next use, so they survive eviction and restarts.
+	"""
+
+	def __init__(
+		self,
+		max_sessions: Optional[int] = None,
+		max_turns: Optional[int] = None,
+		idle_timeout: Optional[float] = None,
+		db_path: Optional[str] = None,
+	) -> None:
+		self.max_sessions = max_sessions or get_env_int("ASSISTANT_MAX_SESSIONS", 1000)
+		self.max_turns = max_turns or get_env_int("ASSISTANT_SESSION_TURNS", 20)
+		self.idle_timeout = idle_timeout or get_env_int("ASSISTANT_SESSION_IDLE_SECONDS", 1800)
+		self.db_path = db_path
+		self._sessions: OrderedDict[str, Session] = OrderedDict()
+		self._lock = threading.Lock()
+		if self.db_path:
+			self._ensure_schema()
+
+	@classmethod
+	def from_env(cls, db_path: Optional[str] = None) -> "SessionManager":
+		"""Build a manager that persists to the memories database if ASSISTANT_SESSION_PERSIST is set."""
+		if get_env_flag("ASSISTANT_SESSION_PERSIST"):
+			return cls(db_path=str(db_path or get_db_path()))
+		return cls()
+
+	@contextmanager
+	def _conn(self):
+		conn = connect_db(self.db_path)
+		try:
+			yield conn
+			conn.commit()
+		finally:
+			conn.close()
+
+	def _ensure_schema(self) -> None:
+		with self._conn() as conn:
+			conn.execute(
+				"""
+				CREATE TABLE IF NOT EXISTS sessions (
+					session_id TEXT PRIMARY KEY,
+					turns TEXT NOT NULL,
+					turn_count INTEGER NOT NULL,
+					updated_at REAL NOT NULL
+				);
+				"""
+			)
+			columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+			if "summary" not in columns:
+				conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+
+	def get(self, session_id: str = DEFAULT_SESSION) -> Session:
+		with self._lock:
+			now = time.monotonic()
+			self._evict_idle(now)
+			session = self._sessions.get(session_id)
+			if session is None:
+				session = self._load(session_id) or Session(session_id, deque(maxlen=self.max_turns))
+				self._sessions[session_id] = session
+				while len(self._sessions) > self.max_sessions:
+					_, oldest = self._sessions.popitem(last=False)
+					self._save(oldest)
+			else:
+				self._sessions.move_to_end(session_id)
+			session.last_seen = now
+			return session
+
+	def history(self, session_id: str = DEFAULT_SESSION) -> List[Dict[str, str]]:
+		return list(self.get(session_id).turns)
+
+	def clear(self, session_id: str = DEFAULT_SESSION) -> None:
+		with self._lock:
+			self._sessions.pop(session_id, None)
+			if self.db_path:
+				with self._conn() as conn:
+					conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+	def flush(self) -> None:
+		"""Write every live session to SQLite (e.g. on shutdown)."""
+		with self._lock:
+			for session in self._sessions.values():
+				self._save(session)
+
+	def __len__(self) -> int:
+		return len(self._sessions)
+
+	def _evict_idle(self, now: float) -> None:
+		# Sessions are ordered by last use, so idle ones are at the front
+		while self._sessions:
+			session = next(iter(self._sessions.values()))
+			if now - session.last_seen < self.idle_timeout:
+				break
+			self._sessions.popitem(last=False)
+			self._save(session)
+
+	def _save(self, session: Session) -> None:
+		if not self.db_path or not (session.turns or session.summary):
+			return
+		with self._conn() as conn:
+			conn.execute(
+				"""
+				INSERT OR REPLACE INTO sessions(session_id, turns, turn_count, updated_at, summary)
+				VALUES (?, ?, ?, ?, ?)
+				""",
+				(
+					session.id,
+					json.dumps(list(session.turns), ensure_ascii=False),
+					session.turn_count,
+					time.time(),
+					session.summary,
+				),
+			)
+
+	def _load(self, session_id: str) -> Optional[Session]:
+		if not self.db_path:
+			return None
+		with self._conn() as conn:
+			row = conn.execute(
+				"SELECT turns, turn_count, summary FROM sessions WHERE session_id = ?", (session_id,)
+			).fetchone()
+		if row is None:
+			return None
+		return Session(
+			session_id, deque(json.loads(row[0]), maxlen=self.max_turns), int(row[1]), summary=row[2]
+		)
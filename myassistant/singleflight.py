@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .config import get_env_int
+
+
+def _default_timeout() -> float:
+	return float(get_env_int("ASSISTANT_FLIGHT_TIMEOUT_SECONDS", 30))
+
+
+class _Call:
+	__slots__ = ("done", "result", "error", "waiters")
+
+	def __init__(self) -> None:
+		self.done = threading.Event()
+		self.result: Any = None
+		self.error: Optional[BaseException] = None
+		self.waiters = 0
+
+
+class SingleFlight:
+	"""Coalesces concurrent calls with the same key into one computation.
+
+	The first caller for a key runs the function; callers arriving while it
+	is in flight wait (up to timeout seconds) and share its result or its
+	exception. Nothing is cached once the call completes.
+	"""
+
+	def __init__(self, timeout: Optional[float] = None) -> None:
+		self.timeout = timeout if timeout is not None else _default_timeout()
+		self.coalesced = 0
+		self._calls: Dict[Hashable, _Call] = {}
+		self._lock = threading.Lock()
+
+	def do(
+		self,
+		key: Hashable,
+		fn: Callable[..., Any],
+		*args: Any,
+		timeout: Optional[float] = None,
+		**kwargs: Any,
+	) -> Any:
+		with self._lock:
+			call = self._calls.get(key)
+			leader = call is None
+			if leader:
+				call = self._calls[key] = _Call()
+			else:
+				call.waiters += 1
+				self.coalesced += 1
+
+		if leader:
+			try:
+				call.result = fn(*args, **kwargs)
+			except BaseException as e:
+				call.error = e
+			finally:
+				with self._lock:
+					del self._calls[key]
+				call.done.set()
+		elif not call.done.wait(self.timeout if timeout is None else timeout):
+			raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+
+		if call.error is not None:
+			raise call.error
+		return call.result
+
+
+class AsyncSingleFlight:
+	"""SingleFlight for coroutines on one event loop.
+
+	Besides do(), callers that produce their result incrementally (e.g. a
+	token stream) can use claim()/finish(): claim() returns None to the
+	leader, which must call finish(), and an in-flight future to followers.
+	"""
+
+	def __init__(self, timeout: Optional[float] = None) -> None:
+		self.timeout = timeout if timeout is not None else _default_timeout()
+		self.coalesced = 0
+		self._futures: Dict[Hashable, asyncio.Future] = {}
+
+	def claim(self, key: Hashable) -> Optional[asyncio.Future]:
+		future = self._futures.get(key)
+		if future is None:
+			self._futures[key] = asyncio.get_running_loop().create_future()
+			return None
+		self.coalesced += 1
+		return future
+
+	def finish(self, key: Hashable, result: Any = None, error: Optional[BaseException] = None) -> None:
+		future = self._futures.pop(key, None)
+		if future is None or future.done():
+			return
+		if error is not None:
+			future.set_exception(error)
+			# Mark retrieved so a leader-only failure does not log "never retrieved"
+			future.exception()
+		else:
+			future.set_result(result)
+
+	async def wait(self, future: asyncio.Future, timeout: Optional[float] = None) -> Any:
+		try:
+			return await asyncio.wait_for(
+				asyncio.shield(future), self.timeout if timeout is None else timeout
+			)
+		except asyncio.TimeoutError:
+			raise TimeoutError("Timed out waiting for in-flight call") from None
+
+	async def do(
+		self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None
+	) -> Any:
+		future = self.claim(key)
+		if future is not None:
+			return await self.wait(future, timeout)
+		try:
+			result = await fn()
+		except BaseException as e:
+			self.finish(key, error=e)
+			raise
+		self.finish(key, result)
+		return result
+
+
+# Shared by every engine so identical prompts coalesce across engine instances
+llm_flights = SingleFlight()
+llm_async_flights = AsyncSingleFlight()
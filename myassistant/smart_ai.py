@@ -3,23 +3,42 @@ Smart Local AI System - Advanced memory-based responses
 No external APIs required - works completely offline
 """
 import re
-from typing import List, Tuple, Dict
+from typing import Dict, List, Optional, Tuple
+from myassistant.facts import question_fact_kinds
+from myassistant.keyword_matcher import KeywordMatcher
 from myassistant.memory_store import MemoryStore
+from myassistant.sessions import DEFAULT_SESSION, Session, SessionManager
+
+INTENT_MATCHER = KeywordMatcher({
+    "greeting": [
+        "hello", "hi", "hey", "good morning", "good afternoon", "good evening",
+        "how are you", "what's up", "greetings"
+    ],
+    "question": [
+        "what", "who", "when", "where", "why", "how", "which", "whose",
+        "?", "tell me", "show me", "give me", "find", "search"
+    ],
+    "statement": [
+        "my", "i have", "i am", "i like", "i need", "i want", "i remember",
+        "remember", "note", "save", "store", "write down"
+    ],
+})
 
 class SmartAI:
-    def __init__(self):
-        self.conversation_history = []
+    def __init__(self, sessions: Optional[SessionManager] = None):
+        self.sessions = sessions if sessions is not None else SessionManager()
         print("Smart AI system initialized - advanced memory matching!")
     
-    def get_response(self, user_message: str, memory_store: MemoryStore = None) -> str:
+    def get_response(self, user_message: str, memory_store: MemoryStore = None, session_id: str = DEFAULT_SESSION) -> str:
         """
         Get intelligent response using advanced memory matching
         """
         if not memory_store:
             return "I'm ready to help! Please provide some information first."
         
-        # Add to conversation history
-        self.conversation_history.append({"user": user_message})
+        # Add to this client's conversation history
+        session = self.sessions.get(session_id)
+        session.add({"user": user_message})
         
         # Clean and analyze the message
         message_lower = user_message.lower().strip()
@@ -28,45 +47,28 @@ class SmartAI:
         message_type = self._analyze_message_type(message_lower)
         
         if message_type == "greeting":
-            return self._handle_greeting()
+            return self._handle_greeting(session)
         elif message_type == "question":
             return self._answer_question_intelligently(user_message, memory_store)
         elif message_type == "statement":
-            return self._handle_statement(user_message)
+            return self._handle_statement(user_message, session)
         else:
             return self._handle_unclear_message(user_message, memory_store)
     
     def _analyze_message_type(self, message: str) -> str:
         """Analyze message to determine type"""
-        # Greeting patterns
-        greeting_patterns = [
-            r'\b(hello|hi|hey|good morning|good afternoon|good evening)\b',
-            r'\b(how are you|what\'s up|greetings)\b'
-        ]
-        
-        for pattern in greeting_patterns:
-            if re.search(pattern, message):
-                return "greeting"
+        categories = INTENT_MATCHER.classify(message)
         
-        # Question patterns
-        question_words = ['what', 'who', 'when', 'where', 'why', 'how', 'which', 'whose']
-        question_indicators = ['?', 'tell me', 'show me', 'give me', 'find', 'search']
-        
-        if any(word in message for word in question_words) or any(indicator in message for indicator in question_indicators):
+        if "greeting" in categories:
+            return "greeting"
+        if "question" in categories:
             return "question"
-        
-        # Statement patterns
-        statement_indicators = [
-            'my', 'i have', 'i am', 'i like', 'i need', 'i want', 'i remember',
-            'remember', 'note', 'save', 'store', 'write down'
-        ]
-        
-        if any(indicator in message for indicator in statement_indicators):
+        if "statement" in categories:
             return "statement"
         
         return "unclear"
     
-    def _handle_greeting(self) -> str:
+    def _handle_greeting(self, session: Session) -> str:
         """Handle greeting messages"""
         greetings = [
             "Hello! I'm MyAssistant. I'm here to help you remember things and answer questions!",
@@ -75,13 +77,27 @@ class SmartAI:
             "Hey! What would you like to remember or ask about today?",
             "Good to see you! I'm here to help with your information and questions."
         ]
-        return greetings[len(self.conversation_history) % len(greetings)]
+        return greetings[session.turn_count % len(greetings)]
     
     def _answer_question_intelligently(self, question: str, memory_store: MemoryStore) -> str:
         """Intelligently answer questions using advanced memory matching"""
         # Extract key terms from the question
         key_terms = self._extract_key_terms(question)
         
+        # Questions about a phone number, room, date or name are an indexed
+        # lookup on the facts extracted when the memory was stored
+        fact_kinds = question_fact_kinds(question)
+        if fact_kinds:
+            try:
+                candidates = memory_store.find_by_fact(fact_kinds, limit=20)
+            except Exception as e:
+                print(f"Error looking up facts: {e}")
+                candidates = []
+            # Require at least one key term on top of the base score
+            best_match = self._find_best_memory_match(question, key_terms, candidates, min_score=2)
+            if best_match:
+                return f"Based on what you told me: {best_match.text}"
+        
         # Get all memories
         try:
             all_memories = memory_store.list_recent(limit=50)  # Get more memories for better matching
@@ -124,7 +140,7 @@ class SmartAI:
         key_terms = [word for word in words if word not in stop_words and len(word) > 2]
         return key_terms
     
-    def _find_best_memory_match(self, question: str, key_terms: List[str], memories: List) -> object:
+    def _find_best_memory_match(self, question: str, key_terms: List[str], memories: List, min_score: int = 1) -> object:
         """Find the best matching memory using advanced scoring"""
         best_match = None
         best_score = 0
@@ -136,7 +152,7 @@ class SmartAI:
                 best_match = memory
         
         # Only return a match if it has a reasonable score
-        if best_score >= 1:  # At least one meaningful word match
+        if best_score >= min_score:  # At least one meaningful word match
             return best_match
         
         return None
@@ -144,7 +160,6 @@ class SmartAI:
     def _calculate_match_score(self, question: str, key_terms: List[str], memory_text: str) -> int:
         """Calculate how well a memory matches the question"""
         memory_lower = memory_text.lower()
-        question_lower = question.lower()
         
         score = 0
         
@@ -160,18 +175,6 @@ class SmartAI:
                     if term in word or word in term:
                         score += 1
         
-        # Question-specific matching
-        if 'phone' in question_lower and ('phone' in memory_lower or 'number' in memory_lower):
-            score += 5
-        if 'room' in question_lower and 'room' in memory_lower:
-            score += 5
-        if 'meeting' in question_lower and 'meeting' in memory_lower:
-            score += 5
-        if 'color' in question_lower and 'color' in memory_lower:
-            score += 5
-        if 'name' in question_lower and ('name' in memory_lower or 'called' in memory_lower):
-            score += 5
-        
         # Boost score for recent memories
         # (This is a simple approximation - in reality, we'd need to track timestamps)
         score += 1  # Small boost for all memories
@@ -189,7 +192,7 @@ class SmartAI:
             recent_memories = [f"'{mem.text}'" for mem in memories[:3]]
             return f"I have {len(memories)} memories stored. Here are the most recent ones: {', '.join(recent_memories)}. Could you be more specific about what you're looking for?"
     
-    def _handle_statement(self, statement: str) -> str:
+    def _handle_statement(self, statement: str, session: Session) -> str:
         """Handle statements (information being stored)"""
         responses = [
             "Got it! I've stored that information for you.",
@@ -200,7 +203,7 @@ class SmartAI:
             "Excellent! I've stored that in my memory.",
             "Understood! I'll remember that information."
         ]
-        return responses[len(self.conversation_history) % len(responses)]
+        return responses[session.turn_count % len(responses)]
     
     def _handle_unclear_message(self, message: str, memory_store: MemoryStore) -> str:
         """Handle unclear messages by trying to find relevant information"""
@@ -225,7 +228,12 @@ class SmartAI:
         """Smart AI is always available"""
         return True
     
-    def clear_history(self):
+    @property
+    def conversation_history(self) -> list:
+        """Turns of the default session"""
+        return self.sessions.history(DEFAULT_SESSION)
+    
+    def clear_history(self, session_id: str = DEFAULT_SESSION):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.sessions.clear(session_id)
         print("Conversation history cleared")
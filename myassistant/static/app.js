@@ -0,0 +1,467 @@
+let isRecording = false;
+let recognition;
+let ws;
+// Partial answers being streamed, by request id
+let streamed = {};
+// Newest memories as last shown, kept current by broadcast events
+let recentMemories = [];
+// Submissions not yet answered, by request id; resent after a reconnect
+let pending = {};
+
+function newRequestId() {
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+// Stable id so reconnects keep the same conversation
+let clientId = localStorage.getItem('myassistantClientId');
+if (!clientId) {
+    clientId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    localStorage.setItem('myassistantClientId', clientId);
+}
+
+// Connect to WebSocket
+function connectWebSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
+
+    ws.onopen = function() {
+        console.log('Connected to MyAssistant');
+        // The request id doubles as the idempotency key, so the server
+        // answers these from what it already stored instead of storing twice
+        Object.values(pending).forEach(message => ws.send(JSON.stringify(message)));
+    };
+
+    ws.onmessage = function(event) {
+        const data = JSON.parse(event.data);
+        handleMessage(data);
+    };
+
+    ws.onclose = function() {
+        console.log('Disconnected from MyAssistant');
+        setTimeout(connectWebSocket, 3000);
+    };
+}
+
+function handleMessage(data) {
+    console.log('Received message:', data);
+    if (data.type === 'status') {
+        document.getElementById('status').textContent = data.message;
+    } else if (data.type === 'ai_delta') {
+        streamed[data.request_id] = (streamed[data.request_id] || '') + data.delta;
+        showStreamingResponse(streamed[data.request_id]);
+    } else if (data.type === 'memory_stored') {
+        // Sent right after saving; the answer follows as ai_response
+        document.getElementById('status').textContent = 'Memory stored!';
+        document.getElementById('memoryCount').textContent = `${data.count} memories stored`;
+        recentMemories = data.recent;
+        showRecentMemories(recentMemories);
+    } else if (data.type === 'ai_response') {
+        delete streamed[data.request_id];
+        delete pending[data.request_id];
+        console.log('AI response received:', data.ai_response);
+        showAIResponse(data.ai_response);
+    } else if (data.type === 'ai_upgrade') {
+        // A better answer arrived after the quick local one
+        showStreamingResponse(data.ai_response);
+    } else if (data.type === 'memory_created') {
+        // Broadcast to every open page, including the one that stored it
+        recentMemories = [data.memory, ...recentMemories.filter(m => m.id !== data.memory.id)].slice(0, 3);
+        showRecentMemories(recentMemories);
+    } else if (data.type === 'memory_deleted') {
+        recentMemories = recentMemories.filter(m => m.id !== data.memory_id);
+        showRecentMemories(recentMemories);
+    } else if (data.type === 'count_changed') {
+        document.getElementById('memoryCount').textContent = `${data.count} memories stored`;
+    } else if (data.type === 'resync') {
+        // Events were dropped while this page was too slow to keep up
+        refreshMemories(true);
+    } else if (data.type === 'reminder') {
+        showAIResponse(`Reminder: ${data.text}`);
+    } else if (data.type === 'error') {
+        delete pending[data.request_id];
+        document.getElementById('status').textContent = data.message;
+    }
+}
+
+function showRecentMemories(memories) {
+    const container = document.getElementById('recentMemories');
+    const list = document.getElementById('memoriesList');
+
+    if (memories && memories.length > 0) {
+        container.style.display = 'block';
+        list.innerHTML = memories.slice(0, 3).map(memory => `
+            <div class="memory-item">
+                ${memory.text}
+                <div class="memory-time">${new Date(memory.created_at).toLocaleString()}</div>
+            </div>
+        `).join('');
+    }
+}
+
+function showStreamingResponse(text) {
+    // Show partial text as it arrives; speech waits for the full answer
+    const aiResponseDiv = document.getElementById('aiResponse');
+    aiResponseDiv.querySelector('p').textContent = text;
+    aiResponseDiv.style.display = 'block';
+}
+
+function showAIResponse(response) {
+    console.log('Showing AI response:', response);
+    const aiResponseDiv = document.getElementById('aiResponse');
+    const responseText = aiResponseDiv.querySelector('p');
+    responseText.textContent = response;
+    aiResponseDiv.style.display = 'block';
+
+    // Speak the AI response with proper language
+    const currentLang = document.getElementById('languageSelect').value;
+    console.log('Speaking AI response with language:', currentLang);
+    speakWithLanguage(response, currentLang);
+
+    // Add click to dismiss functionality
+    aiResponseDiv.onclick = function() {
+        aiResponseDiv.style.display = 'none';
+    };
+
+    // Hide after 8 seconds (shorter since it's the only visible feedback)
+    setTimeout(() => {
+        aiResponseDiv.style.display = 'none';
+    }, 8000);
+}
+
+function speakText(text) {
+    if ('speechSynthesis' in window) {
+        console.log('Attempting to speak:', text);
+
+        // Stop any current speech
+        speechSynthesis.cancel();
+
+        const utterance = new SpeechSynthesisUtterance(text);
+        utterance.rate = 0.8;   // Siri's speaking rate
+        utterance.pitch = 1.0;  // Siri's natural pitch
+        utterance.volume = 1.0; // Maximum volume
+
+        // Wait for voices to load if needed
+        const speakWithVoice = () => {
+            const voices = speechSynthesis.getVoices();
+            console.log('Available voices:', voices.length);
+
+            // Try to use Siri's voice specifically
+            const preferredVoices = [
+                'Samantha',           // macOS Siri voice
+                'Siri',              // Direct Siri voice
+                'Samantha Enhanced', // Enhanced Siri voice
+                'Karen',             // macOS female voice (Siri-like)
+                'Victoria',          // macOS female voice (Siri-like)
+                'Alex',              // macOS male voice
+                'Google UK English Female',  // Chrome Siri-like
+                'Microsoft Zira Desktop',    // Edge Siri-like
+                'Microsoft Hazel Desktop',   // Edge Siri-like
+                'Google US English Female',  // Chrome Siri-like
+                'Female'             // Generic female
+            ];
+
+            let selectedVoice = null;
+            for (const voiceName of preferredVoices) {
+                selectedVoice = voices.find(voice => 
+                    voice.name.includes(voiceName)
+                );
+                if (selectedVoice) break;
+            }
+
+            if (selectedVoice) {
+                utterance.voice = selectedVoice;
+                console.log('Using voice:', selectedVoice.name);
+            } else {
+                console.log('Using default voice');
+            }
+
+            utterance.onstart = () => console.log('Speech started');
+            utterance.onend = () => console.log('Speech ended');
+            utterance.onerror = (event) => console.error('Speech error:', event.error);
+
+            speechSynthesis.speak(utterance);
+        };
+
+        // If voices are already loaded, speak immediately
+        if (speechSynthesis.getVoices().length > 0) {
+            speakWithVoice();
+        } else {
+            // Wait for voices to load
+            speechSynthesis.onvoiceschanged = speakWithVoice;
+        }
+    } else {
+        console.error('Speech synthesis not supported');
+    }
+}
+
+async function toggleRecording() {
+    if (!isRecording) {
+        await startRecording();
+    } else {
+        stopRecording();
+    }
+}
+
+function initSpeechRecognition() {
+    if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
+        const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+        recognition = new SpeechRecognition();
+
+        recognition.continuous = false;
+        recognition.interimResults = false;
+        recognition.lang = 'en-US'; // English (US)
+
+        recognition.onstart = function() {
+            console.log('Speech recognition started');
+            isRecording = true;
+            const button = document.getElementById('micButton');
+            button.classList.add('listening');
+            document.getElementById('status').textContent = 'Listening...';
+        };
+
+        recognition.onresult = function(event) {
+            const transcript = event.results[0][0].transcript;
+            console.log('Speech recognized:', transcript);
+            sendTranscript(transcript);
+        };
+
+        recognition.onerror = function(event) {
+            console.error('Speech recognition error:', event.error);
+            document.getElementById('status').textContent = 'Error: ' + event.error;
+            stopRecording();
+        };
+
+        recognition.onend = function() {
+            console.log('Speech recognition ended');
+            stopRecording();
+        };
+    } else {
+        console.error('Speech recognition not supported');
+        document.getElementById('status').textContent = 'Speech recognition not supported in this browser';
+    }
+}
+
+function startRecording() {
+    if (!recognition) {
+        initSpeechRecognition();
+    }
+
+    if (recognition && !isRecording) {
+        try {
+            recognition.start();
+        } catch (error) {
+            console.error('Error starting speech recognition:', error);
+            document.getElementById('status').textContent = 'Error starting speech recognition';
+        }
+    }
+}
+
+function stopRecording() {
+    if (recognition && isRecording) {
+        recognition.stop();
+        isRecording = false;
+
+        const button = document.getElementById('micButton');
+        button.classList.remove('listening');
+        // Keep the video playing, just remove the listening effect
+
+        document.getElementById('status').textContent = 'Processing...';
+    }
+}
+
+function submission(text) {
+    const requestId = newRequestId();
+    const message = {
+        type: 'audio',
+        data: text,
+        session_id: clientId,
+        request_id: requestId,
+        idempotency_key: requestId
+    };
+    pending[requestId] = message;
+    return message;
+}
+
+function sendTranscript(transcript) {
+    const message = submission(transcript);
+    if (ws && ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify(message));
+    }
+}
+
+function testSpeech() {
+    console.log('Testing Siri voice...');
+    speakWithLanguage("Hello! This is a test of the Siri voice. Can you hear me speaking like Siri?", 'en-US');
+}
+
+function testAIResponse() {
+    console.log('Testing AI response speech...');
+    const testResponse = "Hello! I'm MyAssistant. I've stored your information and I'm ready to answer questions!";
+    showAIResponse(testResponse);
+}
+
+function testMemory() {
+    console.log('Testing memory system...');
+    fetch('/memories/test')
+        .then(response => response.json())
+        .then(data => {
+            console.log('Memory test result:', data);
+            let message = `Memory Test Results:\n`;
+            message += `Status: ${data.status}\n`;
+            message += `Total Memories: ${data.total_memories}\n`;
+            if (data.recent_memories && data.recent_memories.length > 0) {
+                message += `Recent: ${data.recent_memories[0].text}\n`;
+            }
+            showAIResponse(message);
+        })
+        .catch(error => {
+            console.error('Memory test error:', error);
+            showAIResponse('Memory test failed: ' + error.message);
+        });
+}
+
+function testSmartAI() {
+    console.log('Testing Smart AI integration...');
+    fetch('/smart-ai/test', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            message: 'Hello! Can you help me remember things?'
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        console.log('Smart AI test result:', data);
+        if (data.status === 'success') {
+            showAIResponse(data.response);
+        } else {
+            showAIResponse('Smart AI test failed: ' + data.response);
+        }
+    })
+    .catch(error => {
+        console.error('Smart AI test error:', error);
+        showAIResponse('Smart AI test failed: ' + error.message);
+    });
+}
+
+function submitText() {
+    const textInput = document.getElementById('textInput');
+    const text = textInput.value.trim();
+
+    if (!text) {
+        showAIResponse('Please enter some text first!');
+        return;
+    }
+
+    console.log('Submitting text:', text);
+
+    // Send text via WebSocket (same as voice input); if the connection is
+    // down it is sent once the page reconnects
+    const message = submission(text);
+    textInput.value = '';
+    if (ws && ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify(message));
+        showAIResponse('Processing your text...');
+    } else {
+        showAIResponse('Reconnecting... your text will be sent shortly.');
+    }
+}
+
+function changeLanguage() {
+    const selectedLang = document.getElementById('languageSelect').value;
+    console.log('Language changed to:', selectedLang);
+
+    // Update speech recognition language
+    if (recognition) {
+        recognition.lang = selectedLang;
+    }
+
+    // Update status text based on language
+    document.getElementById('status').textContent = 'Click to speak';
+}
+
+function speakWithLanguage(text, language) {
+    if ('speechSynthesis' in window) {
+        console.log('Speaking with language:', language);
+
+        // Stop any current speech
+        speechSynthesis.cancel();
+
+        const utterance = new SpeechSynthesisUtterance(text);
+        utterance.rate = 0.8;   // Siri's speaking rate
+        utterance.pitch = 1.0;  // Siri's natural pitch
+        utterance.volume = 1.0; // Maximum volume
+        utterance.lang = language; // Set language
+
+        // Wait for voices to load if needed
+        const speakWithVoice = () => {
+            const voices = speechSynthesis.getVoices();
+            console.log('Available voices for', language, ':', voices.length);
+
+            // Find voice for the specific language
+            const languageVoices = voices.filter(voice => 
+                voice.lang.startsWith(language.split('-')[0])
+            );
+
+            if (languageVoices.length > 0) {
+                // Use the first available voice for the language
+                utterance.voice = languageVoices[0];
+                console.log('Using language-specific voice:', languageVoices[0].name);
+            } else {
+                console.log('No language-specific voice found, using default');
+            }
+
+            utterance.onstart = () => console.log('Speech started');
+            utterance.onend = () => console.log('Speech ended');
+            utterance.onerror = (event) => console.error('Speech error:', event.error);
+
+            speechSynthesis.speak(utterance);
+        };
+
+        // If voices are already loaded, speak immediately
+        if (speechSynthesis.getVoices().length > 0) {
+            speakWithVoice();
+        } else {
+            // Wait for voices to load
+            speechSynthesis.onvoiceschanged = speakWithVoice;
+        }
+    } else {
+        console.error('Speech synthesis not supported');
+    }
+}
+
+// Initialize
+connectWebSocket();
+
+// Load initial memory count
+
+// Allow Enter key to submit text
+document.addEventListener('DOMContentLoaded', function() {
+    const textInput = document.getElementById('textInput');
+    if (textInput) {
+        textInput.addEventListener('keydown', function(event) {
+            if (event.key === 'Enter' && !event.shiftKey) {
+                event.preventDefault();
+                submitText();
+            }
+        });
+    }
+});
+
+function refreshMemories(show) {
+    fetch('/memories/count')
+        .then(response => response.json())
+        .then(data => {
+            document.getElementById('memoryCount').textContent = `${data.count} memories stored`;
+        });
+    fetch('/memories/recent')
+        .then(response => response.json())
+        .then(memories => {
+            recentMemories = memories.slice(0, 3);
+            if (show) showRecentMemories(recentMemories);
+        });
+}
+
+refreshMemories(false);
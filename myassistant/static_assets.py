@@ -0,0 +1,145 @@
+"""
+Static frontend assets
+Files under myassistant/static are read and compressed once when the app
+starts; requests then only pick an encoding and compare ETags, so a
+repeat page load is a 304 with no body
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:  # Optional: brotli is smaller than gzip but not always installed
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).parent / "static"
+COMPRESSIBLE = {"text/html", "text/css", "application/javascript", "text/javascript", "application/json", "image/svg+xml"}
+# Cached by browsers and proxies until a new hash changes the URL
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Always revalidated, which costs a 304 when nothing changed
+REVALIDATE = "no-cache"
+ASSET_REF_RE = re.compile(r'(["\'])/static/([\w.-]+)\1')
+
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """Every encoding of body worth sending; identity is always present"""
+    encoded = {"identity": body}
+    # mtime=0 keeps the output, and so its ETag, stable across restarts
+    encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    return {name: data for name, data in encoded.items() if name == "identity" or len(data) < len(body)}
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r"q=([\d.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    return weights
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+@dataclass
+class Asset:
+    name: str
+    media_type: str
+    digest: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        # Each encoding is a different representation, so it needs its own tag
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest}{suffix}"'
+
+    def choose_encoding(self, accept_encoding: str) -> str:
+        weights = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            q = weights.get(encoding, weights.get("*", 0.0))
+            if encoding in self.encodings and q > 0:
+                return encoding
+        return "identity"
+
+
+class StaticAssets:
+    """The frontend files, loaded and precompressed up front"""
+
+    def __init__(self, directory: Path = STATIC_DIR, entry: str = "index.html"):
+        self.directory = Path(directory)
+        self.entry = entry
+        self.assets: Dict[str, Asset] = {}
+        self.load()
+
+    def load(self):
+        files = sorted(p for p in self.directory.iterdir() if p.is_file())
+        for path in files:
+            if path.name != self.entry:
+                self._add(path.name, path.read_bytes())
+        # The page is added last so it can point at the hashed CSS/JS URLs
+        entry = self.directory / self.entry
+        if entry.exists():
+            self._add(self.entry, self._versioned(entry.read_text(encoding="utf-8")).encode("utf-8"))
+
+    def _versioned(self, html: str) -> str:
+        def replace(match: re.Match) -> str:
+            quote, name = match.groups()
+            asset = self.assets.get(name)
+            if asset is None:
+                return match.group(0)
+            return f"{quote}/static/{name}?v={asset.digest}{quote}"
+
+        return ASSET_REF_RE.sub(replace, html)
+
+    def _add(self, name: str, body: bytes):
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = Asset(name, media_type, hashlib.sha256(body).hexdigest()[:16])
+        asset.encodings = compress(body) if media_type in COMPRESSIBLE else {"identity": body}
+        self.assets[name] = asset
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name)
+
+    def names(self) -> List[str]:
+        return list(self.assets)
+
+    def response(self, asset: Asset, request: Request) -> Response:
+        encoding = asset.choose_encoding(request.headers.get("accept-encoding", ""))
+        etag = asset.etag(encoding)
+        # Only URLs carrying the current hash may be cached forever
+        versioned = request.query_params.get("v") == asset.digest
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if versioned else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        media_type = asset.media_type
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        return Response(asset.encodings[encoding], media_type=media_type, headers=headers)
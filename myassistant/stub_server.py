@@ -0,0 +1,236 @@
+"""
+Local OpenAI-compatible stub server
+Implements /v1/chat/completions (plain and streaming) so the LLM code paths
+can be exercised offline: point OPENAI_BASE_URL at StubServer.base_url.
+Latency, error rate and token throughput are configurable to mimic a real
+provider under load (see loadtest.py)
+
+    python -m myassistant.stub_server --port 8089 --latency lognormal:0.4,0.5 --error-rate 0.05
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Union
+
+LatencyFn = Callable[[random.Random], float]
+
+
+def parse_latency(spec: Union[str, float, None]) -> LatencyFn:
+    """
+    Latency distribution in seconds from a spec:
+    "0.2" or "fixed:0.2", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA" (long tail) or "exp:MEAN"
+    """
+    if spec is None or spec == "":
+        return lambda rng: 0.0
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "fixed", kind
+    values = [float(v) for v in params.split(",")]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: "StubHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append(request)
+        time.sleep(self.server.next_latency())
+
+        status = self.server.next_error()
+        if status:
+            self._send_json(status, {"error": {"message": f"Stub error {status}", "type": "stub_error"}})
+            return
+
+        model = request.get("model", "stub")
+        reply = self.server.reply_for(request)
+        if request.get("stream"):
+            self._stream(model, reply)
+        else:
+            # A real provider generates the whole answer before replying
+            time.sleep(self.server.token_delay() * len(reply.split()))
+            self._send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(reply.split()), "total_tokens": 0}
+            })
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model: str, reply: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_delay())
+            delta = {"content": word if i == 0 else " " + word}
+            if i == 0:
+                delta["role"] = "assistant"
+            self._send_event(model, delta, None)
+        self._send_event(model, {}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, model: str, delta: dict, finish_reason: Optional[str]):
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        reply: Optional[str] = None,
+        delay: float = 0.0,
+        latency: Union[str, float, None] = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        tokens_per_second: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        super().__init__(address, StubHandler)
+        self.reply = reply
+        self.latency = parse_latency(latency if latency is not None else delay)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tokens_per_second = tokens_per_second
+        self.requests: list = []
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def next_latency(self) -> float:
+        with self._rng_lock:
+            return self.latency(self._rng)
+
+    def next_error(self) -> Optional[int]:
+        with self._rng_lock:
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.errors += 1
+                return self.error_status
+        return None
+
+    def token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def reply_for(self, request: dict) -> str:
+        if self.reply is not None:
+            return self.reply
+        messages = request.get("messages") or [{}]
+        return f"Stub reply to: {messages[-1].get('content', '')}"
+
+
+class StubServer:
+    """Runs the stub in a background thread; usable as a context manager"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reply: Optional[str] = None, delay: float = 0.0, **options):
+        """options: latency, error_rate, error_status, tokens_per_second and seed (see StubHTTPServer)"""
+        self.httpd = StubHTTPServer((host, port), reply=reply, delay=delay, **options)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self) -> list:
+        return self.httpd.requests
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="assistant-stub", description="OpenAI-compatible stub server")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--reply", default=None, help="Fixed reply (default: echo the last message)")
+    p.add_argument("--latency", default="0", help='e.g. "0.3", "uniform:0.1,0.5", "lognormal:0.4,0.5", "exp:0.3"')
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    p.add_argument("--error-status", type=int, default=500, help="HTTP status of failed requests (e.g. 429)")
+    p.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed; 0 is instant")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args(argv)
+
+    server = StubHTTPServer(
+        (args.host, args.port),
+        reply=args.reply,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed,
+    )
+    print(f"Stub OpenAI API on http://{args.host}:{server.server_address[1]}/v1 - set OPENAI_BASE_URL to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""
+Rolling conversation summaries
+Older turns are folded into a short per-session summary so prompts carry
+the summary plus the newest turns, at a bounded size however long the
+conversation runs
+"""
+import re
+from collections import Counter
+from typing import Callable, List, Optional, Sequence, Set
+
+from .context_builder import estimate_tokens, truncate_to_tokens
+from .facts import extract_facts
+from .sessions import Session
+
+# Turns in, summary text out; previous summary is passed so it can be merged
+SummarizeFn = Callable[[Sequence[dict], str, int], str]
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_RE = re.compile(r"\w+")
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def _sentences(turns: Sequence[dict], previous: str) -> List[str]:
+    sentences = [line.strip() for line in previous.splitlines() if line.strip()]
+    for turn in turns:
+        label = ROLE_LABELS.get(turn.get("role", ""), "User")
+        for sentence in SENTENCE_RE.split(turn.get("content", "")):
+            if sentence.strip():
+                sentences.append(f"{label}: {sentence.strip()}")
+    return sentences
+
+
+def extractive_summary(turns: Sequence[dict], previous: str = "", max_tokens: int = 150) -> str:
+    """
+    Keep the sentences that best cover the conversation, within max_tokens
+    Sentences are picked greedily by how common their not-yet-covered words
+    are across the conversation, so repeats add little; ones carrying facts
+    (times, dates, phone numbers, names) and newer ones score higher. The
+    kept sentences stay in conversation order
+    """
+    sentences = _sentences(turns, previous)
+    words = [set(w for w in WORD_RE.findall(s.lower()) if len(w) > 3) for s in sentences]
+    frequency = Counter(w for ws in words for w in ws)
+    boost = [2 * len(extract_facts(s)) + (i + 1) / len(sentences) for i, s in enumerate(sentences)]
+
+    covered: Set[str] = set()
+    remaining = set(range(len(sentences)))
+    kept = set()
+    used = 0
+    while remaining:
+        best = max(
+            remaining,
+            key=lambda i: sum(frequency[w] for w in words[i] - covered) / (len(words[i]) or 1) + boost[i],
+        )
+        remaining.discard(best)
+        line = truncate_to_tokens(sentences[best], max_tokens // 2)
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            continue
+        kept.add(best)
+        sentences[best] = line
+        covered |= words[best]
+        used += cost
+    return "\n".join(sentences[i] for i in sorted(kept))
+
+
+def history_tokens(session: Session) -> int:
+    return sum(estimate_tokens(turn.get("content", "")) + 4 for turn in session.turns)
+
+
+def fold_history(
+    session: Session,
+    trigger_tokens: int,
+    keep_turns: int,
+    max_summary_tokens: int,
+    summarize: Optional[SummarizeFn] = None,
+) -> bool:
+    """
+    Fold all but the newest keep_turns turns into session.summary once the
+    history exceeds trigger_tokens, or once the ring buffer has no room for
+    another exchange (so no turn is dropped unsummarized); returns whether
+    anything was folded
+    """
+    full = session.turns.maxlen is not None and len(session.turns) + 2 > session.turns.maxlen
+    if len(session.turns) <= keep_turns or not (full or history_tokens(session) > trigger_tokens):
+        return False
+    older = [session.turns.popleft() for _ in range(len(session.turns) - keep_turns)]
+    summary = (summarize or extractive_summary)(older, session.summary, max_summary_tokens)
+    session.summary = truncate_to_tokens(summary.strip(), max_summary_tokens)
+    return True
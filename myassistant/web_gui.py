@@ -2,726 +2,84 @@ from __future__ import annotations
 
 import json
 import asyncio
-from typing import Optional
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse, FileResponse
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
 
-from .memory_store import MemoryStore
-from .smart_ai import SmartAI
+from .broadcast import BroadcastHub
+from .config import get_env_int
+from .engines import EngineRegistry
+from .llm_dispatch import get_dispatcher
+from .media import MediaFile
+from .memory_store import Memory, Reminder
+from .scheduler import ReminderScheduler
+from .serialization import conditional_json, dumps_str, memory_encoder
+from .sessions import DEFAULT_SESSION, SessionManager
+from .static_assets import StaticAssets
+from .writer import RemoteMemoryStore, open_store, run_workers
 
 
 class WebAssistant:
     def __init__(self):
-        self.app = FastAPI(title="MyAssistant Web", version="0.1.0")
-        self.store = MemoryStore()
-        self.smart_ai = SmartAI()
-        self.active_connections: list[WebSocket] = []
+        self.app = FastAPI(title="MyAssistant Web", version="0.1.0", lifespan=self.lifespan)
+        # Through the shared writer process when running several workers
+        self.store = open_store()
+        # One bounded conversation per client instead of one shared history
+        self.sessions = SessionManager.from_env(self.store.db_path)
+        # Engines are chosen by ASSISTANT_ENGINE and loaded on first use
+        self.engines = EngineRegistry(self.store, self.sessions)
+        self.engine = self.engines.chain()
+        # New memories and reminders are pushed to every open page
+        self.hub = BroadcastHub()
+        # Every worker pushes due reminders to its own pages
+        self.scheduler = ReminderScheduler(
+            self.store, self.send_reminder, per_worker=isinstance(self.store, RemoteMemoryStore)
+        )
+        # The frontend is read and compressed once, not rebuilt per request
+        self.assets = StaticAssets()
+        # Located once; the handler answers ranges and revalidation from this
+        self.smiler = MediaFile.find("smiler.mp4")
+        # Answers to keyed submissions, by idempotency key, until they are saved
+        self.answering: Dict[str, asyncio.Task] = {}
         self.setup_routes()
+    
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI):
+        self.scheduler.start()
+        # Other workers' writes reach this worker's pages by polling the store
+        watcher = asyncio.create_task(self.watch_writes()) if isinstance(self.store, RemoteMemoryStore) else None
+        yield
+        if watcher:
+            watcher.cancel()
+        for task in list(self.answering.values()):
+            task.cancel()
+        await self.scheduler.stop()
+        self.hub.close()
+        self.sessions.flush()
         
     def setup_routes(self):
-        @self.app.get("/", response_class=HTMLResponse)
-        async def get_homepage():
-            return """
-            <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>MyAssistant - Voice Memory</title>
-                <style>
-                    * {
-                        margin: 0;
-                        padding: 0;
-                        box-sizing: border-box;
-                    }
-                    
-                    body {
-                        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        min-height: 100vh;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        color: white;
-                    }
-                    
-                    .container {
-                        text-align: center;
-                        background: rgba(255, 255, 255, 0.1);
-                        backdrop-filter: blur(10px);
-                        border-radius: 20px;
-                        padding: 40px;
-                        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-                        border: 1px solid rgba(255, 255, 255, 0.2);
-                        max-width: 400px;
-                        width: 90%;
-                    }
-                    
-                    h1 {
-                        font-size: 2.5rem;
-                        margin-bottom: 20px;
-                        font-weight: 300;
-                    }
-                    
-                    .mic-button {
-                        width: 120px;
-                        height: 120px;
-                        border-radius: 50%;
-                        border: none;
-                        background: transparent;
-                        cursor: pointer;
-                        transition: all 0.3s ease;
-                        margin: 50px 0 150px 0; /* More space below smiler */
-                        box-shadow: 0 4px 20px rgba(76, 175, 80, 0.3);
-                        overflow: hidden;
-                        position: relative;
-                    }
-                    
-                    .video-icon {
-                        width: 100%;
-                        height: 100%;
-                        object-fit: cover;
-                        border-radius: 50%;
-                        clip-path: circle(50%);
-                    }
-                    
-                    .mic-button:hover {
-                        transform: scale(1.05);
-                        box-shadow: 0 6px 25px rgba(76, 175, 80, 0.4);
-                    }
-                    
-                    .mic-button.listening {
-                        animation: pulse 1.5s infinite;
-                        /* Keep the same green glow, no red effect */
-                    }
-                    
-                    @keyframes pulse {
-                        0% { transform: scale(1); }
-                        50% { transform: scale(1.1); }
-                        100% { transform: scale(1); }
-                    }
-                    
-                    .status {
-                        font-size: 1.2rem;
-                        margin: 20px 0;
-                        min-height: 30px;
-                    }
-                    
-                    .memory-count {
-                        font-size: 1rem;
-                        opacity: 0.8;
-                        margin-top: 20px;
-                    }
-                    
-                    .recent-memories {
-                        margin-top: 30px;
-                        text-align: left;
-                        max-height: 200px;
-                        overflow-y: auto;
-                    }
-                    
-                    .memory-item {
-                        background: rgba(255, 255, 255, 0.1);
-                        padding: 10px;
-                        margin: 5px 0;
-                        border-radius: 8px;
-                        font-size: 0.9rem;
-                    }
-                    
-                    .memory-time {
-                        font-size: 0.8rem;
-                        opacity: 0.7;
-                        margin-top: 5px;
-                    }
-                    
-                    .ai-response {
-                        background: rgba(76, 175, 80, 0.2);
-                        border: 1px solid rgba(76, 175, 80, 0.3);
-                        border-radius: 15px;
-                        padding: 15px;
-                        margin: 20px 0;
-                        text-align: left;
-                        backdrop-filter: blur(10px);
-                        cursor: pointer;
-                        transition: all 0.3s ease;
-                    }
-                    
-                    .ai-response:hover {
-                        background: rgba(76, 175, 80, 0.3);
-                        transform: translateY(-2px);
-                    }
-                    
-                    .ai-response h4 {
-                        color: #4CAF50;
-                        margin: 0 0 10px 0;
-                        font-size: 1rem;
-                    }
-                    
-                    .ai-response p {
-                        color: white;
-                        margin: 0;
-                        line-height: 1.4;
-                    }
-                    
-                    .test-speech-btn {
-                        background: rgba(255, 193, 7, 0.2);
-                        border: 1px solid rgba(255, 193, 7, 0.3);
-                        border-radius: 20px;
-                        padding: 8px 16px;
-                        color: #FFC107;
-                        font-size: 0.9rem;
-                        cursor: pointer;
-                        margin: 10px 0;
-                        transition: all 0.3s ease;
-                    }
-                    
-                    .test-speech-btn:hover {
-                        background: rgba(255, 193, 7, 0.3);
-                        transform: translateY(-1px);
-                    }
-                    
-                    .language-selector {
-                        margin: 15px 0;
-                        text-align: center;
-                    }
-                    
-                    .language-selector label {
-                        color: rgba(255, 255, 255, 0.8);
-                        font-size: 0.9rem;
-                        margin-right: 10px;
-                    }
-                    
-                    .language-selector select {
-                        background: rgba(255, 255, 255, 0.1);
-                        border: 1px solid rgba(255, 255, 255, 0.2);
-                        border-radius: 8px;
-                        color: white;
-                        padding: 6px 12px;
-                        font-size: 0.9rem;
-                        cursor: pointer;
-                    }
-                    
-                    .language-selector select:focus {
-                        outline: none;
-                        border-color: #4CAF50;
-                        box-shadow: 0 0 0 2px rgba(76, 175, 80, 0.2);
-                    }
-                    
-                    .text-input-container {
-                        position: fixed;
-                        bottom: 50px; /* Move back down to bottom */
-                        left: 50%;
-                        transform: translateX(-50%);
-                        width: 90%;
-                        max-width: 500px;
-                        z-index: 1000;
-                    }
-                    
-                    .text-input {
-                        width: 100%;
-                        height: 80px;
-                        background: rgba(255, 255, 255, 0.1);
-                        border: 1px solid rgba(255, 255, 255, 0.2);
-                        border-radius: 15px;
-                        color: white;
-                        padding: 15px;
-                        font-size: 16px;
-                        resize: vertical;
-                        backdrop-filter: blur(10px);
-                        box-sizing: border-box;
-                    }
-                    
-                    .text-input::placeholder {
-                        color: rgba(255, 255, 255, 0.6);
-                    }
-                    
-                    .text-input:focus {
-                        outline: none;
-                        border-color: #4CAF50;
-                        box-shadow: 0 0 0 2px rgba(76, 175, 80, 0.2);
-                    }
-                    
-                    .submit-btn {
-                        width: 100%;
-                        margin-top: 10px;
-                        background: rgba(76, 175, 80, 0.8);
-                        border: 1px solid rgba(76, 175, 80, 0.3);
-                        border-radius: 10px;
-                        color: white;
-                        padding: 12px 20px;
-                        font-size: 16px;
-                        cursor: pointer;
-                        transition: all 0.3s ease;
-                    }
-                    
-                    .submit-btn:hover {
-                        background: rgba(76, 175, 80, 1);
-                        transform: translateY(-2px);
-                    }
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <button id="micButton" class="mic-button" onclick="toggleRecording()">
-                        <video id="smilerVideo" class="video-icon" autoplay muted loop>
-                            <source src="smiler.mp4" type="video/mp4">
-                            😊
-                        </video>
-                    </button>
-                    
-                    <!-- Text input box for adding information -->
-                    <div class="text-input-container">
-                        <textarea id="textInput" class="text-input" placeholder="Type your information here..."></textarea>
-                        <button id="submitText" class="submit-btn" onclick="submitText()">Add Information</button>
-                    </div>
-                    
-                    <!-- Hidden elements for functionality -->
-                    <div id="status" class="status" style="display: none;">Click to speak</div>
-                    <div id="memoryCount" class="memory-count" style="display: none;">0 memories stored</div>
-                    
-                    <div class="language-selector" style="display: none;">
-                        <label for="languageSelect">🌐 Language:</label>
-                        <select id="languageSelect" onchange="changeLanguage()">
-                            <option value="en-US" selected>🇺🇸 English</option>
-                        </select>
-                    </div>
-                    
-                    <button id="testSpeech" class="test-speech-btn" onclick="testSpeech()" style="display: none;">🔊 Test Speech</button>
-                    <button id="testAIResponse" class="test-speech-btn" onclick="testAIResponse()" style="display: none;">🤖 Test AI Response</button>
-                    <button id="testMemory" class="test-speech-btn" onclick="testMemory()" style="display: none; position: fixed; top: 10px; right: 10px; z-index: 1000;">🧠 Test Memory</button>
-                    <button id="testSmartAI" class="test-speech-btn" onclick="testSmartAI()" style="display: block; position: fixed; top: 10px; right: 10px; z-index: 1000;">🧠 Test Smart AI</button>
-                    
-                    <!-- AI response will show temporarily when speaking -->
-                    <div id="aiResponse" class="ai-response" style="display: none;">
-                        <h4>🤖 MyAssistant says:</h4>
-                        <p></p>
-                        <small style="color: rgba(255, 255, 255, 0.7); font-size: 0.8rem;">Click to dismiss</small>
-                    </div>
-                    
-                    <!-- Recent memories will show temporarily -->
-                    <div id="recentMemories" class="recent-memories" style="display: none;">
-                        <h3>Recent Memories:</h3>
-                        <div id="memoriesList"></div>
-                    </div>
-                </div>
-
-                <script>
-                    let isRecording = false;
-                    let recognition;
-                    let ws;
-
-                    // Connect to WebSocket
-                    function connectWebSocket() {
-                        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-                        ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
-                        
-                        ws.onopen = function() {
-                            console.log('Connected to MyAssistant');
-                        };
-                        
-                        ws.onmessage = function(event) {
-                            const data = JSON.parse(event.data);
-                            handleMessage(data);
-                        };
-                        
-                        ws.onclose = function() {
-                            console.log('Disconnected from MyAssistant');
-                            setTimeout(connectWebSocket, 3000);
-                        };
-                    }
-
-                    function handleMessage(data) {
-                        console.log('Received message:', data);
-                        if (data.type === 'status') {
-                            document.getElementById('status').textContent = data.message;
-                        } else if (data.type === 'memory_stored') {
-                            document.getElementById('status').textContent = 'Memory stored!';
-                            document.getElementById('memoryCount').textContent = `${data.count} memories stored`;
-                            
-                            // Show AI response if available
-                            if (data.ai_response) {
-                                console.log('AI response received:', data.ai_response);
-                                showAIResponse(data.ai_response);
-                            } else {
-                                console.log('No AI response in message');
-                            }
-                            
-                            showRecentMemories(data.recent);
-                        } else if (data.type === 'error') {
-                            document.getElementById('status').textContent = data.message;
-                        }
-                    }
-
-                    function showRecentMemories(memories) {
-                        const container = document.getElementById('recentMemories');
-                        const list = document.getElementById('memoriesList');
-                        
-                        if (memories && memories.length > 0) {
-                            container.style.display = 'block';
-                            list.innerHTML = memories.slice(0, 3).map(memory => `
-                                <div class="memory-item">
-                                    ${memory.text}
-                                    <div class="memory-time">${new Date(memory.created_at).toLocaleString()}</div>
-                                </div>
-                            `).join('');
-                        }
-                    }
-                    
-                    function showAIResponse(response) {
-                        console.log('Showing AI response:', response);
-                        const aiResponseDiv = document.getElementById('aiResponse');
-                        const responseText = aiResponseDiv.querySelector('p');
-                        responseText.textContent = response;
-                        aiResponseDiv.style.display = 'block';
-                        
-                        // Speak the AI response with proper language
-                        const currentLang = document.getElementById('languageSelect').value;
-                        console.log('Speaking AI response with language:', currentLang);
-                        speakWithLanguage(response, currentLang);
-                        
-                        // Add click to dismiss functionality
-                        aiResponseDiv.onclick = function() {
-                            aiResponseDiv.style.display = 'none';
-                        };
-                        
-                        // Hide after 8 seconds (shorter since it's the only visible feedback)
-                        setTimeout(() => {
-                            aiResponseDiv.style.display = 'none';
-                        }, 8000);
-                    }
-
-                    function speakText(text) {
-                        if ('speechSynthesis' in window) {
-                            console.log('Attempting to speak:', text);
-                            
-                            // Stop any current speech
-                            speechSynthesis.cancel();
-                            
-                            const utterance = new SpeechSynthesisUtterance(text);
-                            utterance.rate = 0.8;   // Siri's speaking rate
-                            utterance.pitch = 1.0;  // Siri's natural pitch
-                            utterance.volume = 1.0; // Maximum volume
-                            
-                            // Wait for voices to load if needed
-                            const speakWithVoice = () => {
-                                const voices = speechSynthesis.getVoices();
-                                console.log('Available voices:', voices.length);
-                                
-                                // Try to use Siri's voice specifically
-                                const preferredVoices = [
-                                    'Samantha',           // macOS Siri voice
-                                    'Siri',              // Direct Siri voice
-                                    'Samantha Enhanced', // Enhanced Siri voice
-                                    'Karen',             // macOS female voice (Siri-like)
-                                    'Victoria',          // macOS female voice (Siri-like)
-                                    'Alex',              // macOS male voice
-                                    'Google UK English Female',  // Chrome Siri-like
-                                    'Microsoft Zira Desktop',    // Edge Siri-like
-                                    'Microsoft Hazel Desktop',   // Edge Siri-like
-                                    'Google US English Female',  // Chrome Siri-like
-                                    'Female'             // Generic female
-                                ];
-                                
-                                let selectedVoice = null;
-                                for (const voiceName of preferredVoices) {
-                                    selectedVoice = voices.find(voice => 
-                                        voice.name.includes(voiceName)
-                                    );
-                                    if (selectedVoice) break;
-                                }
-                                
-                                if (selectedVoice) {
-                                    utterance.voice = selectedVoice;
-                                    console.log('Using voice:', selectedVoice.name);
-                                } else {
-                                    console.log('Using default voice');
-                                }
-                                
-                                utterance.onstart = () => console.log('Speech started');
-                                utterance.onend = () => console.log('Speech ended');
-                                utterance.onerror = (event) => console.error('Speech error:', event.error);
-                                
-                                speechSynthesis.speak(utterance);
-                            };
-                            
-                            // If voices are already loaded, speak immediately
-                            if (speechSynthesis.getVoices().length > 0) {
-                                speakWithVoice();
-                            } else {
-                                // Wait for voices to load
-                                speechSynthesis.onvoiceschanged = speakWithVoice;
-                            }
-                        } else {
-                            console.error('Speech synthesis not supported');
-                        }
-                    }
-
-                    async function toggleRecording() {
-                        if (!isRecording) {
-                            await startRecording();
-                        } else {
-                            stopRecording();
-                        }
-                    }
-
-                    function initSpeechRecognition() {
-                        if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
-                            const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
-                            recognition = new SpeechRecognition();
-                            
-                            recognition.continuous = false;
-                            recognition.interimResults = false;
-                            recognition.lang = 'en-US'; // English (US)
-
-                            recognition.onstart = function() {
-                                console.log('Speech recognition started');
-                                isRecording = true;
-                                const button = document.getElementById('micButton');
-                                button.classList.add('listening');
-                                document.getElementById('status').textContent = 'Listening...';
-                            };
-
-                            recognition.onresult = function(event) {
-                                const transcript = event.results[0][0].transcript;
-                                console.log('Speech recognized:', transcript);
-                                sendTranscript(transcript);
-                            };
-
-                            recognition.onerror = function(event) {
-                                console.error('Speech recognition error:', event.error);
-                                document.getElementById('status').textContent = 'Error: ' + event.error;
-                                stopRecording();
-                            };
+        @self.app.get("/")
+        async def get_homepage(request: Request):
+            return self.assets.response(self.assets.get("index.html"), request)
 
-                            recognition.onend = function() {
-                                console.log('Speech recognition ended');
-                                stopRecording();
-                            };
-                        } else {
-                            console.error('Speech recognition not supported');
-                            document.getElementById('status').textContent = 'Speech recognition not supported in this browser';
-                        }
-                    }
-
-                    function startRecording() {
-                        if (!recognition) {
-                            initSpeechRecognition();
-                        }
-                        
-                        if (recognition && !isRecording) {
-                            try {
-                                recognition.start();
-                            } catch (error) {
-                                console.error('Error starting speech recognition:', error);
-                                document.getElementById('status').textContent = 'Error starting speech recognition';
-                            }
-                        }
-                    }
-
-                    function stopRecording() {
-                        if (recognition && isRecording) {
-                            recognition.stop();
-                            isRecording = false;
-                            
-                            const button = document.getElementById('micButton');
-                            button.classList.remove('listening');
-                            // Keep the video playing, just remove the listening effect
-                            
-                            document.getElementById('status').textContent = 'Processing...';
-                        }
-                    }
-
-                    function sendTranscript(transcript) {
-                        if (ws && ws.readyState === WebSocket.OPEN) {
-                            ws.send(JSON.stringify({
-                                type: 'audio',
-                                data: transcript
-                            }));
-                        }
-                    }
-
-                    function testSpeech() {
-                        console.log('Testing Siri voice...');
-                        speakWithLanguage("Hello! This is a test of the Siri voice. Can you hear me speaking like Siri?", 'en-US');
-                    }
-
-                    function testAIResponse() {
-                        console.log('Testing AI response speech...');
-                        const testResponse = "Hello! I'm MyAssistant. I've stored your information and I'm ready to answer questions!";
-                        showAIResponse(testResponse);
-                    }
-
-                    function testMemory() {
-                        console.log('Testing memory system...');
-                        fetch('/memories/test')
-                            .then(response => response.json())
-                            .then(data => {
-                                console.log('Memory test result:', data);
-                                let message = `Memory Test Results:\n`;
-                                message += `Status: ${data.status}\n`;
-                                message += `Total Memories: ${data.total_memories}\n`;
-                                if (data.recent_memories && data.recent_memories.length > 0) {
-                                    message += `Recent: ${data.recent_memories[0].text}\n`;
-                                }
-                                showAIResponse(message);
-                            })
-                            .catch(error => {
-                                console.error('Memory test error:', error);
-                                showAIResponse('Memory test failed: ' + error.message);
-                            });
-                    }
-
-                    function testSmartAI() {
-                        console.log('Testing Smart AI integration...');
-                        fetch('/smart-ai/test', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                            },
-                            body: JSON.stringify({
-                                message: 'Hello! Can you help me remember things?'
-                            })
-                        })
-                        .then(response => response.json())
-                        .then(data => {
-                            console.log('Smart AI test result:', data);
-                            if (data.status === 'success') {
-                                showAIResponse(data.response);
-                            } else {
-                                showAIResponse('Smart AI test failed: ' + data.response);
-                            }
-                        })
-                        .catch(error => {
-                            console.error('Smart AI test error:', error);
-                            showAIResponse('Smart AI test failed: ' + error.message);
-                        });
-                    }
-
-                    function submitText() {
-                        const textInput = document.getElementById('textInput');
-                        const text = textInput.value.trim();
-                        
-                        if (!text) {
-                            showAIResponse('Please enter some text first!');
-                            return;
-                        }
-                        
-                        console.log('Submitting text:', text);
-                        
-                        // Send text via WebSocket (same as voice input)
-                        if (ws && ws.readyState === WebSocket.OPEN) {
-                            ws.send(JSON.stringify({
-                                type: 'audio',
-                                data: text
-                            }));
-                            
-                            // Clear the input
-                            textInput.value = '';
-                            
-                            // Show feedback
-                            showAIResponse('Processing your text...');
-                        } else {
-                            showAIResponse('Connection error. Please try again.');
-                        }
-                    }
-
-                    function changeLanguage() {
-                        const selectedLang = document.getElementById('languageSelect').value;
-                        console.log('Language changed to:', selectedLang);
-                        
-                        // Update speech recognition language
-                        if (recognition) {
-                            recognition.lang = selectedLang;
-                        }
-                        
-                        // Update status text based on language
-                        document.getElementById('status').textContent = 'Click to speak';
-                    }
-
-                    function speakWithLanguage(text, language) {
-                        if ('speechSynthesis' in window) {
-                            console.log('Speaking with language:', language);
-                            
-                            // Stop any current speech
-                            speechSynthesis.cancel();
-                            
-                            const utterance = new SpeechSynthesisUtterance(text);
-                            utterance.rate = 0.8;   // Siri's speaking rate
-                            utterance.pitch = 1.0;  // Siri's natural pitch
-                            utterance.volume = 1.0; // Maximum volume
-                            utterance.lang = language; // Set language
-                            
-                            // Wait for voices to load if needed
-                            const speakWithVoice = () => {
-                                const voices = speechSynthesis.getVoices();
-                                console.log('Available voices for', language, ':', voices.length);
-                                
-                                // Find voice for the specific language
-                                const languageVoices = voices.filter(voice => 
-                                    voice.lang.startsWith(language.split('-')[0])
-                                );
-                                
-                                if (languageVoices.length > 0) {
-                                    // Use the first available voice for the language
-                                    utterance.voice = languageVoices[0];
-                                    console.log('Using language-specific voice:', languageVoices[0].name);
-                                } else {
-                                    console.log('No language-specific voice found, using default');
-                                }
-                                
-                                utterance.onstart = () => console.log('Speech started');
-                                utterance.onend = () => console.log('Speech ended');
-                                utterance.onerror = (event) => console.error('Speech error:', event.error);
-                                
-                                speechSynthesis.speak(utterance);
-                            };
-                            
-                            // If voices are already loaded, speak immediately
-                            if (speechSynthesis.getVoices().length > 0) {
-                                speakWithVoice();
-                            } else {
-                                // Wait for voices to load
-                                speechSynthesis.onvoiceschanged = speakWithVoice;
-                            }
-                        } else {
-                            console.error('Speech synthesis not supported');
-                        }
-                    }
-
-                    // Initialize
-                    connectWebSocket();
-                    
-                    // Load initial memory count
-                    
-                    // Allow Enter key to submit text
-                    document.addEventListener('DOMContentLoaded', function() {
-                        const textInput = document.getElementById('textInput');
-                        if (textInput) {
-                            textInput.addEventListener('keydown', function(event) {
-                                if (event.key === 'Enter' && !event.shiftKey) {
-                                    event.preventDefault();
-                                    submitText();
-                                }
-                            });
-                        }
-                    });
-                    fetch('/memories/count')
-                        .then(response => response.json())
-                        .then(data => {
-                            document.getElementById('memoryCount').textContent = `${data.count} memories stored`;
-                        });
-                </script>
-            </body>
-            </html>
-            """
+        @self.app.get("/static/{name}")
+        async def get_static(name: str, request: Request):
+            asset = self.assets.get(name)
+            if asset is None:
+                raise HTTPException(status_code=404, detail=f"{name} not found")
+            return self.assets.response(asset, request)
 
         @self.app.websocket("/ws")
         async def websocket_endpoint(websocket: WebSocket):
             await websocket.accept()
-            self.active_connections.append(websocket)
+            subscriber = self.hub.subscribe(websocket.send_text, close_socket=websocket.close)
+            # Answers are generated in tasks, so a slow answer does not hold
+            # up storing and acknowledging the next message
+            tasks: set[asyncio.Task] = set()
             
             try:
                 while True:
@@ -731,22 +89,60 @@ class WebAssistant:
                     if message.get("type") == "audio":
                         # For now, we'll simulate speech recognition
                         # In a real implementation, you'd send this to a speech service
-                        await self.handle_audio_message(websocket, message["data"])
+                        session_id = message.get("session_id") or f"ws-{id(websocket)}"
+                        task = await self.handle_audio_message(
+                            websocket, message["data"], session_id, message.get("request_id"),
+                            message.get("idempotency_key")
+                        )
+                        if task:
+                            tasks.add(task)
+                            task.add_done_callback(tasks.discard)
                         
             except WebSocketDisconnect:
-                self.active_connections.remove(websocket)
-
+                pass
+            finally:
+                # Any exit, not only a clean disconnect, releases the subscription
+                self.hub.unsubscribe(subscriber)
+                # Keyed answers run on, so the page's resend after reconnecting
+                # gets the saved answer instead of asking the engine again
+                answering = set(self.answering.values())
+                for task in tasks:
+                    if task not in answering:
+                        task.cancel()
+
+        # Plain def: FastAPI runs these in its threadpool, generation and build() included
         @self.app.get("/memories/count")
-        async def get_memory_count():
-            memories = self.store.list_recent(limit=1000)
-            return {"count": len(memories)}
+        def get_memory_count(request: Request):
+            generation = self.store.generation()
+            return conditional_json(request, generation, lambda: {"count": self.store.count()})
+        
+        @self.app.delete("/memories/{memory_id}")
+        async def delete_memory(memory_id: int):
+            count = await asyncio.to_thread(self.forget_memory, memory_id)
+            if count is None:
+                raise HTTPException(status_code=404, detail=f"Memory {memory_id} not found")
+            self.hub.publish({"type": "memory_deleted", "memory_id": memory_id})
+            self.hub.publish({"type": "count_changed", "count": count}, coalesce="count")
+            return {"deleted": memory_id, "count": count}
+
+        @self.app.get("/broadcast/stats")
+        async def broadcast_stats():
+            """Connected pages, queued and dropped event frames"""
+            return self.hub.stats()
+
+        @self.app.get("/llm/stats")
+        async def llm_stats():
+            """Outbound LLM queue depth, wait times and retries"""
+            return get_dispatcher().stats()
         
         @self.app.post("/smart-ai/test")
         async def test_smart_ai(message: dict):
-            """Test Smart AI integration with memories"""
+            """Test engine integration with memories; "engine" picks one by name"""
             try:
                 user_message = message.get("message", "Hello")
-                response = self.smart_ai.get_response(user_message, self.store)
+                session_id = message.get("session_id", DEFAULT_SESSION)
+                engine = self.engines.get(message["engine"]) if message.get("engine") else self.engine
+                response = await asyncio.to_thread(engine.get_response, user_message, self.store, session_id)
                 return {"response": response, "status": "success"}
             except Exception as e:
                 return {"response": f"Error: {str(e)}", "status": "error"}
@@ -775,91 +171,232 @@ class WebAssistant:
                 return {"status": "error", "error": str(e)}
 
         @self.app.get("/memories/recent")
-        async def get_recent_memories():
-            memories = self.store.list_recent(limit=10)
-            return [
-                {
-                    "id": m.id,
-                    "text": m.text,
-                    "language": m.language,
-                    "created_at": m.created_at
-                }
-                for m in memories
-            ]
-
-        @self.app.get("/smiler.mp4")
-        async def get_smiler_video():
-            # Look for the video file in multiple possible locations
-            possible_paths = [
-                "smiler.mp4",
-                "./smiler.mp4",
-                "/app/smiler.mp4",
-                os.path.join(os.getcwd(), "smiler.mp4")
-            ]
-            
-            for video_path in possible_paths:
-                if os.path.exists(video_path):
-                    return FileResponse(video_path, media_type="video/mp4")
-            
-            # If not found, return a 404 with debug info
-            from fastapi import HTTPException
-            current_dir = os.getcwd()
-            files_in_dir = os.listdir(current_dir) if os.path.exists(current_dir) else []
-            raise HTTPException(
-                status_code=404, 
-                detail=f"smiler.mp4 not found. Current dir: {current_dir}, Files: {files_in_dir[:10]}"
+        def get_recent_memories(request: Request):
+            generation = self.store.generation()
+            return conditional_json(
+                request, generation, lambda: memory_encoder.list_json(self.store.list_recent(limit=10))
             )
 
-    async def handle_audio_message(self, websocket: WebSocket, audio_data: str):
-        """Handle audio data from the client"""
+        @self.app.api_route("/smiler.mp4", methods=["GET", "HEAD"])
+        async def get_smiler_video(request: Request):
+            if self.smiler is None:
+                raise HTTPException(status_code=404, detail="smiler.mp4 not found")
+            return self.smiler.response(request)
+
+    def store_memory(self, text: str, idempotency_key: Optional[str] = None) -> Tuple[dict, Optional[Reminder]]:
+        """Store a memory and return the memory_stored payload and its reminder (blocking)
+
+        The reminder is returned rather than scheduled, as the scheduler
+        belongs to the event loop and this runs in a worker thread.
+        A repeated idempotency_key returns the payload for the memory stored
+        the first time, marked "replayed", with the answer given then (if any)
+        under "ai_response"
+        """
+        earlier = self.store.replay(idempotency_key) if idempotency_key else None
+        if earlier is not None:
+            memory, answer = earlier
+            print(f"Replayed memory with ID: {memory.id} for a repeated submission")
+            return {**self.stored_payload(memory), "replayed": True, "ai_response": answer}, None
+        stored = self.store.remember_memory(text, idempotency_key=idempotency_key)
+        print(f"Stored memory with ID: {stored.id}, Text: {text}")
+        return self.stored_payload(stored), self.store.reminder(stored.id)
+
+    def stored_payload(self, stored: Memory) -> dict:
+        # Shared cached dicts: these frames are encoded, never modified
+        recent_memories = [memory_encoder.as_dict(m) for m in self.store.list_recent(limit=3)]
+        memory = memory_encoder.as_dict(stored)
+        return {
+            "type": "memory_stored",
+            "message": "Memory stored successfully!",
+            "memory_id": stored.id,
+            "memory": memory,
+            "count": self.store.count(),
+            "recent": recent_memories
+        }
+
+    def forget_memory(self, memory_id: int) -> Optional[int]:
+        """Delete a memory and return the remaining count, or None if there was no such memory (blocking)"""
+        # A queued reminder for it is skipped when it fires (see ReminderScheduler._fire)
+        if not self.store.delete(memory_id):
+            return None
+        memory_encoder.forget(memory_id)
+        return self.store.count()
+
+    def publish_stored(self, stored: dict):
+        """Tell every open page about a memory stored by any of them"""
+        self.hub.publish({"type": "memory_created", "memory": stored["memory"]})
+        self.hub.publish({"type": "count_changed", "count": stored["count"]}, coalesce="count")
+    
+    async def watch_writes(self):
+        """Publish memories stored through other workers to this worker's pages
+
+        Their reminders are scheduled here too, so this worker's pages get them
+        """
+        interval = get_env_int("ASSISTANT_WATCH_INTERVAL_MS", 1000) / 1000
+        last_id, revision = await asyncio.to_thread(self.store.generation)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                generation = await asyncio.to_thread(self.store.generation)
+                if generation == (last_id, revision):
+                    continue
+                # Pages drop memory_created frames for ids they already show.
+                # Page through everything up to the generation just read, so a
+                # burst of imports is not cut off at one batch
+                seen_id = last_id
+                while seen_id < generation[0]:
+                    batch = await asyncio.to_thread(self.store.export_batch, seen_id, 50)
+                    if not batch:
+                        break
+                    for memory in batch:
+                        self.hub.publish({"type": "memory_created", "memory": memory_encoder.as_dict(memory)})
+                        reminder = await asyncio.to_thread(self.store.reminder, memory.id)
+                        if reminder:
+                            self.scheduler.add(reminder)
+                    seen_id = batch[-1].id
+                if generation[1] != revision:
+                    # Something was deleted or edited; pages reload rather than patch
+                    self.hub.publish({"type": "resync"})
+                count = await asyncio.to_thread(self.store.count)
+                self.hub.publish({"type": "count_changed", "count": count}, coalesce="count")
+                last_id, revision = generation
+            except Exception as e:
+                print(f"Write watcher error: {e}")
+
+    async def handle_audio_message(self, websocket: WebSocket, audio_data: str, session_id: str = DEFAULT_SESSION, request_id: Optional[str] = None, idempotency_key: Optional[str] = None) -> Optional[asyncio.Task]:
+        """Handle audio data from the client
+        
+        Replies in stages, each frame carrying the request_id: memory_stored as
+        soon as the memory is saved, then ai_delta frames and a final
+        ai_response once the engine has answered. Returns the task producing
+        the answer, so the caller can handle the next message meanwhile
+        
+        A message resent with the same idempotency_key (e.g. after a
+        reconnect) gets the original memory and answer back, without storing
+        it again or asking the engine again
+        """
+        request_id = request_id or uuid.uuid4().hex
+        # Keys are scoped to the session, so clients on different sessions never
+        # collide; session ids come from the client, so this is only as private
+        # as the session id is hard to guess
+        key = f"ws:{session_id}:{idempotency_key}" if idempotency_key else None
+        
+        async def send(frame: dict):
+            await websocket.send_text(dumps_str({**frame, "request_id": request_id}))
+        
         try:
-            await websocket.send_text(json.dumps({
+            await send({
                 "type": "status",
                 "message": "Processing speech..."
-            }))
+            })
             
             # The audio_data should now contain the actual transcribed text
             # from the Web Speech API on the client side
             if not audio_data or audio_data.strip() == "":
                 audio_data = "I didn't catch that, could you try again?"
             
-            # Store the actual transcribed text
-            memory_id = self.store.remember(audio_data)
-            print(f"Stored memory with ID: {memory_id}, Text: {audio_data}")
-            
-            # Get Smart AI response using stored memories
+            # Store the actual transcribed text off the event loop and confirm at once
+            stored, reminder = await asyncio.to_thread(self.store_memory, audio_data, key)
+            if reminder:
+                self.scheduler.add(reminder)
+            answer = stored.pop("ai_response", None)
+            await send(stored)
+            if not stored.get("replayed"):
+                self.publish_stored(stored)
+            elif answer is not None:
+                await send({
+                    "type": "ai_response",
+                    "ai_response": answer
+                })
+                return None
+            elif key in self.answering:
+                # The first attempt is still answering for a page that went away
+                return asyncio.create_task(self.send_pending_answer(send, self.answering[key]))
+        except Exception as e:
+            await send({
+                "type": "error",
+                "message": f"Error processing audio: {str(e)}"
+            })
+            return None
+        
+        # A replay without a saved answer means the first attempt never finished one
+        task = asyncio.create_task(self.send_ai_response(send, audio_data, session_id, key))
+        if key:
+            self.answering[key] = task
+            task.add_done_callback(lambda done: self.answering.pop(key) if self.answering.get(key) is done else None)
+        return task
+    
+    async def send_ai_response(self, send, user_message: str, session_id: str, idempotency_key: Optional[str] = None) -> str:
+        """Stream the engine's answer as ai_delta frames, then send the whole ai_response
+
+        The answer is generated in full even if the page goes away meanwhile,
+        and for a keyed submission it is saved for the page's resend; a
+        canned reply after an engine error is not saved, so a resend retries
+        """
+        delivered = True
+        
+        async def deliver(frame: dict):
+            nonlocal delivered
+            if not delivered:
+                return
             try:
-                ai_response = self.smart_ai.get_response(audio_data, self.store)
-                print(f"Smart AI response: {ai_response}")
+                await send(frame)
             except Exception as e:
-                print(f"Smart AI response error: {e}")
-                ai_response = "I've stored that information! Thanks for sharing with me."
-            
-            # Get updated count and recent memories
-            memories = self.store.list_recent(limit=10)
-            recent_memories = [
-                {
-                    "id": m.id,
-                    "text": m.text,
-                    "language": m.language,
-                    "created_at": m.created_at
-                }
-                for m in memories[:3]
-            ]
-            
-            await websocket.send_text(json.dumps({
-                "type": "memory_stored",
-                "message": "Memory stored successfully!",
-                "count": len(memories),
-                "recent": recent_memories,
+                delivered = False
+                print(f"AI response not delivered: {e}")
+        
+        async def send_upgrade(text: str):
+            # A slow LLM answer that arrived after the local one was sent
+            await deliver({
+                "type": "ai_upgrade",
+                "ai_response": text
+            })
+        
+        ai_parts = []
+        try:
+            # Engines without streaming run in a worker thread (see engines.stream_response)
+            async for delta in self.engine.astream_response(user_message, self.store, session_id, on_upgrade=send_upgrade):
+                ai_parts.append(delta)
+                await deliver({
+                    "type": "ai_delta",
+                    "delta": delta
+                })
+            ai_response = "".join(ai_parts).strip()
+            print(f"AI response: {ai_response}")
+            if idempotency_key:
+                try:
+                    await asyncio.to_thread(self.store.save_response, idempotency_key, ai_response)
+                except Exception as e:
+                    print(f"AI response not saved for replay: {e}")
+        except Exception as e:
+            print(f"AI response error: {e}")
+            ai_response = "I've stored that information! Thanks for sharing with me."
+        
+        await deliver({
+            "type": "ai_response",
+            "ai_response": ai_response
+        })
+        return ai_response
+    
+    async def send_pending_answer(self, send, answering: asyncio.Task):
+        """Send a resent submission the answer its first attempt is still generating"""
+        try:
+            ai_response = await asyncio.shield(answering)
+            await send({
+                "type": "ai_response",
                 "ai_response": ai_response
-            }))
-            
+            })
         except Exception as e:
-            await websocket.send_text(json.dumps({
-                "type": "error",
-                "message": f"Error processing audio: {str(e)}"
-            }))
+            print(f"AI response not delivered: {e}")
+
+    async def send_reminder(self, reminder: Reminder):
+        """Push a due reminder to every connected client"""
+        self.hub.publish({
+            "type": "reminder",
+            "memory_id": reminder.memory.id,
+            "text": reminder.memory.text,
+            "due_at": reminder.due_at
+        })
 
     def run(self, host: str = "0.0.0.0", port: int = None):
         """Run the web application"""
@@ -868,8 +405,21 @@ class WebAssistant:
         uvicorn.run(self.app, host=host, port=port)
 
 
+def create_app() -> FastAPI:
+    """App factory for uvicorn workers (uvicorn --factory myassistant.web_gui:create_app)"""
+    return WebAssistant().app
+
+
 def main():
-    """Main entry point for web GUI application"""
+    """Main entry point for web GUI application
+
+    ASSISTANT_WORKERS > 1 (0 for one per CPU) serves from several processes
+    that share one writer process for the database
+    """
+    workers = get_env_int("ASSISTANT_WORKERS", 1) or os.cpu_count() or 1
+    if workers > 1:
+        run_workers("myassistant.web_gui:create_app", workers, port=int(os.environ.get("PORT", 8001)))
+        return
     app = WebAssistant()
     app.run()
 
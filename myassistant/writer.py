@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .memory_store import Memory, MemoryStore
+
+# MemoryStore methods that write; everything else is read locally
+WRITE_METHODS = ("remember_memory", "import_memories", "delete", "mark_reminder_notified", "save_response")
+
+ADDRESS_ENV = "ASSISTANT_WRITER_ADDRESS"
+AUTHKEY_ENV = "ASSISTANT_WRITER_AUTHKEY"
+
+
+class WriterServer:
+	"""The one process that writes memories when several workers serve requests.
+
+	Workers send write calls over a local socket; they are applied one at a
+	time to a single MemoryStore, so memory writes never compete. The
+	response cache and persisted sessions are still written by each worker
+	and rely on the busy timeout set in connect_db().
+	"""
+
+	def __init__(self, db_path: Optional[Path] = None, authkey: Optional[bytes] = None) -> None:
+		self.store = MemoryStore(db_path)
+		self.authkey = authkey or os.urandom(32)
+		self.listener = Listener(authkey=self.authkey)
+		self.writes = 0
+		self._lock = threading.Lock()
+		self._closed = False
+
+	@property
+	def address(self) -> str:
+		return str(self.listener.address)
+
+	def env(self) -> Dict[str, str]:
+		"""Settings that point workers' open_store() at this writer."""
+		return {ADDRESS_ENV: self.address, AUTHKEY_ENV: self.authkey.hex(), "ASSISTANT_DB_PATH": self.store.db_path}
+
+	def start(self) -> "WriterServer":
+		threading.Thread(target=self._accept, name="memory-writer", daemon=True).start()
+		return self
+
+	def _accept(self) -> None:
+		while not self._closed:
+			try:
+				conn = self.listener.accept()
+			except OSError:
+				return  # closed
+			except Exception as e:
+				print(f"Writer connection refused: {e}")
+				continue
+			threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+	def _serve(self, conn: Connection) -> None:
+		with conn:
+			while True:
+				try:
+					method, args, kwargs = conn.recv()
+				except (EOFError, OSError):
+					return
+				if method not in WRITE_METHODS:
+					conn.send(("error", ValueError(f"Not a write method: {method}")))
+					continue
+				try:
+					with self._lock:
+						result = getattr(self.store, method)(*args, **kwargs)
+						self.writes += 1
+				except Exception as e:
+					conn.send(("error", e))
+				else:
+					conn.send(("ok", result))
+
+	def close(self) -> None:
+		self._closed = True
+		self.listener.close()
+
+
+class RemoteMemoryStore(MemoryStore):
+	"""A worker's MemoryStore: reads from the shared database, writes through the writer."""
+
+	def __init__(self, address: str, authkey: bytes, db_path: Optional[Path] = None) -> None:
+		self.address = address
+		self.authkey = authkey
+		# One connection per thread, as request handlers write from a thread pool
+		self._local = threading.local()
+		super().__init__(db_path)
+
+	def _ensure_schema(self) -> None:
+		# The writer created and migrated the schema before any worker started
+		pass
+
+	def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+		conn = getattr(self._local, "conn", None)
+		if conn is None:
+			conn = self._local.conn = Client(self.address, authkey=self.authkey)
+		try:
+			conn.send((method, args, kwargs))
+			status, value = conn.recv()
+		except (EOFError, OSError) as e:
+			self._local.conn = None
+			raise ConnectionError(f"Memory writer unavailable: {e}") from e
+		if status == "error":
+			raise value
+		return value
+
+	def remember_memory(
+		self,
+		text: str,
+		tags: Optional[Sequence[str]] = None,
+		source: str = "",
+		idempotency_key: Optional[str] = None,
+	) -> Memory:
+		if idempotency_key:
+			# Repeats are answered from the shared database without a round trip
+			earlier = self.replay(idempotency_key)
+			if earlier is not None:
+				return earlier[0]
+		return self._call("remember_memory", text, list(tags or []), source, idempotency_key)
+
+	def import_memories(self, records: Iterable[dict]) -> List[int]:
+		return self._call("import_memories", list(records))
+
+	def delete(self, memory_id: int) -> bool:
+		return self._call("delete", memory_id)
+
+	def mark_reminder_notified(self, memory_id: int) -> None:
+		self._call("mark_reminder_notified", memory_id)
+
+	def save_response(self, idempotency_key: str, response: str) -> None:
+		self._call("save_response", idempotency_key, response)
+
+
+def open_store(db_path: Optional[Path] = None) -> MemoryStore:
+	"""The store for this process: through the writer when one was started, else direct."""
+	address = os.environ.get(ADDRESS_ENV)
+	if address:
+		return RemoteMemoryStore(address, bytes.fromhex(os.environ[AUTHKEY_ENV]), db_path)
+	return MemoryStore(db_path)
+
+
+def run_workers(app: str, workers: int, host: str = "0.0.0.0", port: int = 8001) -> None:
+	"""Serve app (an import string for an app factory) from several processes sharing one writer."""
+	import uvicorn
+
+	writer = WriterServer().start()
+	os.environ.update(writer.env())
+	print(f"Memory writer listening on {writer.address}; starting {workers} workers")
+	try:
+		uvicorn.run(app, factory=True, host=host, port=port, workers=workers)
+	finally:
+		writer.close()
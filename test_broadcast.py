@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for broadcasting memory events to connected pages
+"""
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant.broadcast import BroadcastHub
+from myassistant.web_gui import WebAssistant
+
+
+async def _hub_backpressure():
+    hub = BroadcastHub(max_queue=4, send_timeout=1)
+    fast, slow, dead = [], [], []
+    gate = asyncio.Event()
+
+    async def fast_send(payload):
+        fast.append(json.loads(payload))
+
+    async def slow_send(payload):
+        await gate.wait()
+        slow.append(json.loads(payload))
+
+    async def dead_send(payload):
+        dead.append(payload)
+        raise ConnectionError("socket closed")
+
+    closed = []
+
+    async def close_dead():
+        closed.append(True)
+
+    hub.subscribe(fast_send)
+    hub.subscribe(slow_send)
+    hub.subscribe(dead_send, close_socket=close_dead)
+
+    for i in range(20):
+        hub.publish({"type": "memory_created", "memory": {"id": i}})
+        hub.publish({"type": "count_changed", "count": i + 1}, coalesce="count")
+        await asyncio.sleep(0.005)
+    await asyncio.sleep(0.05)
+
+    assert len(fast) == 40 and fast[-1] == {"type": "count_changed", "count": 20}
+    print("✅ Fast subscriber received every event while another was stuck")
+
+    assert closed and len(dead) == 1 and hub.stats()["subscribers"] == 2
+    print("✅ Failing subscriber was closed and removed")
+
+    gate.set()
+    await asyncio.sleep(0.05)
+    # The first frame was already being sent; the rest overflowed into a resync
+    assert {"type": "resync"} in slow and len(slow) <= 1 + 1 + 4
+    assert hub.stats()["dropped"] > 0
+    print(f"✅ Slow subscriber got {len(slow)} frames including a resync")
+
+    hub.close()
+    assert hub.stats()["subscribers"] == 0
+
+
+async def _coalescing():
+    hub = BroadcastHub(max_queue=8, send_timeout=1)
+    got = []
+    gate = asyncio.Event()
+
+    async def send(payload):
+        await gate.wait()
+        got.append(json.loads(payload))
+
+    hub.subscribe(send)
+    hub.publish({"type": "count_changed", "count": 0}, coalesce="count")
+    await asyncio.sleep(0)
+    for count in range(1, 6):
+        hub.publish({"type": "count_changed", "count": count}, coalesce="count")
+    gate.set()
+    await asyncio.sleep(0.05)
+    assert [f["count"] for f in got] == [0, 5]
+    assert hub.stats()["coalesced"] == 4
+    print("✅ Queued count updates coalesced to the newest")
+    hub.close()
+
+
+def test_broadcast():
+    print("📡 Testing Broadcast Hub")
+    print("=" * 40)
+
+    asyncio.run(_hub_backpressure())
+    asyncio.run(_coalescing())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"ASSISTANT_DB_PATH": str(Path(tmp) / "memories.db"), "ASSISTANT_ENGINE": "local"}
+        with mock.patch.dict(os.environ, env):
+            web = WebAssistant()
+            with TestClient(web.app) as client:
+                with client.websocket_connect("/ws") as writer, client.websocket_connect("/ws") as reader:
+                    writer.send_json({"type": "audio", "data": "My locker is 42", "request_id": "a"})
+                    created = reader.receive_json()
+                    count = reader.receive_json()
+                    assert created["type"] == "memory_created" and created["memory"]["text"] == "My locker is 42"
+                    assert count == {"type": "count_changed", "count": 1}
+                    print("✅ Other page saw the new memory and count")
+
+                    deleted = client.delete(f"/memories/{created['memory']['id']}").json()
+                    assert deleted["count"] == 0
+                    assert reader.receive_json() == {"type": "memory_deleted", "memory_id": created["memory"]["id"]}
+                    assert reader.receive_json() == {"type": "count_changed", "count": 0}
+                    print("✅ Deletes are broadcast too")
+
+                    published = client.get("/broadcast/stats").json()["published"]
+                    assert client.delete(f"/memories/{created['memory']['id']}").status_code == 404
+                    assert client.get("/broadcast/stats").json()["published"] == published
+                    print("✅ Deleting a missing memory is a 404 and broadcasts nothing")
+
+                    assert client.get("/broadcast/stats").json()["subscribers"] == 2
+                assert client.get("/broadcast/stats").json()["subscribers"] == 0
+                print("✅ Closed sockets unsubscribed")
+
+    print("\n🎉 Broadcast tests passed!")
+
+
+if __name__ == "__main__":
+    test_broadcast()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for NDJSON import and export of memories
+"""
+import gzip
+import importlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+
+def _chunks(data: bytes, size: int = 37):
+    # Chunk boundaries fall mid-line, as they do on the wire
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_bulk_transfer():
+    print("📦 Testing NDJSON Import/Export")
+    print("=" * 40)
+
+    rows = [
+        {"text": f"Note {i}: buy item {i}", "tags": ["shopping"], "source": "bulk", "language": "en",
+         "created_at": f"2024-01-01T00:00:{i % 60:02d}+00:00"}
+        for i in range(95)
+    ]
+    lines = [json.dumps(r) for r in rows]
+    lines.insert(10, "not json")
+    lines.insert(20, json.dumps({"text": "  "}))
+    lines.insert(30, "")
+    body = ("\n".join(lines)).encode()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"ASSISTANT_DB_PATH": str(Path(tmp) / "a.db"), "ASSISTANT_IMPORT_BATCH_SIZE": "20"}
+        with mock.patch.dict(os.environ, env):
+            from myassistant import api
+            api = importlib.reload(api)
+            client = TestClient(api.app)
+
+            result = client.post("/memories:import", content=_chunks(body),
+                                 headers={"Content-Type": "application/x-ndjson"}).json()
+            assert result["imported"] == 95 and result["batches"] == 5
+            assert result["skipped"] == 2 and [e["line"] for e in result["errors"]] == [11, 21]
+            print(f"✅ Imported {result['imported']} in {result['batches']} batches, skipped {result['skipped']}")
+
+            compressed = client.post("/memories:import", content=_chunks(gzip.compress(body[:2000]), 11),
+                                     headers={"Content-Encoding": "gzip"}).json()
+            assert compressed["imported"] > 0
+            print("✅ Gzipped request bodies are accepted")
+
+            too_long = client.post("/memories:import", content=b'{"text": "' + b"x" * (api.MAX_LINE_BYTES + 10))
+            assert too_long.status_code == 413
+
+            plain = client.get("/memories:export", headers={"Accept-Encoding": "identity"})
+            assert "content-encoding" not in plain.headers
+            exported = [json.loads(line) for line in plain.text.splitlines()]
+            assert len(exported) == 95 + compressed["imported"]
+            assert exported[0]["text"] == rows[0]["text"] and exported[0]["tags"] == ["shopping"]
+            assert [e["id"] for e in exported] == sorted(e["id"] for e in exported)
+
+            zipped = client.get("/memories:export", headers={"Accept-Encoding": "gzip"})
+            assert zipped.headers["content-encoding"] == "gzip"
+            assert [json.loads(line) for line in zipped.text.splitlines()] == exported
+            print(f"✅ Exported {len(exported)} rows, plain and gzipped")
+
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "b.db")}):
+            api = importlib.reload(api)
+            client = TestClient(api.app)
+            again = client.post("/memories:import", content=plain.content).json()
+            assert again["imported"] == len(exported) and again["skipped"] == 0
+            copy = [json.loads(line) for line in client.get("/memories:export").text.splitlines()]
+            assert [(m["text"], m["created_at"], m["tags"]) for m in copy] == [
+                (m["text"], m["created_at"], m["tags"]) for m in exported
+            ]
+            print("✅ Export round-trips into a fresh database")
+
+            typed = [{"text": "a", "created_at": 123}, {"text": "b", "tags": 5}, {"text": "c", "tags": [1, 2]},
+                     {"text": "d", "source": 7}, {"text": "e", "tags": ["ok"], "language": "en"}]
+            mixed = client.post("/memories:import", content="\n".join(json.dumps(r) for r in typed)).json()
+            assert mixed["imported"] == 1 and mixed["skipped"] == 4
+            assert [e["line"] for e in mixed["errors"]] == [1, 2, 3, 4]
+            print("✅ Fields of the wrong type are skipped and reported")
+
+            with mock.patch.object(api.store, "import_memories", side_effect=RuntimeError("disk full")):
+                failed = client.post("/memories:import", content=json.dumps({"text": "f"}))
+            assert failed.status_code == 500
+            assert failed.json()["detail"] == {"error": "Import failed: disk full", "imported": 0}
+            print("✅ A failed batch is reported with the count already imported")
+
+    print("\n🎉 Import/export tests passed!")
+
+
+if __name__ == "__main__":
+    test_bulk_transfer()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for ETags keyed on the store's write generation
+"""
+import importlib
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant.web_gui import WebAssistant
+
+
+def test_conditional_get():
+    print("🏷️ Testing Conditional GET")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "memories.db")}):
+            from myassistant import api
+            api = importlib.reload(api)
+            client = TestClient(api.app)
+            client.post("/remember", json={"text": "Dentist on Friday at 10"})
+
+            first = client.get("/ask", params={"q": "dentist"})
+            etag = first.headers["etag"]
+            assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+            with mock.patch.object(api.store, "ask", side_effect=AssertionError("searched")), \
+                    mock.patch.object(api.memory_encoder, "scored_json", side_effect=AssertionError("encoded")):
+                again = client.get("/ask", params={"q": "dentist"}, headers={"If-None-Match": etag})
+            assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+            print(f"✅ Unchanged store answers 304 for {etag} without searching")
+
+            recent = client.get("/recent")
+            assert client.get("/recent", headers={"If-None-Match": recent.headers["etag"]}).status_code == 304
+            memory_id = client.post("/remember", json={"text": "Gym on Monday"}).json()["id"]
+            changed = client.get("/recent", headers={"If-None-Match": recent.headers["etag"]})
+            assert changed.status_code == 200 and changed.json()[0]["text"] == "Gym on Monday"
+            client.delete(f"/memories/{memory_id}")
+            after_delete = client.get("/recent", headers={"If-None-Match": changed.headers["etag"]})
+            assert after_delete.status_code == 200 and len(after_delete.json()) == 1
+            print("✅ Inserts and deletes change the ETag")
+
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "web.db")}):
+            web = WebAssistant()
+            with TestClient(web.app) as client:
+                count = client.get("/memories/count")
+                assert count.json() == {"count": 0}
+                with mock.patch.object(web.store, "count", side_effect=AssertionError("counted")):
+                    polled = client.get("/memories/count", headers={"If-None-Match": count.headers["etag"]})
+                assert polled.status_code == 304
+                web.store.remember("Water the plants")
+                assert client.get("/memories/count", headers={"If-None-Match": count.headers["etag"]}).json() == {"count": 1}
+                print("✅ /memories/count polls cost one generation lookup")
+
+    print("\n🎉 Conditional GET tests passed!")
+
+
+if __name__ == "__main__":
+    test_conditional_get()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-budgeted context builder
+"""
+import tempfile
+from pathlib import Path
+
+from myassistant.context_builder import ContextBuilder, estimate_tokens, fit_turns
+from myassistant.memory_store import MemoryStore
+
+
+def test_context_builder():
+    print("🧮 Testing Context Builder")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "memories.db")
+        meeting_id = store.remember("I have a meeting tomorrow at 2 PM with the boss")
+        for i in range(20):
+            store.remember(f"Grocery list item number {i}: apples, bread and milk")
+        store.remember("The project report " + "is very detailed " * 100)
+
+        builder = ContextBuilder(budget_tokens=120, max_memory_tokens=30)
+        context = builder.build(store, "When is my meeting?")
+
+        ids = context.memory_ids
+        assert len(ids) == len(set(ids))
+        assert ids[0] == meeting_id
+        print("✅ Duplicates removed and the relevant memory ranked first")
+
+        assert context.tokens <= 120
+        assert estimate_tokens(context.text) <= 120
+        assert all(estimate_tokens(line) <= 32 for line in context.lines)
+        print(f"✅ {len(ids)} memories packed into ~{context.tokens} tokens")
+
+    turns = [{"role": "user", "content": "word " * 200}] + [
+        {"role": "user", "content": f"turn {i}"} for i in range(6)
+    ]
+    kept = fit_turns(turns, budget_tokens=50, max_turns=5)
+    assert [t["content"] for t in kept] == [f"turn {i}" for i in range(1, 6)]
+    assert fit_turns(turns[:1], budget_tokens=50, max_turns=5) == turns[:1]
+    print("✅ History trimmed to the newest turns that fit")
+
+
+if __name__ == "__main__":
+    test_context_builder()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for structured fact extraction and the memory_facts index
+"""
+import tempfile
+from pathlib import Path
+
+from myassistant.facts import extract_facts, question_fact_kinds
+from myassistant.memory_store import MemoryStore
+from myassistant.smart_ai import SmartAI
+
+
+def test_facts():
+    print("📇 Testing Fact Extraction")
+    print("=" * 40)
+
+    assert extract_facts("My sister's phone number is 555-1234") == [("phone", "5551234")]
+    assert ("room", "259n") in extract_facts("Sr. Cabrini's room is 259N on the second floor")
+    assert ("name", "sr. cabrini") in extract_facts("Sr. Cabrini's room is 259N on the second floor")
+    assert ("name", "dr. smith") in extract_facts("Call Dr. Smith tomorrow")
+    assert ("name", "mr. brown") in extract_facts("Meet Mr. Brown at 3pm")
+    assert ("name", "dr. smith") in extract_facts("Call Dr. Smith on 2026-11-03")
+    assert ("name", "sarah") in extract_facts("Sarah is my best friend")
+    assert not [v for k, v in extract_facts("It is raining") if k == "name"]
+    assert extract_facts("I have a meeting tomorrow at 2 PM") == [("date", "tomorrow"), ("time", "2 pm")]
+    assert extract_facts("My birthday is on March 15th") == [("date", "march 15th")]
+    print("✅ Phone numbers, rooms, dates, times and names extracted")
+
+    assert "name" in question_fact_kinds("Bác sĩ của tôi là ai?")
+    assert "name" not in question_fact_kinds("What can the AI do?")
+    print("✅ Vietnamese \"who\" questions ask for names; the English \"AI\" does not")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "memories.db")
+        phone_id = store.remember("My sister's phone number is 555-1234")
+        store.remember("My favorite color is blue")
+        store.remember("My brother's phone number is 555-9876")
+
+        assert store.facts(phone_id) == [("phone", "5551234")]
+        assert [m.id for m in store.find_by_fact(["phone"], "5551234")] == [phone_id]
+        assert len(store.find_by_fact(["phone"])) == 2
+        print("✅ Facts indexed at insert time")
+
+        ai = SmartAI()
+        response = ai.get_response("What's my sister's phone number?", store)
+        assert response == "Based on what you told me: My sister's phone number is 555-1234"
+        print("✅ Smart AI answers from the fact index")
+
+        store.delete(phone_id)
+        assert store.facts(phone_id) == []
+        print("✅ Facts removed with their memory")
+
+
+if __name__ == "__main__":
+    test_facts()
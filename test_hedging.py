@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for LLM deadline hedging and the circuit breaker
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from myassistant.ai_response import AIResponseSystem
+from myassistant.engines import AIResponseEngine
+from myassistant.hedging import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, hedge
+from myassistant.memory_store import MemoryStore
+from myassistant.stub_server import StubServer
+
+
+def test_hedging():
+    print("⏱️ Testing Deadline Hedging")
+    print("=" * 40)
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    print("✅ Breaker opens after repeated failures and recovers after a trial call")
+
+    late = []
+    upgraded = threading.Event()
+
+    def slow():
+        time.sleep(0.3)
+        return "llm"
+
+    start = time.monotonic()
+    result, from_primary = hedge(slow, lambda: "local", 0.05, on_late=lambda r: (late.append(r), upgraded.set()))
+    assert (result, from_primary) == ("local", False)
+    assert time.monotonic() - start < 0.25
+    assert upgraded.wait(1) and late == ["llm"]
+    assert hedge(lambda: "llm", lambda: "local", 1) == ("llm", True)
+    print("✅ Local answer on a missed deadline, LLM answer delivered later")
+
+    always_late = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    arrived = threading.Semaphore(0)
+    for _ in range(2):
+        hedge(lambda: (time.sleep(0.1), "llm")[1], lambda: "local", 0.02,
+              breaker=always_late, on_late=lambda r: arrived.release())
+    assert arrived.acquire(timeout=1) and arrived.acquire(timeout=1)
+    assert always_late.state == OPEN and always_late.failures == 2
+    assert hedge(lambda: "llm", lambda: "local", 1, breaker=always_late) == ("local", False)
+    print("✅ A primary that always answers late still opens the breaker")
+
+    env = {"OPENAI_API_KEY": "test-key", "ASSISTANT_LLM_DEADLINE_MS": "100"}
+    with tempfile.TemporaryDirectory() as tmp, StubServer(reply="You meet at 2 PM", delay=0.5) as stub:
+        env["OPENAI_BASE_URL"] = stub.base_url
+        with mock.patch.dict(os.environ, env):
+            store = MemoryStore(Path(tmp) / "memories.db")
+            store.remember("I have a meeting tomorrow at 2 PM")
+            system = AIResponseSystem(store)
+
+            upgrades = []
+            got_upgrade = threading.Event()
+            start = time.monotonic()
+            answer = system.get_response("When is my meeting?", on_upgrade=lambda r: (upgrades.append(r), got_upgrade.set()))
+            assert time.monotonic() - start < 0.45
+            assert answer != "You meet at 2 PM"
+            assert got_upgrade.wait(2) and upgrades == ["You meet at 2 PM"]
+            assert system.get_response("When is my meeting?") == "You meet at 2 PM"
+            print("✅ Slow LLM answered locally, upgraded, then served from cache")
+
+            async def stream():
+                streamed_upgrades = []
+                done = asyncio.Event()
+
+                async def on_upgrade(text):
+                    streamed_upgrades.append(text)
+                    done.set()
+
+                parts = [d async for d in system.astream_response("Where is my meeting?", on_upgrade=on_upgrade)]
+                assert parts and "".join(parts) != "You meet at 2 PM"
+                await asyncio.wait_for(done.wait(), 2)
+                assert streamed_upgrades == ["You meet at 2 PM"]
+
+            asyncio.run(stream())
+            print("✅ Slow stream answered locally and upgraded")
+
+            system.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+            late_answers = threading.Semaphore(0)
+            for question in ("Is the meeting at 2?", "Who is at the meeting?"):
+                system.get_response(question, on_upgrade=lambda r: late_answers.release())
+            assert late_answers.acquire(timeout=2) and late_answers.acquire(timeout=2)
+            assert system.breaker.state == OPEN
+
+            async def late_streams():
+                upgraded = asyncio.Queue()
+                for question in ("What time is the meeting?", "Where do we meet tomorrow?"):
+                    async for _ in system.astream_response(question, on_upgrade=upgraded.put):
+                        pass
+                for _ in range(2):
+                    await asyncio.wait_for(upgraded.get(), 2)
+
+            system.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+            asyncio.run(late_streams())
+            assert system.breaker.state == OPEN
+            print("✅ Late answers and streams keep counting as failures")
+
+            other = MemoryStore(Path(tmp) / "other.db")
+            other.remember("My locker number is 42")
+            engine = AIResponseEngine(store)
+            engine_upgrades = []
+            engine_upgraded = threading.Event()
+            answer = engine.get_response("What is my locker number?", other, "s1",
+                                         on_upgrade=lambda r: (engine_upgrades.append(r), engine_upgraded.set()))
+            assert "locker number is 42" in answer
+            assert engine_upgraded.wait(2) and engine_upgrades == ["You meet at 2 PM"]
+            assert engine._system_for(other) is not engine.system and engine._system_for(store) is engine.system
+            print("✅ The openai engine answers from the caller's store and passes upgrades on")
+
+            system.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+            system.breaker.record_failure()
+            sent = len(stub.requests)
+            system.get_response("What else is on tomorrow?")
+            assert len(stub.requests) == sent
+            print("✅ Open breaker skips the LLM")
+
+
+if __name__ == "__main__":
+    test_hedging()
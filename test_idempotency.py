@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for idempotent memory submissions
+"""
+import asyncio
+import importlib
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant import memory_store
+from myassistant.engines import register_engine
+from myassistant.memory_store import MemoryStore
+from myassistant.web_gui import WebAssistant
+from myassistant.writer import WriterServer, open_store
+
+
+class SlowStreamingEngine:
+    calls = 0
+
+    def get_response(self, user_message, memory_store=None, session_id="default"):
+        raise NotImplementedError
+
+    async def astream_response(self, user_message, memory_store=None, session_id="default"):
+        SlowStreamingEngine.calls += 1
+        yield "First part, "
+        await asyncio.sleep(0.5)
+        yield "second part."
+
+    def is_available(self):
+        return True
+
+
+class CountingEngine:
+    calls = 0
+
+    def get_response(self, user_message, memory_store=None, session_id="default"):
+        CountingEngine.calls += 1
+        return f"Noted: {user_message}"
+
+    def is_available(self):
+        return True
+
+
+def test_idempotency():
+    print("🔁 Testing Idempotency Keys")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "memories.db")
+        first = store.remember_memory("Pick up the dry cleaning", idempotency_key="k1")
+        with mock.patch.object(memory_store.langid, "classify", side_effect=AssertionError("classified")):
+            again = store.remember_memory("Pick up the dry cleaning", idempotency_key="k1")
+        assert again == first and store.count() == 1
+        print("✅ Repeat returns the first memory without language detection or insert")
+
+        store.save_response("k1", "Got it")
+        assert store.replay("k1") == (first, "Got it")
+        store.idempotency_ttl = -1
+        assert store.replay("k1") is None
+        assert store.remember_memory("Pick up the dry cleaning", idempotency_key="k1").id != first.id
+        store.idempotency_ttl = 3600
+        print("✅ Keys expire after the TTL")
+
+        store.delete(first.id)
+        assert store.count() == 1
+        with store._conn() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM idempotency_keys WHERE memory_id = ?", (first.id,)).fetchone()[0] == 0
+
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "api.db")}):
+            from myassistant import api
+            api = importlib.reload(api)
+            client = TestClient(api.app)
+            headers = {"Idempotency-Key": "retry-1"}
+            created = client.post("/remember", json={"text": "Renew passport"}, headers=headers)
+            retried = client.post("/remember", json={"text": "Renew passport"}, headers=headers)
+            assert retried.json() == created.json() and retried.headers["idempotent-replayed"] == "true"
+            changed = client.post("/remember", json={"text": "Renew driving licence"}, headers=headers)
+            assert changed.status_code == 422
+            tagged = client.post("/remember", json={"text": "Renew passport", "tags": ["travel"]}, headers=headers)
+            assert tagged.status_code == 422
+            assert len(client.get("/recent").json()) == 1
+            print("✅ /remember retries with Idempotency-Key store once; a changed body gets 422")
+
+        register_engine("counting-test", lambda store, sessions: CountingEngine())
+        env = {"ASSISTANT_DB_PATH": str(Path(tmp) / "web.db"), "ASSISTANT_ENGINE": "counting-test"}
+        with mock.patch.dict(os.environ, env):
+            web = WebAssistant()
+            message = {"type": "audio", "data": "Call the plumber", "session_id": "c1",
+                       "request_id": "r1", "idempotency_key": "r1"}
+            with TestClient(web.app) as client:
+                with client.websocket_connect("/ws") as ws:
+                    ws.send_json(message)
+                    answer = ws.receive_json()
+                    while answer["type"] != "ai_response":
+                        answer = ws.receive_json()
+                with client.websocket_connect("/ws") as ws:
+                    ws.send_json(message)
+                    frames = []
+                    while not frames or frames[-1]["type"] != "ai_response":
+                        frames.append(ws.receive_json())
+                stored = next(f for f in frames if f["type"] == "memory_stored")
+                assert stored["replayed"] and frames[-1]["ai_response"] == answer["ai_response"]
+                assert not any(f["type"] in ("memory_created", "ai_delta") for f in frames)
+                assert CountingEngine.calls == 1 and web.store.count() == 1
+                print("✅ Resent websocket message replays memory and answer, one engine call")
+
+                other = {**message, "session_id": "c2"}
+                with client.websocket_connect("/ws") as ws:
+                    ws.send_json(other)
+                    while ws.receive_json()["type"] != "ai_response":
+                        pass
+                assert web.store.count() == 2
+                print("✅ Keys are scoped per client")
+
+        register_engine("slow-stream-test", lambda store, sessions: SlowStreamingEngine())
+        env = {"ASSISTANT_DB_PATH": str(Path(tmp) / "dropped.db"), "ASSISTANT_ENGINE": "slow-stream-test"}
+        with mock.patch.dict(os.environ, env):
+            web = WebAssistant()
+            message = {"type": "audio", "data": "Water the plants", "session_id": "c1",
+                       "request_id": "r1", "idempotency_key": "r1"}
+            with TestClient(web.app) as client:
+                with client.websocket_connect("/ws") as ws:
+                    ws.send_json(message)
+                    while ws.receive_json()["type"] != "ai_delta":
+                        pass
+                # Dropped mid-stream; the page resends once it has reconnected
+                with client.websocket_connect("/ws") as ws:
+                    ws.send_json(message)
+                    frame = ws.receive_json()
+                    while frame["type"] != "ai_response":
+                        frame = ws.receive_json()
+                    assert frame["ai_response"] == "First part, second part."
+                with client.websocket_connect("/ws") as ws:
+                    ws.send_json(message)
+                    frame = ws.receive_json()
+                    while frame["type"] != "ai_response":
+                        frame = ws.receive_json()
+                    assert frame["ai_response"] == "First part, second part."
+                assert SlowStreamingEngine.calls == 1 and web.store.count() == 1
+                assert web.store.replay("ws:c1:r1")[1] == "First part, second part."
+                print("✅ Answer finished and saved after the page dropped mid-stream")
+
+        writer = WriterServer(Path(tmp) / "shared.db").start()
+        with mock.patch.dict(os.environ, writer.env()):
+            remote = open_store()
+            ids = {remote.remember_memory("Shared note", idempotency_key="w1").id for _ in range(3)}
+            assert len(ids) == 1 and writer.writes == 1
+        writer.close()
+        print("✅ Workers answer repeats without a round trip to the writer")
+
+    print("\n🎉 Idempotency tests passed!")
+
+
+if __name__ == "__main__":
+    test_idempotency()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared keyword matcher
+"""
+from myassistant.keyword_matcher import KeywordMatcher
+from myassistant.smart_ai import SmartAI
+
+
+def test_keyword_matcher():
+    print("🔎 Testing Keyword Matcher")
+    print("=" * 40)
+
+    matcher = KeywordMatcher({
+        "greeting": ["hi", "hello", "how are you"],
+        "question": ["how", "what", "?"],
+        "statement": ["my"],
+    })
+
+    # Whole words only: "hi" must not match inside "this"
+    assert matcher.classify("this is it") == frozenset()
+    assert matcher.classify("Hi there") == {"greeting"}
+    assert matcher.classify("myself") == frozenset()
+
+    # Overlapping keywords from different lists are all reported in one pass
+    assert matcher.classify("How are you?") == {"greeting", "question"}
+    assert matcher.keywords("what's my name", "question") == {"what"}
+    print("✅ Word boundaries and overlapping matches")
+
+    ai = SmartAI()
+    assert ai._analyze_message_type("this is my car") == "statement"
+    assert ai._analyze_message_type("hello there") == "greeting"
+    assert ai._analyze_message_type("where is the room") == "question"
+    assert ai._analyze_message_type("something else") == "unclear"
+    print("✅ Smart AI intent detection")
+
+
+if __name__ == "__main__":
+    test_keyword_matcher()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the outbound LLM dispatcher
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from myassistant.llm_dispatch import BACKGROUND, INTERACTIVE, LLMDispatcher, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def test_llm_dispatch():
+    print("🚦 Testing LLM Dispatcher")
+    print("=" * 40)
+
+    dispatcher = LLMDispatcher(max_in_flight=2, rate_per_minute=60000, max_retries=3, base_delay=0.01)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def call(i):
+        with lock:
+            running.append(i)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(i)
+        return i
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda i: dispatcher.call(call, i), range(6)))
+    assert results == list(range(6))
+    assert max(peak) == 2
+    stats = dispatcher.stats()
+    assert stats["calls"] == 6 and stats["max_queue_depth"] >= 1
+    print(f"✅ At most 2 calls in flight; {stats}")
+
+    order = []
+    gate = threading.Event()
+    single = LLMDispatcher(max_in_flight=1, rate_per_minute=60000)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        blocker = pool.submit(single.call, gate.wait)
+        time.sleep(0.05)
+        background = pool.submit(single.call, order.append, "ack", priority=BACKGROUND)
+        time.sleep(0.05)
+        interactive = pool.submit(single.call, order.append, "answer", priority=INTERACTIVE)
+        time.sleep(0.05)
+        gate.set()
+        for future in (blocker, background, interactive):
+            future.result()
+    assert order == ["answer", "ack"]
+    print("✅ Interactive answers overtake queued acknowledgements")
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited("slow down")
+        return "ok"
+
+    assert dispatcher.call(flaky) == "ok"
+    assert len(attempts) == 3
+
+    def rejected():
+        attempts.append(1)
+        raise BadRequest("bad prompt")
+
+    attempts.clear()
+    try:
+        dispatcher.call(rejected)
+        raise AssertionError("expected BadRequest")
+    except BadRequest:
+        pass
+    assert len(attempts) == 1
+    print("✅ 429s retried with backoff, client errors are not")
+
+    bucket = TokenBucket(rate=10, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0] and 0.05 < waits[2] < waits[3] <= 0.2
+    print("✅ Token bucket spaces out bursts")
+
+    async def run_async():
+        async def answer():
+            await asyncio.sleep(0.01)
+            return "streamed"
+        assert await dispatcher.acall(answer) == "streamed"
+        async with dispatcher.aslot(BACKGROUND):
+            assert dispatcher.stats()["in_flight"] == 1
+        assert dispatcher.stats()["in_flight"] == 0
+
+        # Far more queued callers than executor threads, with slot holders
+        # that need the executor themselves
+        async def blocking_work(i):
+            async with dispatcher.aslot():
+                return await asyncio.to_thread(time.sleep, 0.01) or i
+        assert await asyncio.wait_for(asyncio.gather(*(blocking_work(i) for i in range(60))), 10) == list(range(60))
+
+    asyncio.run(run_async())
+    print("✅ Async calls share the same limits")
+
+
+if __name__ == "__main__":
+    test_llm_dispatch()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for the stub server options and the load-test harness
+"""
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+
+from myassistant.loadtest import percentile, run_load
+from myassistant.stub_server import StubServer, parse_latency
+
+
+def post(url: str) -> dict:
+    request = urllib.request.Request(url, data=json.dumps({"messages": []}).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def test_loadtest():
+    print("🏋️ Testing Stub Server and Load Test")
+    print("=" * 40)
+
+    rng = random.Random(1)
+    assert parse_latency("0.2")(rng) == 0.2
+    assert all(0.1 <= parse_latency("uniform:0.1,0.3")(rng) <= 0.3 for _ in range(20))
+    assert all(parse_latency("lognormal:0.2,0.5")(rng) > 0 for _ in range(20))
+    assert percentile([1, 2, 3, 4, 5], 50) == 3 and percentile([], 99) == 0.0
+    print("✅ Latency distributions parse")
+
+    with StubServer(error_rate=1.0, error_status=429) as stub:
+        try:
+            post(f"{stub.base_url}/chat/completions")
+            raise AssertionError("expected HTTP 429")
+        except urllib.error.HTTPError as e:
+            assert e.code == 429 and stub.httpd.errors == 1
+
+    with StubServer(reply="one two three four five", tokens_per_second=50) as stub:
+        start = time.monotonic()
+        body = post(f"{stub.base_url}/chat/completions")
+        assert body["choices"][0]["message"]["content"] == "one two three four five"
+        assert time.monotonic() - start >= 0.09
+    print("✅ Stub injects errors and paces tokens")
+
+    env = {"ASSISTANT_LLM_RATE_PER_MINUTE": "60000"}
+    report = run_load(requests=12, concurrency=4, repeat=1.0, latency="0.05", env=env)
+    assert report["errors"] == 0 and report["non_llm_answers"] == 0
+    # Only three distinct questions: the cache and single-flight absorb the rest
+    assert report["provider_calls"] <= 6
+    assert report["dispatcher"]["calls"] == report["provider_calls"]
+    print(f"✅ Blocking load: {report['provider_calls']} provider calls for 12 requests")
+
+    report = run_load(requests=8, concurrency=4, repeat=0.0, stream=True, latency="0.05", env=env)
+    assert report["errors"] == 0 and report["provider_calls"] == 8
+    assert report["first_token"]["p50_ms"] >= 50
+    print(f"✅ Streaming load: first token p50 {report['first_token']['p50_ms']} ms")
+
+
+if __name__ == "__main__":
+    test_loadtest()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the smiler.mp4 media endpoint
+"""
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant.media import MediaFile, RangeNotSatisfiable, parse_range
+from myassistant.web_gui import WebAssistant
+
+
+def test_media():
+    print("🎥 Testing Media Endpoint")
+    print("=" * 40)
+
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("bytes=0-1,5-9", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    for bad in ("bytes=1000-", "bytes=20-10", "bytes=-0"):
+        try:
+            parse_range(bad, 1000)
+            raise AssertionError(f"{bad} should not be satisfiable")
+        except RangeNotSatisfiable:
+            pass
+    print("✅ Range headers parsed")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = bytes(range(256)) * 1024
+        (Path(tmp) / "smiler.mp4").write_bytes(video)
+        env = {"ASSISTANT_DB_PATH": str(Path(tmp) / "memories.db")}
+        with mock.patch.dict(os.environ, env), mock.patch("pathlib.Path.cwd", return_value=Path(tmp)):
+            web = WebAssistant()
+        assert web.smiler is not None and web.smiler.size == len(video)
+
+        with TestClient(web.app) as client:
+            full = client.get("/smiler.mp4")
+            assert full.status_code == 200 and full.content == video
+            assert full.headers["accept-ranges"] == "bytes"
+            assert full.headers["content-type"] == "video/mp4"
+            etag = full.headers["etag"]
+            print(f"✅ Full file served with ETag {etag}")
+
+            part = client.get("/smiler.mp4", headers={"Range": "bytes=1000-1999"})
+            assert part.status_code == 206 and part.content == video[1000:2000]
+            assert part.headers["content-range"] == f"bytes 1000-1999/{len(video)}"
+            assert part.headers["content-length"] == "1000"
+            tail = client.get("/smiler.mp4", headers={"Range": "bytes=-10"})
+            assert tail.status_code == 206 and tail.content == video[-10:]
+            print("✅ Byte ranges answered with 206")
+
+            outside = client.get("/smiler.mp4", headers={"Range": f"bytes={len(video)}-"})
+            assert outside.status_code == 416
+            assert outside.headers["content-range"] == f"bytes */{len(video)}"
+            stale = client.get("/smiler.mp4", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+            assert stale.status_code == 200 and len(stale.content) == len(video)
+            print("✅ Unsatisfiable ranges get 416, stale If-Range the whole file")
+
+            cached = client.get("/smiler.mp4", headers={"If-None-Match": etag})
+            assert cached.status_code == 304 and cached.content == b""
+            head = client.head("/smiler.mp4")
+            assert head.status_code == 200 and head.content == b""
+            assert head.headers["content-length"] == str(len(video))
+            print("✅ Revalidation returns 304; HEAD sends headers only")
+
+    missing = MediaFile.find("smiler.mp4", candidates=[Path("/nonexistent/smiler.mp4")])
+    assert missing is None
+    print("\n🎉 Media tests passed!")
+
+
+if __name__ == "__main__":
+    test_media()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for ChatGPTAssistant memory acknowledgement modes
+"""
+import os
+import time
+from unittest import mock
+
+from myassistant.chatgpt_ai import LOCAL_ACKS, ChatGPTAssistant
+from myassistant.stub_server import StubServer
+
+MEMORIES = [
+    "My car is parked on level 3",
+    "The wifi password is on the fridge",
+    "Dentist appointment on Friday",
+    "Mom's birthday is June 5",
+]
+
+
+def test_memory_acks():
+    print("📝 Testing Memory Acknowledgements")
+    print("=" * 40)
+
+    with StubServer(reply="Got all of that!") as stub:
+        env = {"OPENAI_API_KEY": "test-key", "OPENAI_BASE_URL": stub.base_url}
+
+        with mock.patch.dict(os.environ, {**env, "ASSISTANT_ACK_MODE": "llm"}):
+            chatgpt = ChatGPTAssistant()
+            for memory in MEMORIES:
+                assert chatgpt.add_memory(memory) == "Got all of that!"
+            assert chatgpt.completions_per_memory == 1.0
+            print("✅ llm mode: one completion per memory")
+
+        sent = len(stub.requests)
+        with mock.patch.dict(os.environ, {**env, "ASSISTANT_ACK_MODE": "local"}):
+            chatgpt = ChatGPTAssistant()
+            start = time.monotonic()
+            acks = [chatgpt.add_memory(memory, "local") for memory in MEMORIES]
+            assert time.monotonic() - start < 0.1
+            assert all(ack in LOCAL_ACKS for ack in acks)
+            assert len(stub.requests) == sent and chatgpt.completions_per_memory == 0
+            assert len(chatgpt.sessions.history("local")) == len(MEMORIES)
+            print("✅ local mode: instant acks, no completions")
+
+        with mock.patch.dict(os.environ, {**env, "ASSISTANT_ACK_MODE": "batch", "ASSISTANT_ACK_BATCH_SIZE": "10"}):
+            chatgpt = ChatGPTAssistant()
+            acks = [chatgpt.add_memory(memory, "batch") for memory in MEMORIES]
+            assert all(ack in LOCAL_ACKS for ack in acks)
+            assert chatgpt.sessions.history("batch") == []
+            chatgpt.flush_acks()
+            history = chatgpt.sessions.history("batch")
+            assert len(history) == 2
+            assert all(memory in history[0]["content"] for memory in MEMORIES)
+            assert history[1]["content"] == "Got all of that!"
+            assert chatgpt.completions_per_memory == 1 / len(MEMORIES)
+            print(f"✅ batch mode: {len(MEMORIES)} memories folded into one completion")
+
+
+if __name__ == "__main__":
+    test_memory_acks()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the profile digest of durable facts
+"""
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from myassistant.context_builder import ContextBuilder
+from myassistant.facts import extract_profile
+from myassistant.memory_store import MemoryStore
+
+
+def test_profile():
+    print("🪪 Testing Profile Digest")
+    print("=" * 40)
+
+    assert extract_profile("I work at Acme Corp and I live in Hanoi.") == [
+        ("work", "employer", "works at Acme Corp"),
+        ("home", "home", "lives in Hanoi"),
+    ]
+    assert extract_profile("My mom's name is Linh, my favorite color is blue") == [
+        ("family", "family:mom", "mom: Linh"),
+        ("preferences", "favorite:color", "favorite color: blue"),
+    ]
+    assert extract_profile("I need to call my mom tomorrow at 3 PM") == []
+    print("✅ Durable facts extracted, tasks ignored")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "memories.db"
+        store = MemoryStore(db_path)
+        store.remember("I work at Acme Corp")
+        store.remember("My birthday is June 5")
+        store.remember("I have a meeting tomorrow at 2 PM")
+        moved = store.remember("I work at Globex now, and I live in Hanoi")
+
+        profile = store.profile()
+        assert list(profile) == ["work", "home", "dates"]
+        assert [f.fact for f in profile["work"]] == ["works at Globex now"]
+        print("✅ Newer statements replace older ones")
+
+        store.delete(moved)
+        assert [f.fact for f in store.profile()["work"]] == ["works at Acme Corp"]
+        assert "home" not in store.profile()
+        print("✅ Deleting a memory falls back to older statements of its facts")
+
+        builder = ContextBuilder(budget_tokens=200, profile_tokens=60)
+        context = builder.build(store, "When is my meeting?")
+        assert context.text.startswith("About the user:\n- Work: works at Acme Corp\n- Dates: birthday: June 5")
+        assert all("birthday" not in m.text for m in context.memories)
+        assert context.tokens <= 200
+        print("✅ Context starts with the digest instead of re-sending its memories")
+
+        tight = ContextBuilder(budget_tokens=200, profile_tokens=12).build(store, "Where do I work?")
+        assert tight.profile_lines == ["- Work: works at Acme Corp"]
+        assert any(m.text == "My birthday is June 5" for m in tight.memories)
+        assert tight.profile_ids == [m.id for m in store.list_recent(limit=10) if m.text == "I work at Acme Corp"]
+        print("✅ Memories whose digest line did not fit are still sent")
+
+        # A database from before the digest is backfilled on open
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DELETE FROM profile_facts")
+            conn.execute("PRAGMA user_version = 2")
+        assert [f.fact for f in MemoryStore(db_path).profile()["dates"]] == ["birthday: June 5"]
+        print("✅ Existing memories backfilled by the migration")
+
+
+if __name__ == "__main__":
+    test_profile()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script for storing a memory and getting the stored row back
+"""
+import importlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant import memory_store
+from myassistant.memory_store import MemoryStore
+
+
+def test_remember():
+    print("💾 Testing Insert-and-Return")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "memories.db")
+        memory = store.remember_memory("Call mom on Friday", ["family"], "test")
+        assert memory.text == "Call mom on Friday" and memory.tags == "family" and memory.source == "test"
+        assert store.list_recent(limit=1)[0] == memory
+        assert store.reminder(memory.id) is not None
+        print(f"✅ Stored row returned: #{memory.id} ({memory.language})")
+
+        with mock.patch.object(memory_store, "_HAS_RETURNING", False):
+            older = store.remember_memory("Buy milk")
+        assert older.id == memory.id + 1 and older.text == "Buy milk"
+        print("✅ Works without RETURNING on older SQLite")
+
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "api.db")}):
+            from myassistant import api
+            api = importlib.reload(api)
+            client = TestClient(api.app)
+
+            def post(i):
+                return client.post("/remember", json={"text": f"Note number {i}", "tags": ["t"]}).json()
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(post, range(40)))
+        assert [r["text"] for r in results] == [f"Note number {i}" for i in range(40)]
+        assert len({r["id"] for r in results}) == 40 and all(r["tags"] == ["t"] for r in results)
+        print("✅ Concurrent /remember calls each get their own memory back")
+
+    print("\n🎉 Insert-and-return tests passed!")
+
+
+if __name__ == "__main__":
+    test_remember()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the reminders index and the reminder scheduler
+"""
+import asyncio
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from myassistant.facts import extract_facts, parse_due
+from myassistant.memory_store import MemoryStore
+from myassistant.scheduler import ReminderScheduler
+
+
+def test_reminders():
+    print("⏰ Testing Reminders")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "memories.db")
+        meeting_id = store.remember("I have a meeting tomorrow at 2 PM")
+        dentist_id = store.remember("I need to call the dentist next week")
+        store.remember("My favorite color is blue")
+
+        assert store.reminder(meeting_id).due_at is not None
+        assert len(store.upcoming_reminders(within=timedelta(days=2))) == 1
+        upcoming = store.upcoming_reminders(within=timedelta(days=8))
+        assert [r.memory.id for r in upcoming] == [meeting_id, dentist_id]
+        print("✅ Tasks indexed with due dates at insert time")
+
+        now = datetime(2025, 1, 10, 12, tzinfo=timezone.utc)
+        for text in ("Submit the report Dec. 5", "Call the bank on sept 12", "Finish taxes by 3rd of April"):
+            assert parse_due(text, now) is not None, text
+        for text in ("I decided 3 things at the meeting", "Call the market 5 times", "We must keep marching 12 miles"):
+            assert not [v for k, v in extract_facts(text) if k == "date"], text
+            assert parse_due(text, now) is None, text
+        print("✅ Only real month names are read as dates")
+
+        # Make one reminder due right away and let the scheduler deliver it
+        due = (datetime.now(timezone.utc) + timedelta(milliseconds=200)).isoformat(timespec="seconds")
+        with store._conn() as conn:
+            conn.execute("UPDATE reminders SET due_at = ? WHERE memory_id = ?", (due, meeting_id))
+
+        delivered = []
+
+        async def notify(reminder):
+            delivered.append(reminder.memory.id)
+
+        async def run_scheduler():
+            scheduler = ReminderScheduler(store, notify)
+            scheduler.start()
+            await asyncio.sleep(1.5)
+            await scheduler.stop()
+
+        asyncio.run(run_scheduler())
+        assert delivered == [meeting_id]
+        assert store.reminder(meeting_id).notified
+        print("✅ Due reminder pushed once and marked as notified")
+
+
+if __name__ == "__main__":
+    test_reminders()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent LLM response cache
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from myassistant.ai_response import AIResponseSystem
+from myassistant.memory_store import MemoryStore
+from myassistant.response_cache import ResponseCache, make_key
+from myassistant.stub_server import StubServer
+
+
+def test_response_cache():
+    print("💾 Testing Response Cache")
+    print("=" * 40)
+
+    assert make_key("gpt-4", "What's my meeting time?", [2, 1]) == make_key("gpt-4", "  what's my MEETING time ", [1, 2])
+    assert make_key("gpt-4", "What's my meeting time?", [1]) != make_key("gpt-4", "What's my meeting time?", [1, 2])
+    print("✅ Keys ignore case, spacing and punctuation but not the memories in context")
+
+    earlier = [{"role": "user", "content": "My dentist is Dr. Lee"}, {"role": "assistant", "content": "Noted"}]
+    assert make_key("gpt-4", "Who is it?", [1], history=[]) == make_key("gpt-4", "Who is it?", [1])
+    assert make_key("gpt-4", "Who is it?", [1], history=earlier) != make_key("gpt-4", "Who is it?", [1])
+    assert make_key("gpt-4", "Who is it?", [1], summary="Talked about the dentist") != make_key("gpt-4", "Who is it?", [1])
+    print("✅ Keys include the conversation sent with the prompt")
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(reply="At 2 PM tomorrow") as stub:
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test-key", "OPENAI_BASE_URL": stub.base_url}):
+            store = MemoryStore(Path(tmp) / "memories.db")
+            store.remember("I have a meeting tomorrow at 2 PM")
+            system = AIResponseSystem(store)
+
+            assert system.get_response("What's my meeting time?") == "At 2 PM tomorrow"
+            assert system.get_response("what's my meeting time") == "At 2 PM tomorrow"
+            assert len(stub.requests) == 1
+            print("✅ Repeated question answered without an API call")
+
+            store.remember("The meeting moved to 4 PM")
+            system.get_response("What's my meeting time?")
+            assert len(stub.requests) == 2
+            print("✅ A new memory in context misses the cache")
+
+            from myassistant.chatgpt_ai import ChatGPTAssistant
+
+            assistant = ChatGPTAssistant()
+            assistant.get_response("Who is it?", store, session_id="a")
+            assistant.get_response("Who is it?", store, session_id="b")
+            assert len(stub.requests) == 3
+            assistant.get_response("Who is it?", store, session_id="a")
+            assert len(stub.requests) == 4
+            fresh = ChatGPTAssistant()
+            fresh.get_response("Who is it?", store, session_id="c")
+            assert len(stub.requests) == 4
+            print("✅ ChatGPT answers are reused only for the same conversation")
+
+        cache = ResponseCache(Path(tmp) / "cache.db", ttl=1, max_entries=2)
+        for i in range(3):
+            cache.put(f"key{i}", "gpt-4", f"answer {i}")
+        assert cache.get("key0") is None
+        assert cache.get("key2") == "answer 2"
+        time.sleep(1.1)
+        assert cache.get("key2") is None
+        print("✅ Size and TTL eviction")
+
+
+if __name__ == "__main__":
+    test_response_cache()
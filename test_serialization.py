@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached JSON serialization path
+"""
+import importlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant import serialization
+from myassistant.memory_store import Memory
+from myassistant.serialization import MemoryEncoder
+
+
+def test_serialization():
+    print("⚡ Testing JSON Serialization")
+    print("=" * 40)
+
+    encoder = MemoryEncoder(max_entries=2)
+    memory = Memory(1, "Café at 9 — «bring notes»", "fr", "work  coffee", "", "2024-01-01T09:00:00+00:00")
+    first = encoder.as_json(memory)
+    assert json.loads(first)["tags"] == ["work", "coffee"]
+    assert encoder.as_json(memory) is first and encoder.hits == 1
+    print("✅ Each memory is encoded once and reused")
+
+    edited = Memory(1, "Café at 10", "fr", "work", "", memory.created_at)
+    assert json.loads(encoder.as_json(edited))["text"] == "Café at 10"
+    for i in range(2, 5):
+        encoder.as_json(Memory(i, f"m{i}", "en", "", "", ""))
+    assert len(encoder._entries) == 2
+    print("✅ Edited rows are re-encoded and the cache stays bounded")
+
+    scored = json.loads(encoder.scored_json([(memory, -1.5), (edited, 0)]))
+    assert scored["results"][0] == {"memory": json.loads(first), "score": -1.5}
+    with mock.patch.object(serialization, "orjson", None):
+        assert json.loads(serialization.dumps({"t": "ü"})) == {"t": "ü"}
+        assert serialization.dumps_str([1, "x"]) == '[1,"x"]'
+    print("✅ Stdlib fallback encodes the same JSON")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "memories.db")}):
+            from myassistant import api
+            api = importlib.reload(api)
+            client = TestClient(api.app)
+            created = client.post("/remember", json={"text": "Dentist on Friday at 10", "tags": ["health"]})
+            assert created.headers["content-type"] == "application/json"
+            stored = api.store.list_recent(limit=1)[0]
+            assert created.json() == api.MemoryResponse.from_memory(stored).model_dump()
+
+            recent = client.get("/recent").json()
+            assert recent == [api.MemoryResponse.from_memory(stored).model_dump()]
+            answer = client.get("/ask", params={"q": "dentist"}).json()
+            expected = api.AskResponse(results=[
+                api.AskResponseItem(memory=api.MemoryResponse.from_memory(m), score=s)
+                for m, s in api.store.ask("dentist")
+            ])
+            assert answer == expected.model_dump()
+            print("✅ /remember, /recent and /ask match their documented models")
+
+    print("\n🎉 Serialization tests passed!")
+
+
+if __name__ == "__main__":
+    test_serialization()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for per-session conversation state
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from myassistant.memory_store import MemoryStore
+from myassistant.sessions import SessionManager
+from myassistant.smart_ai import SmartAI
+
+
+def test_sessions():
+    print("🗂️ Testing Session Manager")
+    print("=" * 40)
+
+    sessions = SessionManager(max_sessions=2, max_turns=3, idle_timeout=60)
+    for i in range(5):
+        sessions.get("alice").add({"user": f"message {i}"})
+    alice = sessions.get("alice")
+    assert [t["user"] for t in alice.turns] == ["message 2", "message 3", "message 4"]
+    assert alice.turn_count == 5
+    print("✅ Turns kept in a fixed-size ring buffer")
+
+    sessions.get("bob")
+    sessions.get("carol")
+    assert len(sessions) == 2
+    assert sessions.get("alice").turn_count == 0
+    print("✅ Least recently used session evicted at the cap")
+
+    idle = SessionManager(idle_timeout=0.05)
+    idle.get("alice")
+    time.sleep(0.1)
+    idle.get("bob")
+    assert len(idle) == 1
+    print("✅ Idle sessions evicted")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "memories.db")
+        store = MemoryStore(Path(db_path))
+        persisted = SessionManager(db_path=db_path)
+        ai = SmartAI(sessions=persisted)
+        ai.get_response("My car is red", store, session_id="alice")
+        ai.get_response("Hello!", store, session_id="bob")
+        assert [t["user"] for t in persisted.history("alice")] == ["My car is red"]
+        persisted.flush()
+
+        restarted = SessionManager(db_path=db_path)
+        assert restarted.get("alice").turn_count == 1
+        assert restarted.history("bob") == [{"user": "Hello!"}]
+        print("✅ Sessions survive a restart through SQLite")
+
+
+if __name__ == "__main__":
+    test_sessions()
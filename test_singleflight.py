@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight coalescing of concurrent identical calls
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from myassistant.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_singleflight():
+    print("🛫 Testing Single-Flight Coalescing")
+    print("=" * 40)
+
+    flights = SingleFlight(timeout=5)
+    calls = []
+    started = threading.Event()
+
+    def slow_answer(question):
+        calls.append(question)
+        started.set()
+        time.sleep(0.3)
+        return f"answer to {question}"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flights.do, "q", slow_answer, "q")
+        started.wait(1)
+        followers = [pool.submit(flights.do, "q", slow_answer, "q") for _ in range(4)]
+        results = [leader.result()] + [f.result() for f in followers]
+    assert calls == ["q"]
+    assert results == ["answer to q"] * 5
+    assert flights.coalesced == 4
+    print("✅ Five concurrent callers, one computation")
+
+    assert flights.do("q", slow_answer, "q") == "answer to q"
+    assert len(calls) == 2
+    print("✅ Nothing is kept once the call completes")
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    started.clear()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "bad", failing)
+        started.wait(1)
+        follower = pool.submit(flights.do, "bad", failing)
+        for future in (leader, follower):
+            try:
+                future.result()
+                raise AssertionError("expected ValueError")
+            except ValueError:
+                pass
+    print("✅ Errors are shared with waiting callers")
+
+    started.clear()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "slow", slow_answer, "slow")
+        started.wait(1)
+        try:
+            flights.do("slow", slow_answer, "slow", timeout=0.05)
+            raise AssertionError("expected TimeoutError")
+        except TimeoutError:
+            pass
+        assert leader.result() == "answer to slow"
+    print("✅ Waiters give up after the timeout")
+
+    async def run_async():
+        async_flights = AsyncSingleFlight(timeout=5)
+        async_calls = []
+
+        async def fetch():
+            async_calls.append(1)
+            await asyncio.sleep(0.1)
+            return "streamed"
+
+        results = await asyncio.gather(*(async_flights.do("q", fetch) for _ in range(3)))
+        assert results == ["streamed"] * 3
+        assert len(async_calls) == 1
+
+        assert async_flights.claim("s") is None
+        waiter = async_flights.claim("s")
+        async_flights.finish("s", error=RuntimeError("stream broke"))
+        try:
+            await async_flights.wait(waiter)
+            raise AssertionError("expected RuntimeError")
+        except RuntimeError:
+            pass
+
+    asyncio.run(run_async())
+    print("✅ Async callers and streams coalesce too")
+
+
+if __name__ == "__main__":
+    test_singleflight()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the precompressed static frontend
+"""
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant.static_assets import StaticAssets, parse_accept_encoding
+from myassistant.web_gui import WebAssistant
+
+
+def test_static_assets():
+    print("📦 Testing Static Frontend Assets")
+    print("=" * 40)
+
+    assets = StaticAssets()
+    page = assets.get("index.html")
+    css = assets.get("app.css")
+    assert page and css and assets.get("app.js")
+    html = page.encodings["identity"].decode()
+    assert f"/static/app.css?v={css.digest}" in html
+    assert "gzip" in page.encodings
+    print(f"✅ Loaded {assets.names()}, page links hashed CSS/JS")
+
+    assert parse_accept_encoding("gzip;q=0, br") == {"gzip": 0.0, "br": 1.0}
+    assert css.choose_encoding("gzip;q=0") == "identity"
+    assert css.choose_encoding("deflate, gzip") == "gzip"
+    print("✅ Accept-Encoding negotiation honours q-values")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with mock.patch.dict(os.environ, {"ASSISTANT_DB_PATH": str(Path(tmp) / "memories.db")}):
+            web = WebAssistant()
+            with TestClient(web.app) as client:
+                # httpx decodes gzip for us; the raw body is still compressed on the wire
+                first = client.get("/", headers={"Accept-Encoding": "gzip"})
+                assert first.status_code == 200
+                assert first.headers["content-encoding"] == "gzip"
+                assert first.headers["cache-control"] == "no-cache"
+                assert first.headers["vary"] == "Accept-Encoding"
+                assert "<html" in first.text
+                print(f"✅ Page served gzipped with ETag {first.headers['etag']}")
+
+                again = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+                assert again.status_code == 304 and again.content == b""
+                print("✅ Repeat load answered with 304")
+
+                plain = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]})
+                assert plain.status_code == 200 and "content-encoding" not in plain.headers
+                assert plain.headers["etag"] != first.headers["etag"]
+                print("✅ Each encoding has its own ETag")
+
+                versioned = client.get(f"/static/app.css?v={css.digest}", headers={"Accept-Encoding": "gzip"})
+                assert "immutable" in versioned.headers["cache-control"]
+                assert versioned.headers["content-type"].startswith("text/css")
+                assert gzip.decompress(css.encodings["gzip"]).decode() == versioned.text
+                assert client.get("/static/app.css").headers["cache-control"] == "no-cache"
+                assert client.get("/static/missing.js").status_code == 404
+                print("✅ Hashed asset URLs are cached as immutable")
+
+    print("\n🎉 Static asset tests passed!")
+
+
+if __name__ == "__main__":
+    test_static_assets()
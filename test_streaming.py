@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming LLM responses against the local stub server
+"""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from myassistant.ai_response import AIResponseSystem
+from myassistant.chatgpt_ai import ChatGPTAssistant
+from myassistant.memory_store import MemoryStore
+from myassistant.stub_server import StubServer
+
+
+async def collect(stream):
+    return [delta async for delta in stream]
+
+
+def test_streaming():
+    print("📡 Testing Streaming Responses")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(reply="Your meeting is at 2 PM tomorrow") as stub:
+        env = {"OPENAI_API_KEY": "test-key", "OPENAI_BASE_URL": stub.base_url}
+        with mock.patch.dict(os.environ, env):
+            store = MemoryStore(Path(tmp) / "memories.db")
+            store.remember("I have a meeting tomorrow at 2 PM")
+
+            chatgpt = ChatGPTAssistant()
+            deltas = asyncio.run(collect(chatgpt.astream_response("When is my meeting?", store, "alice")))
+            assert len(deltas) > 1
+            assert "".join(deltas) == "Your meeting is at 2 PM tomorrow"
+            assert chatgpt.sessions.history("alice")[-1]["content"] == "Your meeting is at 2 PM tomorrow"
+            assert stub.requests[-1]["stream"] is True
+            print("✅ ChatGPTAssistant streams token deltas")
+
+            assert chatgpt.get_response("When is my meeting?", store) == "Your meeting is at 2 PM tomorrow"
+            print("✅ Non-streaming path unchanged")
+
+            system = AIResponseSystem(store)
+            deltas = asyncio.run(collect(system.astream_response("When is my meeting?")))
+            assert len(deltas) > 1
+            assert "".join(deltas) == "Your meeting is at 2 PM tomorrow"
+            print("✅ AIResponseSystem streams token deltas")
+
+
+if __name__ == "__main__":
+    test_streaming()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for rolling conversation summaries
+"""
+import os
+import tempfile
+from collections import deque
+from pathlib import Path
+from unittest import mock
+
+from myassistant.chatgpt_ai import ChatGPTAssistant
+from myassistant.context_builder import estimate_tokens
+from myassistant.llm_dispatch import INTERACTIVE, LLMDispatcher
+from myassistant.sessions import Session, SessionManager
+from myassistant.stub_server import StubServer
+from myassistant.summarizer import extractive_summary, fold_history
+
+
+def test_summarizer():
+    print("🗜️ Testing Conversation Summaries")
+    print("=" * 40)
+
+    turns = [
+        {"role": "user", "content": "My dentist appointment is on 2025-03-14 at 3 PM."},
+        {"role": "assistant", "content": "Okay. That sounds good."},
+        {"role": "user", "content": "The weather is nice today. I like it."},
+        {"role": "user", "content": "Call Anna at 555-123-4567 about the dentist appointment."},
+    ]
+    summary = extractive_summary(turns, max_tokens=40)
+    assert estimate_tokens(summary) <= 40
+    assert "2025-03-14" in summary and "555-123-4567" in summary
+    assert summary.index("2025-03-14") < summary.index("555-123-4567")
+    print("✅ Extractive summary keeps the facts, in order, within budget")
+
+    session = Session("s", deque(maxlen=20))
+    for i in range(30):
+        session.add({"role": "user", "content": f"Question {i} about the garden, sentence number {i}."})
+        session.add({"role": "assistant", "content": f"Answer {i}."})
+        fold_history(session, trigger_tokens=100, keep_turns=4, max_summary_tokens=60)
+        assert len(session.turns) <= 20
+        assert estimate_tokens(session.summary) <= 60
+    assert session.summary and len(session.turns) <= 6
+    print("✅ History and summary stay bounded over a long conversation")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "memories.db")
+        sessions = SessionManager(db_path=db_path)
+        sessions.get("a").summary = "User: My locker is 42."
+        sessions.get("a").add({"role": "user", "content": "hi"})
+        sessions.flush()
+        assert SessionManager(db_path=db_path).get("a").summary == "User: My locker is 42."
+        print("✅ Summaries persist with the session")
+
+    with StubServer(reply="Sure.") as stub:
+        env = {"OPENAI_API_KEY": "test-key", "OPENAI_BASE_URL": stub.base_url, "ASSISTANT_SUMMARY_TRIGGER_TOKENS": "80"}
+        with mock.patch.dict(os.environ, env):
+            chatgpt = ChatGPTAssistant()
+            # Not throttled by the shared dispatcher's default rate
+            chatgpt.dispatcher = LLMDispatcher(rate_per_minute=6000)
+            chatgpt.get_response("My locker number is 42 and my badge is 7781.", session_id="long")
+            for i in range(8):
+                chatgpt.get_response(f"Tell me something about topic number {i}, please.", session_id="long")
+            system_prompt = stub.requests[-1]["messages"][0]["content"]
+            assert "Summary of the earlier conversation" in system_prompt
+            assert "42" in system_prompt
+            print("✅ ChatGPT prompts carry the summary plus recent turns")
+
+            chatgpt.summary_mode = "llm"
+            priorities = []
+            call = chatgpt.dispatcher.call
+
+            def recording_call(fn, *args, priority=INTERACTIVE, **kwargs):
+                priorities.append(priority)
+                return call(fn, *args, priority=priority, **kwargs)
+
+            chatgpt.dispatcher.call = recording_call
+            for i in range(4):
+                chatgpt.get_response(f"One more question about topic number {i}, please.", session_id="long")
+            summary_calls = [r for r in stub.requests if "Update the summary" in r["messages"][0]["content"]]
+            assert summary_calls and set(priorities) == {INTERACTIVE}
+            print("✅ LLM summaries the answer waits on are queued as interactive")
+
+
+if __name__ == "__main__":
+    test_summarizer()
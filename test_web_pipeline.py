@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for the staged websocket replies of the web app
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant.engines import register_engine
+from myassistant.web_gui import WebAssistant
+
+
+class SlowEngine:
+    def get_response(self, user_message, memory_store=None, session_id="default"):
+        time.sleep(0.5)
+        return f"Answer to: {user_message}"
+
+    def is_available(self):
+        return True
+
+
+def test_web_pipeline():
+    print("📨 Testing Staged WebSocket Replies")
+    print("=" * 40)
+
+    register_engine("slow-test", lambda store, sessions: SlowEngine())
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"ASSISTANT_DB_PATH": str(Path(tmp) / "memories.db"), "ASSISTANT_ENGINE": "slow-test"}
+        with mock.patch.dict(os.environ, env):
+            web = WebAssistant()
+            with TestClient(web.app) as client, client.websocket_connect("/ws") as ws:
+                start = time.monotonic()
+                ws.send_json({"type": "audio", "data": "My locker is 42", "session_id": "t", "request_id": "a"})
+                ws.send_json({"type": "audio", "data": "My badge is 7781", "session_id": "t", "request_id": "b"})
+
+                frames = []
+                while sum(f["type"] == "ai_response" for f in frames) < 2:
+                    frame = ws.receive_json()
+                    frame["at"] = time.monotonic() - start
+                    frames.append(frame)
+
+    stored = [f for f in frames if f["type"] == "memory_stored"]
+    answers = {f["request_id"]: f for f in frames if f["type"] == "ai_response"}
+    assert [f["request_id"] for f in stored] == ["a", "b"]
+    assert stored[1]["count"] == 2 and stored[1]["recent"][0]["text"] == "My badge is 7781"
+    assert answers["a"]["ai_response"] == "Answer to: My locker is 42"
+    assert answers["b"]["ai_response"] == "Answer to: My badge is 7781"
+    print("✅ Every frame carries its request id")
+
+    assert frames.index(stored[1]) < frames.index(answers["a"])
+    assert answers["a"]["at"] - stored[0]["at"] >= 0.5
+    print("✅ Both memories acknowledged before either answer")
+
+
+if __name__ == "__main__":
+    test_web_pipeline()
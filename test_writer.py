@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-worker mode: one writer process, WAL readers
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from myassistant.memory_store import MemoryStore
+from myassistant.writer import RemoteMemoryStore, WriterServer, open_store
+
+
+def _worker_writes(env, worker, count):
+    os.environ.update(env)
+    store = open_store()
+    for i in range(count):
+        store.remember(f"Worker {worker} note {i}")
+
+
+def test_writer():
+    print("🧵 Testing Multi-Worker Writer")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = WriterServer(Path(tmp) / "memories.db").start()
+        env = writer.env()
+        with mock.patch.dict(os.environ, env):
+            store = open_store()
+            assert isinstance(store, RemoteMemoryStore)
+
+            processes = [
+                multiprocessing.get_context("fork").Process(target=_worker_writes, args=(env, w, 15))
+                for w in range(3)
+            ]
+            for p in processes:
+                p.start()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                ids = list(pool.map(lambda i: store.remember_memory(f"Thread note {i}").id, range(40)))
+            for p in processes:
+                p.join(timeout=60)
+                assert p.exitcode == 0
+            assert len(set(ids)) == 40 and store.count() == 85 and writer.writes == 85
+            print("✅ 3 processes and 8 threads wrote 85 memories through one writer")
+
+            journal = MemoryStore(Path(tmp) / "memories.db")
+            with journal._conn() as conn:
+                assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            print("✅ Database is in WAL mode")
+
+            hits = store.read_hits
+            assert store.count() == 85 and store.read_hits == hits + 1
+            journal.remember("Written by another process")
+            assert store.count() == 86
+            before = store.generation()
+            store.delete(ids[0])
+            assert store.generation()[1] == before[1] + 1 and store.count() == 85
+            print("✅ Read cache reused until any process writes")
+
+            try:
+                store._call("count")
+                raise AssertionError("reads must not go through the writer")
+            except ValueError:
+                pass
+
+            # Two workers' apps sharing the writer: pages on one see the other's writes
+            with mock.patch.dict(os.environ, {"ASSISTANT_WATCH_INTERVAL_MS": "100", "ASSISTANT_ENGINE": "local"}):
+                from myassistant.web_gui import create_app
+                first, second = create_app(), create_app()
+                with TestClient(first) as a, TestClient(second) as b, b.websocket_connect("/ws") as page:
+                    a.delete(f"/memories/{ids[1]}")
+                    while page.receive_json()["type"] != "resync":
+                        pass
+                    with a.websocket_connect("/ws") as writer_page:
+                        writer_page.send_json({"type": "audio", "data": "Stored on worker A", "request_id": "x"})
+                        while writer_page.receive_json()["type"] != "memory_stored":
+                            pass
+                    frame = page.receive_json()
+                    while frame["type"] != "memory_created":
+                        frame = page.receive_json()
+                    assert frame["memory"]["text"] == "Stored on worker A"
+
+                    # More new memories than one export batch between two polls
+                    imported = store.import_memories([{"text": f"Imported note {i}"} for i in range(120)])
+                    shown = set()
+                    while not set(imported) <= shown:
+                        frame = page.receive_json()
+                        if frame["type"] == "memory_created":
+                            shown.add(frame["memory"]["id"])
+                    print("✅ A page on worker B saw worker A's delete and new memories")
+
+                with TestClient(create_app()) as a, TestClient(create_app()) as b:
+                    with a.websocket_connect("/ws") as page_a, b.websocket_connect("/ws") as page_b:
+                        # Due a minute ago, within the grace period, so it fires at once
+                        due = datetime.now().astimezone().replace(second=0, microsecond=0) - timedelta(minutes=1)
+                        [memory_id] = store.import_memories([{
+                            "text": f"Call the pharmacy at {due:%H:%M}",
+                            "created_at": (due - timedelta(minutes=1)).isoformat(),
+                        }])
+                        assert store.reminder(memory_id).due_at == due.astimezone(timezone.utc).isoformat()
+                        for page in (page_a, page_b):
+                            frame = page.receive_json()
+                            while frame["type"] != "reminder":
+                                frame = page.receive_json()
+                            assert frame["memory_id"] == memory_id
+                        # The flag is set after the pages are sent to
+                        deadline = time.monotonic() + 5
+                        while not store.reminder(memory_id).notified:
+                            assert time.monotonic() < deadline, "reminder never marked notified"
+                            time.sleep(0.05)
+                    print("✅ Both workers pushed the reminder to their own pages")
+
+        writer.close()
+
+    print("\n🎉 Multi-worker tests passed!")
+
+
+if __name__ == "__main__":
+    test_writer()